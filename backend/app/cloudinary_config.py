@@ -1,6 +1,5 @@
-import cloudinary
-import cloudinary.uploader
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,12 +12,20 @@ CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 if not all([CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET]):
     print("WARNING: Cloudinary environment variables are missing. Image uploads will fail.")
 
-cloudinary.config(
-    cloud_name=CLOUDINARY_CLOUD_NAME,
-    api_key=CLOUDINARY_API_KEY,
-    api_secret=CLOUDINARY_API_SECRET,
-    secure=True
-)
+# The SDK is only needed by the image upload routes, so it is imported and
+# configured on first use instead of at startup.
+@lru_cache(maxsize=None)
+def get_uploader():
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=CLOUDINARY_CLOUD_NAME,
+        api_key=CLOUDINARY_API_KEY,
+        api_secret=CLOUDINARY_API_SECRET,
+        secure=True
+    )
+    return cloudinary.uploader
 
 def upload_image(file, folder="general"):
     """
@@ -30,7 +37,7 @@ def upload_image(file, folder="general"):
         if hasattr(file, 'file'):
             file_to_upload = file.file
 
-        result = cloudinary.uploader.upload(file_to_upload, folder=f"village_platform/{folder}")
+        result = get_uploader().upload(file_to_upload, folder=f"village_platform/{folder}")
         url = result.get("secure_url")
         if url:
             print(f"Successfully uploaded to Cloudinary: {url}")
@@ -62,7 +69,7 @@ def delete_image(image_url: str):
             public_id_parts[-1] = filename.split(".")[0]
             public_id = "/".join(public_id_parts)
             
-            cloudinary.uploader.destroy(public_id)
+            get_uploader().destroy(public_id)
             print(f"Deleted from Cloudinary: {public_id}")
     except Exception as e:
         print(f"Cloudinary delete error: {e}")
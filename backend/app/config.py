@@ -1,6 +1,6 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-import razorpay
 
 load_dotenv()
 
@@ -14,5 +14,19 @@ RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "thiswillbesetlater")
 RAZORPAY_KEY_ID_SPECIAL = os.getenv("RAZORPAY_KEY_ID_SPECIAL", RAZORPAY_KEY_ID)
 RAZORPAY_KEY_SECRET_SPECIAL = os.getenv("RAZORPAY_KEY_SECRET_SPECIAL", RAZORPAY_KEY_SECRET)
 
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
-razorpay_client_special = razorpay.Client(auth=(RAZORPAY_KEY_ID_SPECIAL, RAZORPAY_KEY_SECRET_SPECIAL))
+# Webhook secrets (Settings -> Webhooks on each account), for /payments/webhook
+# and /payments/special/webhook. The endpoints refuse events until these are set.
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+RAZORPAY_WEBHOOK_SECRET_SPECIAL = os.getenv("RAZORPAY_WEBHOOK_SECRET_SPECIAL", RAZORPAY_WEBHOOK_SECRET)
+
+# The razorpay SDK pulls in requests and pkg_resources (~0.3s), so the clients
+# are built on first use rather than at import time.
+@lru_cache(maxsize=None)
+def get_razorpay_client():
+    import razorpay
+    return razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+
+@lru_cache(maxsize=None)
+def get_razorpay_client_special():
+    import razorpay
+    return razorpay.Client(auth=(RAZORPAY_KEY_ID_SPECIAL, RAZORPAY_KEY_SECRET_SPECIAL))
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import deque
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+# Connection pool settings for the sync and async engines.
+#
+# Production runs behind the Supabase pooler (PgBouncer). In transaction mode
+# (port 6543) a server connection is only ours for the length of a transaction,
+# so server-side prepared statements cannot be reused across transactions —
+# asyncpg caches them by default and fails with "prepared statement ... does
+# not exist" once PgBouncer hands it a different backend.
+#
+# DB_POOLER: "auto" (transaction mode when the URL points at port 6543),
+#            "transaction", "session" or "none".
+# DB_POOL_CLASS: "queue" keeps warm connections in-process; "null" opens a
+#            connection per checkout and leaves all pooling to PgBouncer
+#            (useful when many short-lived workers would otherwise each hold
+#            idle pooler slots).
+DB_POOLER = os.getenv("DB_POOLER", "auto")
+DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "queue")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle below the pooler's idle timeout so we never hand out a connection
+# it has already closed; pre-ping catches the rest (e.g. after a pooler restart).
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+TRANSACTION_POOLER_PORT = 6543
+
+
+def pooler_mode(url: str) -> str:
+    if DB_POOLER != "auto":
+        return DB_POOLER
+    try:
+        port = make_url(url).port
+    except exc.ArgumentError:
+        return "none"
+    return "transaction" if port == TRANSACTION_POOLER_PORT else "none"
+
+
+class PoolMetrics:
+    """Counters and checkout wait times for one engine's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=1000)
+        self._counters = {
+            "checkouts": 0,
+            "checkins": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "timeouts": 0,
+        }
+
+    def count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            waits = sorted(self._waits)
+        if waits:
+            data["wait_avg_ms"] = round(sum(waits) / len(waits) * 1000, 2)
+            data["wait_p95_ms"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2)
+            data["wait_max_ms"] = round(waits[-1] * 1000, 2)
+        else:
+            data["wait_avg_ms"] = data["wait_p95_ms"] = data["wait_max_ms"] = 0.0
+        return data
+
+
+def _metered_pool_class(base, metrics: PoolMetrics):
+    # _do_get is where a checkout blocks on a full pool (or opens a new
+    # connection), so timing it gives the wait a request actually sees.
+    # The metrics live on the class so they survive pool.recreate() on dispose.
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except exc.TimeoutError:
+            metrics.count("timeouts")
+            raise
+        finally:
+            metrics.record_wait(time.perf_counter() - start)
+
+    return type(f"Metered{base.__name__}", (base,), {"_do_get": _do_get, "metrics": metrics})
+
+
+def engine_options(url: str, is_async: bool = False) -> tuple[dict, PoolMetrics]:
+    """Keyword arguments for create_engine / create_async_engine, plus the pool's metrics."""
+    metrics = PoolMetrics()
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        # Keep the pool SQLite picks for itself; only the instrumentation applies
+        default = parsed.get_dialect(_is_async=is_async).get_pool_class(parsed)
+        return {"poolclass": _metered_pool_class(default, metrics)}, metrics
+
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_POOL_CLASS == "null":
+        options["poolclass"] = _metered_pool_class(NullPool, metrics)
+    else:
+        base = AsyncAdaptedQueuePool if is_async else QueuePool
+        options["poolclass"] = _metered_pool_class(base, metrics)
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    if is_async and pooler_mode(url) == "transaction":
+        # psycopg2 never prepares server-side, but asyncpg does for every query
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options, metrics
+
+
+def instrument(engine, metrics: PoolMetrics):
+    """Attach checkout/checkin/connect/invalidate counters to a sync Engine."""
+    event.listen(engine, "checkout", lambda *args: metrics.count("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.count("checkins"))
+    event.listen(engine, "connect", lambda *args: metrics.count("connects"))
+    event.listen(engine, "invalidate", lambda *args: metrics.count("invalidations"))
+    event.listen(engine, "soft_invalidate", lambda *args: metrics.count("invalidations"))
+
+
+def pool_stats(engine, metrics: PoolMetrics) -> dict:
+    pool = engine.pool
+    data = {"pool": type(pool).__name__, "pooler": pooler_mode(str(engine.url))}
+    # NullPool / SingletonThreadPool do not track sizes
+    if isinstance(pool, QueuePool):
+        data.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    data.update(metrics.stats())
+    return data
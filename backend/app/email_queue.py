@@ -0,0 +1,153 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from .email_utils import EmailMessage, EmailProvider, ResendProvider, SmtpProvider, _print_otp_box
+
+# Outbound email is delivered by background worker threads so OTP routes only
+# enqueue and return. Each worker owns its own provider instances, which keeps
+# SMTP connections and HTTP sessions warm between messages.
+#
+# EMAIL_PROVIDERS is the order providers are tried in; unconfigured ones are
+# skipped. The default is the Resend-then-SMTP order OTP emails always used;
+# add "sendgrid" (e.g. "resend,sendgrid,smtp") to fall back to SendGrid too.
+EMAIL_PROVIDERS = [p.strip() for p in os.getenv("EMAIL_PROVIDERS", "resend,smtp").split(",") if p.strip()]
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "2"))  # seconds, doubled per retry
+
+
+def _create_provider(name: str) -> EmailProvider | None:
+    if name == "resend":
+        return ResendProvider()
+    if name == "smtp":
+        return SmtpProvider()
+    if name == "sendgrid":
+        from .sendgrid_utils import SendGridProvider
+        return SendGridProvider()
+    print(f"⚠️  Unknown email provider '{name}' ignored")
+    return None
+
+
+def create_providers() -> list[EmailProvider]:
+    providers = [_create_provider(name) for name in EMAIL_PROVIDERS]
+    return [p for p in providers if p is not None and p.is_configured()]
+
+
+@dataclass
+class EmailJob:
+    message: EmailMessage
+    fallback_otp: str | None = None
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class EmailQueue:
+    def __init__(self, workers: int = EMAIL_WORKERS, provider_factory=create_providers):
+        self.workers = workers
+        self.provider_factory = provider_factory
+        self._queue: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._pending_retries = 0
+        self._latencies = deque(maxlen=500)
+        self._counters = {"enqueued": 0, "sent": 0, "failed": 0, "retried": 0}
+        self._configured = None
+
+    def has_providers(self) -> bool:
+        if self._configured is None:
+            providers = self.provider_factory()
+            self._configured = bool(providers)
+            for provider in providers:
+                provider.close()
+        return self._configured
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"email-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def enqueue(self, message: EmailMessage, fallback_otp: str | None = None):
+        self.start()
+        with self._lock:
+            self._counters["enqueued"] += 1
+        self._queue.put(EmailJob(message=message, fallback_otp=fallback_otp))
+
+    def _retry_later(self, job: EmailJob):
+        delay = EMAIL_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+        with self._lock:
+            self._counters["retried"] += 1
+            self._pending_retries += 1
+
+        def requeue():
+            with self._lock:
+                self._pending_retries -= 1
+            self._queue.put(job)
+
+        timer = threading.Timer(delay, requeue)
+        timer.daemon = True
+        timer.start()
+
+    def _deliver(self, providers: list[EmailProvider], job: EmailJob) -> bool:
+        for provider in providers:
+            try:
+                provider.send(job.message)
+                print(f"✅ Email sent via {provider.name} to {job.message.to}")
+                return True
+            except Exception as e:
+                print(f"❌ {provider.name} failed for {job.message.to}: {e}")
+        return False
+
+    def _worker(self):
+        providers = self.provider_factory()
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    break
+                job.attempts += 1
+                if self._deliver(providers, job):
+                    with self._lock:
+                        self._counters["sent"] += 1
+                        self._latencies.append(time.monotonic() - job.enqueued_at)
+                elif job.attempts <= EMAIL_MAX_RETRIES:
+                    self._retry_later(job)
+                else:
+                    with self._lock:
+                        self._counters["failed"] += 1
+                    if job.fallback_otp:
+                        _print_otp_box(job.message.to, job.fallback_otp)
+        finally:
+            for provider in providers:
+                provider.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            latencies = sorted(self._latencies)
+            data["pending_retries"] = self._pending_retries
+        data["depth"] = self._queue.qsize()
+        data["workers"] = len(self._threads)
+        if latencies:
+            data["latency_avg_ms"] = round(sum(latencies) / len(latencies) * 1000, 1)
+            data["latency_p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+        else:
+            data["latency_avg_ms"] = data["latency_p95_ms"] = 0.0
+        return data
+
+
+email_queue = EmailQueue()
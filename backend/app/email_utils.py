@@ -1,6 +1,7 @@
 import smtplib
 import os
-import resend
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -10,16 +11,120 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
+# Set both to "false" to deliver to a plain local sink (see smtp_sink.py)
+SMTP_AUTH = os.getenv("SMTP_AUTH", "true").lower() == "true"
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
 RESEND_API_KEY = os.getenv("RESEND_API_KEY", "")
+RESEND_API_URL = "https://api.resend.com/emails"
 
 
-def send_otp_email(to_email: str, otp: str, subject: str = "Your Login OTP"):
-    """Send OTP code via Email."""
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = f"{subject}: {otp}"
-    msg["From"] = SMTP_FROM
-    msg["To"] = to_email
+@dataclass
+class EmailMessage:
+    to: str
+    subject: str
+    html: str
+
+
+class EmailProvider(ABC):
+    """A delivery backend. Instances are owned by a single queue worker thread,
+    so they may keep a connection open between messages."""
+
+    name = "base"
+
+    @abstractmethod
+    def is_configured(self) -> bool:
+        """Whether the credentials this provider needs are set."""
+
+    @abstractmethod
+    def send(self, message: EmailMessage):
+        """Deliver the message or raise."""
+
+    def close(self):
+        pass
+
+
+class ResendProvider(EmailProvider):
+    name = "resend"
+
+    def __init__(self):
+        # Imported here: providers are only built once email is first sent
+        import requests
+
+        # A persistent session keeps the HTTPS connection to Resend warm
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {RESEND_API_KEY}"
+
+    def is_configured(self) -> bool:
+        return bool(RESEND_API_KEY)
+
+    def send(self, message: EmailMessage):
+        # Use SMTP_FROM if it looks like a Resend-compatible address,
+        # otherwise a custom name with the default Resend onboarding email
+        from_address = SMTP_FROM
+        if "onboarding@resend.dev" not in from_address and "@resend.com" not in from_address and "@resend.dev" not in from_address:
+            from_address = "શ્રી સથવારા કડિયા પ્રગતિ મંડળ <onboarding@resend.dev>"
+
+        response = self.session.post(
+            RESEND_API_URL,
+            json={"from": from_address, "to": message.to, "subject": message.subject, "html": message.html},
+            timeout=SMTP_TIMEOUT,
+        )
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class SmtpProvider(EmailProvider):
+    name = "smtp"
+
+    def __init__(self):
+        self._server = None
+
+    def is_configured(self) -> bool:
+        return not SMTP_AUTH or bool(SMTP_USER and SMTP_PASSWORD)
 
+    def _connect(self):
+        if SMTP_PORT == 465:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            if SMTP_STARTTLS:
+                server.starttls()
+        if SMTP_AUTH:
+            server.login(SMTP_USER, SMTP_PASSWORD)
+        return server
+
+    def send(self, message: EmailMessage):
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = message.subject
+        msg["From"] = SMTP_FROM
+        msg["To"] = message.to
+        msg.attach(MIMEText(message.html, "html"))
+
+        # Reuse the open connection; reconnect once if the server dropped it
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.sendmail(SMTP_FROM, message.to, msg.as_string())
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+def build_otp_email(to_email: str, otp: str, subject: str = "Your Login OTP") -> EmailMessage:
     html = f"""
     <html>
     <body style="font-family: 'Segoe UI', Arial, sans-serif; background-color: #f4f4f7; padding: 40px 0;">
@@ -46,57 +151,24 @@ def send_otp_email(to_email: str, otp: str, subject: str = "Your Login OTP"):
     </body>
     </html>
     """
-    msg.attach(MIMEText(html, "html"))
-    
-    # 1. Try Resend API first if configured (Most reliable on Render)
-    if RESEND_API_KEY:
-        print(f"DEBUG: Attempting to send email via Resend API (To: {to_email})")
-        try:
-            resend.api_key = RESEND_API_KEY
-            # Determine the sender address: 
-            # 1. Use SMTP_FROM if it looks like a Resend-compatible address
-            # 2. Otherwise use a custom name with the default Resend onboarding email
-            from_address = SMTP_FROM
-            if "onboarding@resend.dev" not in from_address and "@resend.com" not in from_address and "@resend.dev" not in from_address:
-                from_address = "શ્રી સથવારા કડિયા પ્રગતિ મંડળ <onboarding@resend.dev>"
-
-            params = {
-                "from": from_address,
-                "to": to_email,
-                "subject": f"Your Login OTP: {otp}",
-                "html": html,
-            }
-            resend.Emails.send(params)
-            print(f"✅ OTP email sent via Resend API to {to_email}")
-            return True
-        except Exception as e:
-            print(f"❌ Resend API failed: {e}")
-            # Continue to SMTP fallback
-
-    # 2. Skip SMTP if not configured
-    if not SMTP_USER or not SMTP_PASSWORD:
+    return EmailMessage(to=to_email, subject=f"{subject}: {otp}", html=html)
+
+
+def send_otp_email(to_email: str, otp: str, subject: str = "Your Login OTP"):
+    """Queue an OTP email for background delivery.
+
+    Returns True if the message was queued, False if no email provider is
+    configured (the OTP is printed to the console instead).
+    """
+    from .email_queue import email_queue
+
+    if not email_queue.has_providers():
         print("⚠️  SMTP/API not configured — printing OTP to console instead.")
         _print_otp_box(to_email, otp)
         return False
 
-    # 3. Try SMTP
-    print(f"DEBUG: Attempting to send email via SMTP {SMTP_HOST}:{SMTP_PORT} (User: {SMTP_USER[:3]}...)")
-    try:
-        if SMTP_PORT == 465:
-            with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=10) as server:
-                server.login(SMTP_USER, SMTP_PASSWORD)
-                server.sendmail(SMTP_FROM, to_email, msg.as_string())
-        else:
-            with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=10) as server:
-                server.starttls()
-                server.login(SMTP_USER, SMTP_PASSWORD)
-                server.sendmail(SMTP_FROM, to_email, msg.as_string())
-        print(f"✅ OTP email sent via SMTP to {to_email}")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send email via SMTP: {e}")
-        _print_otp_box(to_email, otp)
-        return False
+    email_queue.enqueue(build_otp_email(to_email, otp, subject), fallback_otp=otp)
+    return True
 
 def _print_otp_box(to_email, otp):
     print("=" * 50)
@@ -0,0 +1,96 @@
+import re
+from sqlalchemy import select
+from . import models
+
+# Login accepts an email, a phone number or a Sabhasad ID in the same field.
+# Classifying the identifier up front lets us probe exactly one unique index
+# instead of OR-ing three columns, which Postgres can only answer with a
+# bitmap-OR or a sequential scan.
+
+EMAIL = "email"
+PHONE = "phone"
+SABHASAD = "sabhasad"
+
+_PHONE_SEPARATORS = re.compile(r"[\s\-().]")
+_PHONE_RE = re.compile(r"^\+?\d{6,15}$")
+_SABHASAD_RE = re.compile(r"^e?sab-?(\d+)$", re.IGNORECASE)
+
+_COLUMNS = {
+    EMAIL: models.User.email,
+    PHONE: models.User.phone_number,
+    SABHASAD: models.User.sabhasad_id,
+}
+
+
+def normalize_email(value: str) -> str:
+    # Same normalization as pydantic's EmailStr: trim and lowercase the domain
+    value = value.strip()
+    local, sep, domain = value.rpartition("@")
+    return f"{local}{sep}{domain.lower()}" if sep else value
+
+
+def normalize_phone(value: str | None) -> str | None:
+    if value is None:
+        return None
+    return _PHONE_SEPARATORS.sub("", value.strip())
+
+
+def phone_candidates(raw: str | None) -> list[str]:
+    """Stored forms a phone number may have: normalized, and as typed.
+
+    Migration 0011 rewrites stored numbers to the normalized form but leaves
+    numbers that would collide after normalization untouched, so lookups also
+    try the raw value. Both are probes on the unique index.
+    """
+    if raw is None:
+        return []
+    return list(dict.fromkeys(value for value in (normalize_phone(raw), raw.strip()) if value))
+
+
+async def phone_taken(db, raw: str | None) -> bool:
+    candidates = phone_candidates(raw)
+    if not candidates:
+        return False
+    return await db.scalar(select(models.User.id).where(models.User.phone_number.in_(candidates)).limit(1)) is not None
+
+
+def format_sabhasad_id(number: int) -> str:
+    return f"eSAB-{number:04d}"
+
+
+def classify_identifier(raw: str) -> tuple[str, str]:
+    """Return (kind, normalized value) for a login identifier."""
+    value = raw.strip()
+    if "@" in value:
+        return EMAIL, normalize_email(value)
+    phone = normalize_phone(value)
+    if _PHONE_RE.match(phone):
+        return PHONE, phone
+    match = _SABHASAD_RE.match(value)
+    if match:
+        return SABHASAD, format_sabhasad_id(int(match.group(1)))
+    # Unknown shapes are tried as Sabhasad IDs (the only free-form column)
+    return SABHASAD, value
+
+
+def identifier_query(raw: str, kinds: tuple = (EMAIL, PHONE, SABHASAD)):
+    """Build the single-column SELECT for an identifier, or None if its kind is not allowed."""
+    kind, value = classify_identifier(raw)
+    if kind not in kinds:
+        return None
+    if kind == PHONE:
+        return select(models.User).where(models.User.phone_number.in_(phone_candidates(raw)))
+    return select(models.User).where(_COLUMNS[kind] == value)
+
+
+async def find_user_by_identifier(db, raw: str, kinds: tuple = (EMAIL, PHONE, SABHASAD)):
+    """Resolve a user with a single indexed equality probe.
+
+    `kinds` restricts which identifier types are accepted; OTP login, for
+    example, only allows email and phone.
+    """
+    query = identifier_query(raw, kinds)
+    if query is None:
+        return None
+    result = await db.execute(query)
+    return result.scalars().first()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from starlette.concurrency import run_in_threadpool
+
+# Lifecycle shared by the per-process in-memory indexes (member search,
+# member filters).
+#
+# The index is built from the database on first use, with rows fetched on a
+# read-only session of its own (never the request's, which a build must not
+# commit) and the CPU-bound build run in the threadpool so the event loop
+# keeps serving. Requests that arrive during the first build wait for that
+# same build rather than starting their own. Routes apply their own changes
+# in place; a full rebuild runs in the background every `refresh_seconds` to
+# pick up writes made by other workers. Changes applied while a rebuild is
+# loading are replayed onto the new index before it is swapped in.
+
+
+class LiveIndex:
+    def __init__(self, name: str, load, build, refresh_seconds: int):
+        """`load(db)` is awaited for the rows; `build(rows)` runs in the threadpool."""
+        self.name = name
+        self._load = load
+        self._build = build
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = 0.0
+        self._building = False
+        # The build in flight. The event loop only keeps weak references to
+        # tasks, so this one keeps it alive until it is done
+        self._task: asyncio.Task | None = None
+        self._pending: list = []
+
+    async def _rebuild(self):
+        from .database import create_session
+        try:
+            db = create_session(read_only=True)
+            try:
+                rows = await self._load(db)
+            finally:
+                # Release the connection before the (slow) build
+                await db.close()
+            index = await run_in_threadpool(self._build, rows)
+            with self._lock:
+                for change in self._pending:
+                    change(index)
+                self._pending.clear()
+                self._index = index
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _finished(self, task: asyncio.Task):
+        with self._lock:
+            if self._task is task:
+                self._task = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️  {self.name} rebuild failed: {task.exception()}")
+
+    async def ensure(self):
+        """Build the index on first use; refresh it in the background once stale."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            index = self._index
+            stale = index is None or time.monotonic() - self._built_at > self.refresh_seconds
+            if not stale:
+                return
+            task = self._task
+            # A build left behind by another event loop (tests, scripts) never finishes here
+            if task is None or task.get_loop() is not loop:
+                self._building = True
+                task = self._task = loop.create_task(self._rebuild())
+                task.add_done_callback(self._finished)
+        if index is None:
+            # Every cold request waits on the one build; shield it from their cancellation
+            await asyncio.shield(task)
+
+    def apply(self, change):
+        """Run `change(index)` now, and again on a rebuild that is in flight."""
+        with self._lock:
+            if self._index is not None:
+                change(self._index)
+            if self._building:
+                self._pending.append(change)
+
+    def read(self, query, default=None):
+        """Run `query(index)` under the lock; `default` before the first build."""
+        with self._lock:
+            if self._index is None:
+                return default
+            return query(self._index)
+
+    def clear(self):
+        with self._lock:
+            self._index = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "built": self._index is not None,
+                "age_seconds": round(time.monotonic() - self._built_at, 1) if self._index is not None else None,
+                "building": self._building,
+            }
@@ -0,0 +1,64 @@
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import false, or_
+
+# Calendar dates in filters and reports (a day, a month, a year) are days in
+# APP_TIMEZONE, whatever the database session's timezone is. created_at is an
+# instant (timestamptz on Postgres, UTC text on SQLite), so a date filter
+# becomes a half-open range of instants, `lower <= created_at < upper`,
+# which an index on created_at answers with a range seek. Casting the column
+# to a date or extracting its month would make the database evaluate the
+# expression for every row instead.
+APP_TIMEZONE = os.getenv("APP_TIMEZONE", "Asia/Kolkata")
+ZONE = ZoneInfo(APP_TIMEZONE)
+
+
+def day_start(day: date) -> datetime:
+    """The instant (in UTC) at which `day` begins in APP_TIMEZONE."""
+    return datetime.combine(day, time.min, tzinfo=ZONE).astimezone(timezone.utc)
+
+
+def local_date(instant: datetime) -> date:
+    """Calendar date of `instant` in APP_TIMEZONE. Naive values are UTC, as SQLite stores them."""
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=timezone.utc)
+    return instant.astimezone(ZONE).date()
+
+
+def utc_offset_minutes() -> int:
+    """APP_TIMEZONE's current offset, for databases without named time zones (SQLite)."""
+    return int(datetime.now(ZONE).utcoffset().total_seconds() // 60)
+
+
+def _period(year: int, month: int | None) -> tuple[date, date]:
+    if month is None:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    if month == 12:
+        return date(year, 12, 1), date(year + 1, 1, 1)
+    return date(year, month, 1), date(year, month + 1, 1)
+
+
+def created_at_filters(column, start_date: date | None = None, end_date: date | None = None,
+                       month: int | None = None, year: int | None = None, years: range | None = None) -> list:
+    """WHERE clauses on `column` for an inclusive date range and/or a month and year.
+
+    A month without a year matches that month in every year of `years` (the
+    caller passes the years its data spans), as one range per year.
+    """
+    filters = []
+    if start_date:
+        filters.append(column >= day_start(start_date))
+    if end_date:
+        filters.append(column < day_start(end_date + timedelta(days=1)))
+    if year:
+        lower, upper = _period(year, month)
+        filters.append(column >= day_start(lower))
+        filters.append(column < day_start(upper))
+    elif month:
+        ranges = [
+            (column >= day_start(lower)) & (column < day_start(upper))
+            for lower, upper in (_period(y, month) for y in years or ())
+        ]
+        filters.append(or_(*ranges) if ranges else false())
+    return filters
@@ -3,17 +3,39 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from .database import engine, Base, get_db
 from .models import Base
+from . import password_hashing, payment_rollups, query_stats, receipts, village_counts, village_summary
+from .razorpay_gateway import gateway as razorpay_gateway
+from .razorpay_webhook import webhook_queue
+from .email_queue import email_queue
 from contextlib import asynccontextmanager
+import os
+
+# Schema creation is not part of serving boot: every autoscaled instance would
+# otherwise inspect every table before accepting traffic. Run
+# `python migrate.py` once per deploy, or set DB_CREATE_ALL=true for
+# local development.
+DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "false").lower() in ("1", "true", "yes")
 
-# Create tables on startup
-# In production, use Alembic for migrations
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    if DB_CREATE_ALL:
+        Base.metadata.create_all(bind=engine)
     yield
+    await webhook_queue.stop()
+    await razorpay_gateway.aclose()
+    password_hashing.shutdown()
+    receipts.shutdown()
+    email_queue.stop()
 
 app = FastAPI(title="Village Community API", lifespan=lifespan)
 
+# Keep villages' denormalized member counts and the payment rollups in step
+# with writes, and drop cached village summaries when payments or
+# memberships change
+village_counts.install()
+payment_rollups.install()
+village_summary.install()
+
 import traceback
 from fastapi.responses import JSONResponse
 from fastapi import Request
@@ -56,6 +78,9 @@ if frontend_url:
     if clean_url not in origins:
         origins.append(clean_url)
 
+if query_stats.QUERY_DEBUG_HEADERS:
+    app.add_middleware(query_stats.QueryCounterMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -0,0 +1,338 @@
+import bisect
+import os
+from array import array
+from collections import Counter
+from datetime import date
+from itertools import islice
+from sqlalchemy import select
+from . import models
+from .live_index import LiveIndex
+
+# In-process, column-oriented snapshot of the users table for the admin
+# filter builder (/members/query).
+#
+# Each member gets a row number; row sets are Python ints used as bitmaps, so
+# AND/OR/NOT over any mix of filters are single big-integer operations and a
+# facet count is one AND plus int.bit_count(). Categorical columns are
+# dictionary-encoded with one bitmap per distinct value; date_of_birth is
+# bucketed by birth year with a sorted (ordinal, row) array per year, so an
+# age range is an OR of whole years plus two bisected boundary years.
+#
+# Rows are assigned in user id order and never reused, which makes "first n
+# set bits" the same as "first n members by id" for paging.
+MEMBER_FILTER_REFRESH = int(os.getenv("MEMBER_FILTER_REFRESH", "300"))
+
+CATEGORICAL = ("village_id", "status", "profession", "position")
+FACETS = CATEGORICAL + ("paid",)
+FACET_TOP = 20
+# Facets over results sparser than one match in SPARSE_RATIO rows tally the
+# matched rows, when that is cheaper than ANDing each value's bitmap
+SPARSE_RATIO = 32
+ROWS_PER_AND = 100
+
+
+def _bitmap(rows) -> int:
+    bits = bytearray()
+    for row in rows:
+        byte = row >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte - len(bits) + 1))
+        bits[byte] |= 1 << (row & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _set_rows(bitmap: int):
+    """Row numbers of the set bits, ascending, skipping empty 64-bit words."""
+    words = array("Q", bitmap.to_bytes((bitmap.bit_length() + 63) // 64 * 8, "little"))
+    for i, word in enumerate(words):
+        while word:
+            low = word & -word
+            yield i * 64 + low.bit_length() - 1
+            word ^= low
+
+
+def _text_key(value):
+    # Free-text columns: "Farmer", " farmer " and "FARMER" are one value
+    return " ".join(value.split()).casefold() if isinstance(value, str) else value
+
+
+def _years_before(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - years, day=28)
+
+
+class BitmapColumn:
+    """Dictionary-encoded column: a code per row and a row bitmap per distinct value."""
+
+    __slots__ = ("codes", "values", "lookup", "bitmaps", "key")
+
+    def __init__(self, key=None):
+        self.codes = array("i")
+        self.values = []  # code -> value as first seen
+        self.lookup = {}  # key(value) -> code
+        self.bitmaps = []  # code -> bitmap
+        self.key = key or (lambda value: value)
+
+    def _code(self, value) -> int:
+        k = self.key(value)
+        code = self.lookup.get(k)
+        if code is None:
+            code = self.lookup[k] = len(self.values)
+            self.values.append(value)
+            self.bitmaps.append(0)
+        return code
+
+    def load(self, values):
+        rows_by_code = {}
+        for row, value in enumerate(values):
+            code = self._code(value)
+            self.codes.append(code)
+            rows_by_code.setdefault(code, []).append(row)
+        for code, rows in rows_by_code.items():
+            self.bitmaps[code] = _bitmap(rows)
+
+    def set(self, row: int, value):
+        code = self._code(value)
+        if row < len(self.codes):
+            old = self.codes[row]
+            self.bitmaps[old] &= ~(1 << row)
+            self.codes[row] = code
+        else:
+            self.codes.append(code)
+        self.bitmaps[code] |= 1 << row
+
+    def match(self, values) -> int:
+        result = 0
+        for value in values:
+            code = self.lookup.get(self.key(value))
+            if code is not None:
+                result |= self.bitmaps[code]
+        return result
+
+    def facet(self, rows: int, matched: list[int] | None = None, top: int = FACET_TOP) -> list[dict]:
+        """Top value counts within `rows`. `matched` lists its row numbers when
+        the caller found it sparse; tallying those beats one AND per value."""
+        if matched is not None and len(matched) < len(self.bitmaps) * ROWS_PER_AND:
+            tally = Counter(self.codes[row] for row in matched)
+            counts = ((self.values[code], n) for code, n in tally.items())
+        else:
+            counts = ((self.values[code], (rows & bitmap).bit_count()) for code, bitmap in enumerate(self.bitmaps))
+        counts = sorted((c for c in counts if c[1]), key=lambda c: -c[1])
+        return [{"value": value, "count": count} for value, count in counts[:top]]
+
+
+class DateColumn:
+    """Dates bucketed by year: a bitmap and a sorted (ordinal, row) array per year."""
+
+    __slots__ = ("ordinals", "years", "by_year")
+
+    def __init__(self):
+        self.ordinals = array("i")  # 0 = unknown
+        self.years = {}
+        self.by_year = {}
+
+    def load(self, values):
+        for row, value in enumerate(values):
+            self.ordinals.append(value.toordinal() if value else 0)
+            if value:
+                self.by_year.setdefault(value.year, []).append((value.toordinal(), row))
+        for year, entries in self.by_year.items():
+            entries.sort()
+            self.years[year] = _bitmap(row for _, row in entries)
+
+    def set(self, row: int, value: date | None):
+        if row < len(self.ordinals):
+            old = self.ordinals[row]
+            if old:
+                year = date.fromordinal(old).year
+                entries = self.by_year[year]
+                del entries[bisect.bisect_left(entries, (old, row))]
+                self.years[year] &= ~(1 << row)
+            self.ordinals[row] = value.toordinal() if value else 0
+        else:
+            self.ordinals.append(value.toordinal() if value else 0)
+        if value:
+            bisect.insort(self.by_year.setdefault(value.year, []), (value.toordinal(), row))
+            self.years[value.year] = self.years.get(value.year, 0) | (1 << row)
+
+    def between(self, after: date | None, until: date | None) -> int:
+        """Rows with after < date <= until (either bound may be open)."""
+        low = after.toordinal() if after else 0
+        high = until.toordinal() if until else date.max.toordinal()
+        result = 0
+        for year, bitmap in self.years.items():
+            if (after and year < after.year) or (until and year > until.year):
+                continue
+            if (not after or year > after.year) and (not until or year < until.year):
+                result |= bitmap
+                continue
+            entries = self.by_year[year]
+            start = bisect.bisect_right(entries, (low, float("inf")))
+            end = bisect.bisect_right(entries, (high, float("inf")))
+            result |= _bitmap(row for _, row in entries[start:end])
+        return result
+
+
+class MemberTable:
+    def __init__(self):
+        self.ids = array("q")
+        self.rows: dict[int, int] = {}
+        self.alive = 0
+        self.paid = 0
+        self.columns = {
+            "village_id": BitmapColumn(),
+            "status": BitmapColumn(),
+            "profession": BitmapColumn(_text_key),
+            "position": BitmapColumn(_text_key),
+        }
+        self.date_of_birth = DateColumn()
+
+    def __len__(self):
+        return self.alive.bit_count()
+
+    def load(self, users: list, paid_user_ids: set[int]):
+        for row, user in enumerate(users):
+            self.ids.append(user.id)
+            self.rows[user.id] = row
+        for name, column in self.columns.items():
+            column.load([getattr(user, name) for user in users])
+        self.date_of_birth.load([user.date_of_birth for user in users])
+        self.alive = (1 << len(users)) - 1
+        self.paid = _bitmap(self.rows[i] for i in paid_user_ids if i in self.rows)
+
+    def upsert(self, user_id: int, values: dict):
+        row = self.rows.get(user_id)
+        if row is None:
+            row = self.rows[user_id] = len(self.ids)
+            self.ids.append(user_id)
+        for name, column in self.columns.items():
+            column.set(row, values[name])
+        self.date_of_birth.set(row, values["date_of_birth"])
+        self.alive |= 1 << row
+
+    def remove(self, user_id: int):
+        row = self.rows.get(user_id)
+        if row is not None:
+            self.alive &= ~(1 << row)
+            self.paid &= ~(1 << row)
+
+    def mark_paid(self, user_id: int):
+        row = self.rows.get(user_id)
+        if row is not None:
+            self.paid |= 1 << row
+
+    def evaluate(self, node: dict, today: date | None = None) -> int:
+        """Rows matching a filter node: every field present must match, `and`
+        children must all match, at least one `or` child must, `not` must not."""
+        today = today or date.today()
+        rows = self.alive
+        for name, column in self.columns.items():
+            if node.get(name) is not None:
+                rows &= column.match(node[name])
+        if node.get("age_min") is not None or node.get("age_max") is not None:
+            # age >= min  <=>  born on or before today minus min years
+            until = _years_before(today, node["age_min"]) if node.get("age_min") is not None else None
+            after = _years_before(today, node["age_max"] + 1) if node.get("age_max") is not None else None
+            rows &= self.date_of_birth.between(after, until)
+        if node.get("paid") is not None:
+            rows &= self.paid if node["paid"] else ~self.paid
+        for child in node.get("and") or ():
+            rows &= self.evaluate(child, today)
+        if node.get("or"):
+            any_rows = 0
+            for child in node["or"]:
+                any_rows |= self.evaluate(child, today)
+            rows &= any_rows
+        if node.get("not"):
+            rows &= ~self.evaluate(node["not"], today)
+        return rows
+
+    def facets(self, rows: int, names) -> dict:
+        total = rows.bit_count()
+        matched = list(_set_rows(rows)) if total * SPARSE_RATIO < len(self.ids) else None
+        result = {}
+        for name in names:
+            if name == "paid":
+                paid = (rows & self.paid).bit_count()
+                result[name] = [{"value": True, "count": paid}, {"value": False, "count": total - paid}]
+            else:
+                result[name] = self.columns[name].facet(rows, matched)
+        return result
+
+    def row_after(self, user_id: int) -> int:
+        """Row to resume paging after; falls back to id order for ids not in this snapshot."""
+        row = self.rows.get(user_id)
+        return row if row is not None else bisect.bisect_right(self.ids, user_id) - 1
+
+    def page(self, rows: int, after_row: int | None, limit: int) -> tuple[list[int], bool]:
+        """User ids of the first `limit` rows after `after_row`, and whether more follow."""
+        if after_row is not None and after_row >= 0:
+            rows = rows >> (after_row + 1) << (after_row + 1)
+        page_rows = list(islice(_set_rows(rows), limit + 1))
+        return [self.ids[row] for row in page_rows[:limit]], len(page_rows) > limit
+
+
+# ─── Process-wide snapshot ────────────────────────────────────
+
+async def _load(db):
+    users = (await db.execute(
+        select(
+            models.User.id, models.User.village_id, models.User.status, models.User.profession,
+            models.User.position, models.User.date_of_birth,
+        ).order_by(models.User.id)
+    )).all()
+    paid = set((await db.scalars(
+        select(models.Payment.user_id).where(models.Payment.status == "completed").distinct()
+    )).all())
+    return users, paid
+
+
+def _build(rows) -> MemberTable:
+    users, paid = rows
+    table = MemberTable()
+    table.load(users, paid)
+    return table
+
+
+_live = LiveIndex("Member filter snapshot", _load, _build, MEMBER_FILTER_REFRESH)
+
+
+async def ensure_index():
+    await _live.ensure()
+
+
+def upsert_user(user: models.User):
+    """Refresh a user's row after a commit."""
+    user_id = user.id
+    values = {name: getattr(user, name) for name in CATEGORICAL + ("date_of_birth",)}
+    _live.apply(lambda table: table.upsert(user_id, values))
+
+
+def remove_user(user_id: int):
+    _live.apply(lambda table: table.remove(user_id))
+
+
+def mark_paid(user_id: int):
+    _live.apply(lambda table: table.mark_paid(user_id))
+
+
+def query(node: dict, facets, limit: int, after_id: int | None = None):
+    """Return (total, facets, user ids of the page, whether another page follows)."""
+    def run(table: MemberTable):
+        rows = table.evaluate(node)
+        after_row = table.row_after(after_id) if after_id is not None else None
+        ids, more = table.page(rows, after_row, limit)
+        return rows.bit_count(), table.facets(rows, facets), ids, more
+    return _live.read(run, default=(0, {}, [], False))
+
+
+def clear():
+    _live.clear()
+
+
+def stats() -> dict:
+    counts = _live.read(lambda table: {"members": len(table), "rows": len(table.ids)},
+                        default={"members": 0, "rows": 0})
+    return {**counts, **_live.stats()}
@@ -0,0 +1,303 @@
+import heapq
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from sqlalchemy import select
+from . import models
+from .live_index import LiveIndex
+
+# In-process member search.
+#
+# An n-gram index over name, profession, phone, Sabhasad ID and village name
+# answers substring, prefix and typo-tolerant lookups in a few milliseconds,
+# where ILIKE '%x%' would scan the users table on every keystroke.
+#
+# Tokens are runs of letters, combining marks and digits, so Gujarati words
+# stay whole (vowel signs such as ા are marks, not letters, and would split
+# words under a plain \w tokenizer). Each worker keeps its own index: routes
+# that change indexed fields update it in place, and it is rebuilt from the
+# database every SEARCH_INDEX_REFRESH seconds to pick up other workers' writes.
+SEARCH_INDEX_REFRESH = int(os.getenv("SEARCH_INDEX_REFRESH", "300"))
+
+FIELD_WEIGHTS = {"name": 3.0, "sabhasad": 3.0, "phone": 2.0, "village": 1.5, "profession": 1.0}
+
+# How a query token matched a document token
+EXACT, PREFIX, SUBSTRING, FUZZY = 1.0, 0.8, 0.6, 0.4
+# Share of a query token's n-grams a candidate must contain
+MIN_GRAM_OVERLAP = 0.5
+NGRAM = 3
+
+
+@lru_cache(maxsize=None)
+def _tables():
+    """Token pattern and digit map, built on first use (scans the BMP once)."""
+    marks = "".join(re.escape(chr(c)) for c in range(0x10000) if unicodedata.category(chr(c)).startswith("M"))
+    # Letters and digits (\w without _) plus combining marks
+    token = re.compile(f"(?:[^\\W_]|[{marks}])+")
+    # Gujarati (and other) digits become ASCII so ૯૮૭ matches 987
+    digits = str.maketrans({chr(c): str(unicodedata.digit(chr(c))) for c in range(0x10000)
+                            if unicodedata.category(chr(c)) == "Nd"})
+    return token, digits
+
+
+def normalize(text: str) -> str:
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(_tables()[1])
+    return text.casefold()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _tables()[0].findall(normalize(text)) if text else []
+
+
+def ngrams(token: str) -> set[str]:
+    # Two leading pads make 1- and 2-character queries prefix lookups
+    padded = "\x02" * (NGRAM - 1) + token + "\x03"
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+@dataclass
+class MemberDoc:
+    id: int
+    full_name: str
+    status: str
+    role: str
+    village_id: int | None
+    fields: dict  # field -> list of tokens
+
+
+def member_fields(full_name, profession, phone_number, sabhasad_id, village_name) -> dict:
+    sabhasad = tokenize(sabhasad_id)
+    # "eSAB-0042" is also findable as "42"
+    sabhasad += [t.lstrip("0") for t in sabhasad if t.isdigit() and t.lstrip("0")]
+    return {
+        "name": tokenize(full_name),
+        "profession": tokenize(profession),
+        "phone": tokenize(phone_number),
+        "sabhasad": sabhasad,
+        "village": tokenize(village_name),
+    }
+
+
+def _match(query_token: str, query_grams: set[str], token: str) -> float:
+    if token == query_token:
+        return EXACT
+    if token.startswith(query_token):
+        return PREFIX
+    if query_token in token:
+        return SUBSTRING
+    overlap = len(query_grams & ngrams(token)) / len(query_grams)
+    return FUZZY * overlap if overlap >= MIN_GRAM_OVERLAP else 0.0
+
+
+class MemberSearchIndex:
+    """Two-level index: n-grams lead to distinct terms, terms lead to members.
+
+    Names, villages and professions repeat heavily, so the term vocabulary is
+    far smaller than the member count; fuzzy matching only ever scans terms,
+    and member sets are combined with C-level set operations.
+    """
+
+    def __init__(self):
+        self.docs: dict[int, MemberDoc] = {}
+        self.postings: dict[tuple[str, str], set[int]] = {}  # (field, term) -> member ids
+        self.term_fields: dict[str, set[str]] = {}
+        self.term_grams: dict[str, set[str]] = defaultdict(set)  # n-gram -> terms
+        self.by_status: dict[str, set[int]] = defaultdict(set)
+        self.by_role: dict[str, set[int]] = defaultdict(set)
+        self.by_village: dict[int, set[int]] = defaultdict(set)
+        self.village_names: dict[int, str] = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc: MemberDoc):
+        self.remove(doc.id)
+        self.docs[doc.id] = doc
+        for field, tokens in doc.fields.items():
+            for token in tokens:
+                posting = self.postings.get((field, token))
+                if posting is None:
+                    posting = self.postings[(field, token)] = set()
+                    fields = self.term_fields.setdefault(token, set())
+                    if not fields:
+                        for gram in ngrams(token):
+                            self.term_grams[gram].add(token)
+                    fields.add(field)
+                posting.add(doc.id)
+        self.by_status[doc.status].add(doc.id)
+        self.by_role[doc.role].add(doc.id)
+        if doc.village_id is not None:
+            self.by_village[doc.village_id].add(doc.id)
+
+    def remove(self, doc_id: int):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for field, tokens in doc.fields.items():
+            for token in tokens:
+                posting = self.postings.get((field, token))
+                if posting is None:
+                    continue
+                posting.discard(doc_id)
+                if posting:
+                    continue
+                del self.postings[(field, token)]
+                fields = self.term_fields[token]
+                fields.discard(field)
+                if not fields:
+                    del self.term_fields[token]
+                    for gram in ngrams(token):
+                        self.term_grams[gram].discard(token)
+        self.by_status[doc.status].discard(doc_id)
+        self.by_role[doc.role].discard(doc_id)
+        if doc.village_id is not None:
+            self.by_village[doc.village_id].discard(doc_id)
+
+    def rename_village(self, village_id: int, name: str):
+        self.village_names[village_id] = name
+        for doc_id in list(self.by_village.get(village_id, ())):
+            doc = self.docs[doc_id]
+            self.add(MemberDoc(doc.id, doc.full_name, doc.status, doc.role, doc.village_id,
+                               dict(doc.fields, village=tokenize(name))))
+
+    def _terms(self, query_token: str) -> dict[tuple[str, str], float]:
+        """Weighted score of every (field, term) the query token matches."""
+        grams = ngrams(query_token)
+        if len(query_token) >= NGRAM:
+            # Substring candidates contain every inner n-gram of the query
+            required = [g for g in grams if "\x02" not in g and "\x03" not in g]
+        else:
+            # Too short for inner n-grams: prefix matches only
+            required = [("\x02" * (NGRAM - 1) + query_token)[-NGRAM:]]
+        sets = sorted((self.term_grams.get(g, set()) for g in required), key=len)
+        terms = sets[0].intersection(*sets[1:])
+
+        if len(query_token) >= NGRAM and not query_token.isdigit():
+            # Typo candidates share enough n-grams with the query
+            needed = max(1, math.ceil(len(grams) * MIN_GRAM_OVERLAP))
+            counts = Counter()
+            for gram in grams:
+                counts.update(self.term_grams.get(gram, ()))
+            terms |= {term for term, n in counts.items() if n >= needed}
+
+        matches = {}
+        for term in terms:
+            score = _match(query_token, grams, term)
+            if score:
+                for field in self.term_fields[term]:
+                    matches[(field, term)] = FIELD_WEIGHTS[field] * score
+        return matches
+
+    def _hidden(self, statuses, exclude_roles) -> set[int]:
+        hidden = set()
+        if statuses is not None:
+            for status, ids in self.by_status.items():
+                if status not in statuses:
+                    hidden |= ids
+        for role in exclude_roles:
+            hidden |= self.by_role.get(role, set())
+        return hidden
+
+    def _score(self, doc_id: int, matches: list[dict]) -> float:
+        doc = self.docs[doc_id]
+        return sum(
+            max((m.get((field, token), 0.0) for field, tokens in doc.fields.items() for token in tokens), default=0.0)
+            for m in matches
+        )
+
+    def search(self, query: str, limit: int = 20, statuses=None, exclude_roles=()) -> list[tuple[int, float]]:
+        """Return (member id, score) pairs, best first, ties by id. Every query token must match."""
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+        matches = [self._terms(t) for t in query_tokens]
+        if not all(matches):
+            return []
+        hidden = self._hidden(statuses, exclude_roles)
+
+        if len(matches) == 1:
+            # Walk score levels best first; a common prefix can match most members,
+            # so only the top of each level is ever materialised in Python
+            levels = defaultdict(list)
+            for key, score in matches[0].items():
+                levels[score].append(self.postings[key])
+            results, seen = [], set(hidden)
+            for score in sorted(levels, reverse=True):
+                ids = set().union(*levels[score]) - seen
+                results += [(doc_id, score) for doc_id in heapq.nsmallest(limit - len(results), ids)]
+                if len(results) >= limit:
+                    break
+                seen |= ids
+            return [(doc_id, round(score, 3)) for doc_id, score in results]
+
+        member_sets = sorted((set().union(*(self.postings[k] for k in m)) for m in matches), key=len)
+        candidates = member_sets[0].intersection(*member_sets[1:]) - hidden
+        ranked = heapq.nsmallest(limit, ((-self._score(doc_id, matches), doc_id) for doc_id in candidates))
+        return [(doc_id, round(-score, 3)) for score, doc_id in ranked]
+
+
+# ─── Process-wide index ───────────────────────────────────────
+
+async def _load(db):
+    villages = (await db.execute(select(models.Village.id, models.Village.name))).all()
+    users = (await db.execute(select(
+        models.User.id, models.User.full_name, models.User.profession, models.User.phone_number,
+        models.User.sabhasad_id, models.User.status, models.User.role, models.User.village_id,
+    ))).all()
+    return villages, users
+
+
+def _build(rows) -> MemberSearchIndex:
+    villages, users = rows
+    index = MemberSearchIndex()
+    index.village_names.update(villages)
+    for user_id, full_name, profession, phone, sabhasad_id, status, role, village_id in users:
+        index.add(MemberDoc(
+            user_id, full_name, status, role, village_id,
+            member_fields(full_name, profession, phone, sabhasad_id, index.village_names.get(village_id)),
+        ))
+    return index
+
+
+_live = LiveIndex("Member search index", _load, _build, SEARCH_INDEX_REFRESH)
+
+
+async def ensure_index():
+    await _live.ensure()
+
+
+def upsert_user(user: models.User):
+    """Reindex a user after a commit. The village must already be loaded."""
+    village_name = user.village.name if user.village is not None else None
+    doc = MemberDoc(
+        user.id, user.full_name, user.status, user.role, user.village_id,
+        member_fields(user.full_name, user.profession, user.phone_number, user.sabhasad_id, village_name),
+    )
+    _live.apply(lambda index: index.add(doc))
+
+
+def remove_user(user_id: int):
+    _live.apply(lambda index: index.remove(user_id))
+
+
+def rename_village(village_id: int, name: str):
+    _live.apply(lambda index: index.rename_village(village_id, name))
+
+
+def search(query: str, limit: int = 20, statuses=None, exclude_roles=()) -> list[tuple[int, float]]:
+    return _live.read(lambda index: index.search(query, limit, statuses, exclude_roles), default=[])
+
+
+def clear():
+    _live.clear()
+
+
+def stats() -> dict:
+    counts = _live.read(lambda index: {"members": len(index), "terms": len(index.term_fields)},
+                        default={"members": 0, "terms": 0})
+    return {**counts, **_live.stats()}
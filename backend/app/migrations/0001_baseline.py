@@ -0,0 +1,13 @@
+from ..database import Base
+from .. import models  # noqa: F401  (registers the tables on Base.metadata)
+
+# Brings any existing database to the schema the one-off scripts used to
+# produce (add_address_col.py, migrate_dob.py, run_migration.py) and creates
+# missing tables on a fresh one.
+
+
+def upgrade(op):
+    Base.metadata.create_all(bind=op.conn)
+    op.add_column("users", "address", "VARCHAR")
+    op.add_column("users", "date_of_birth", "DATE")
+    op.add_column("payments", "purpose", "VARCHAR NOT NULL DEFAULT 'general'")
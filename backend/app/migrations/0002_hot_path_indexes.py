@@ -0,0 +1,27 @@
+# Indexes for the filters the hot read paths actually use:
+#   recent-donations / chart  WHERE status = 'completed' ORDER BY created_at
+#   history                   ORDER BY created_at DESC
+#   stats / receipts          payments by user_id
+#   members/ and pending      WHERE status IN (...) [AND village_id = ?]
+#   family/ and family/tree   WHERE user_id = ?; delete reparents by parent_id
+# Built CONCURRENTLY on Postgres so writes are not blocked while they build.
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_payments_user_id", "payments", ["user_id"]),
+    ("ix_payments_created_at", "payments", ["created_at"]),
+    ("ix_payments_status_created_at", "payments", ["status", "created_at"]),
+    ("ix_users_status", "users", ["status"]),
+    ("ix_users_village_id_status", "users", ["village_id", "status"]),
+    ("ix_family_members_user_id", "family_members", ["user_id"]),
+    ("ix_family_members_parent_id", "family_members", ["parent_id"]),
+    ("ix_family_members_linked_user_id", "family_members", ["linked_user_id"]),
+]
+
+
+def upgrade(op):
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for table in ("payments", "users", "family_members"):
+        op.analyze(table)
@@ -0,0 +1,18 @@
+# Keyset pagination for members/ and members/pending: each sort order needs
+# an index on (sort key, id) so a page seeks to its cursor instead of
+# scanning and discarding the earlier rows.
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_users_full_name_id", "users", ["full_name", "id"]),
+    ("ix_users_created_at_id", "users", ["created_at", "id"]),
+    ("ix_users_village_id_full_name_id", "users", ["village_id", "full_name", "id"]),
+    ("ix_users_status_created_at_id", "users", ["status", "created_at", "id"]),
+]
+
+
+def upgrade(op):
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    op.analyze("users")
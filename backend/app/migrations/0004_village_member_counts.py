@@ -0,0 +1,12 @@
+# Denormalized member counts on villages, so /villages/ reads one table
+# instead of joining and grouping every user. Maintained by the flush hook in
+# app/village_counts.py; filled here from the current users.
+from .. import village_counts
+
+COLUMNS = ["member_count", "pending_count", "approved_count", "sabhasad_count"]
+
+
+def upgrade(op):
+    for column in COLUMNS:
+        op.add_column("villages", column, "INTEGER NOT NULL DEFAULT 0")
+    village_counts.recount(op.conn)
@@ -0,0 +1,9 @@
+# Counter rows for identifiers handed out in sequence. Sabhasad IDs used to
+# be derived from the highest existing ID on every membership payment; the
+# counter starts from that value once, here. See app/sabhasad_ids.py.
+from .. import models, sabhasad_ids
+
+
+def upgrade(op):
+    models.IdCounter.__table__.create(bind=op.conn, checkfirst=True)
+    sabhasad_ids.seed(op.conn)
@@ -0,0 +1,9 @@
+# Per-purpose, per-day and per-donor totals of completed payments, so
+# /payments/stats reads a handful of rows. Maintained by the flush hook in
+# app/payment_rollups.py; backfilled here from the existing payments.
+from .. import models, payment_rollups
+
+
+def upgrade(op):
+    models.PaymentRollup.__table__.create(bind=op.conn, checkfirst=True)
+    payment_rollups.recount(op.conn)
@@ -0,0 +1,19 @@
+# Keyset pagination for payments/history (newest first, optionally per user)
+# and payments/me. The pages select only the columns in schemas.Payment, so
+# carrying them in the index lets Postgres answer a page with an index-only
+# scan instead of visiting the heap for every row.
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_payments_created_at_id", "payments", ["created_at", "id"],
+     ["user_id", "amount", "purpose", "status", "transaction_id"]),
+    ("ix_payments_user_id_created_at_id", "payments", ["user_id", "created_at", "id"],
+     ["amount", "purpose", "status", "transaction_id"]),
+]
+
+
+def upgrade(op):
+    for name, table, columns, include in INDEXES:
+        op.create_index(name, table, columns, include=include)
+    op.analyze("payments")
@@ -0,0 +1,11 @@
+# recent-donations sorted by amount: completed payments in amount order come
+# straight off (status, amount) with a LIMIT, instead of sorting every
+# completed payment. The date sort and the half-open date ranges already
+# use (status, created_at) from 0002.
+
+TRANSACTIONAL = False
+
+
+def upgrade(op):
+    op.create_index("ix_payments_status_amount", "payments", ["status", "amount"])
+    op.analyze("payments")
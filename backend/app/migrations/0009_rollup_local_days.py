@@ -0,0 +1,7 @@
+# Day rollups are keyed by the calendar day in APP_TIMEZONE (they were UTC
+# days). Recounting moves every payment to its local day and drops the old keys.
+from .. import payment_rollups
+
+
+def upgrade(op):
+    payment_rollups.recount(op.conn)
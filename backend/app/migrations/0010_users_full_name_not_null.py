@@ -0,0 +1,15 @@
+# The directory pages by (full_name, id). A row comparison against a NULL
+# name is never true, so a NULL full_name dropped that member from every
+# page and, as the last row of a page, produced a cursor that matched
+# nothing. Every account has a name (UserCreate requires one); blank out the
+# stragglers and make the column NOT NULL so the (full_name, id) indexes
+# keep serving the sort.
+#
+# SQLite cannot add NOT NULL to an existing column; there the backfill and
+# the check in PATCH /auth/me keep NULLs out.
+
+
+def upgrade(op):
+    op.execute("UPDATE users SET full_name = '' WHERE full_name IS NULL")
+    if op.dialect == "postgresql":
+        op.execute("ALTER TABLE users ALTER COLUMN full_name SET NOT NULL")
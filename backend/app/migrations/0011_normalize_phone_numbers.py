@@ -0,0 +1,35 @@
+# Phone numbers are normalized when written (identifiers.normalize_phone) and
+# login looks them up in that form; rewrite the numbers stored before that, so
+# "98765 43210" matches "9876543210" and the unique index compares like with
+# like. Numbers that would collide after normalization are left as they are
+# and listed, for an admin to merge or correct; identifiers.phone_candidates
+# still finds them by the raw value.
+from collections import defaultdict
+from sqlalchemy import bindparam, update
+from .. import models
+from ..identifiers import normalize_phone
+
+
+def upgrade(op):
+    users = models.User.__table__
+    rows = op.execute("SELECT id, phone_number FROM users WHERE phone_number IS NOT NULL").all()
+    by_number = defaultdict(list)
+    for user_id, phone in rows:
+        by_number[normalize_phone(phone)].append((user_id, phone))
+
+    changes = []
+    for number, owners in by_number.items():
+        if len(owners) > 1:
+            listing = ", ".join(f"user {user_id} {phone!r}" for user_id, phone in owners)
+            print(f"WARNING: phone number {number!r} is shared after normalization, left unchanged: {listing}")
+            continue
+        user_id, phone = owners[0]
+        if phone != number:
+            changes.append({"user_id": user_id, "number": number})
+
+    if changes:
+        op.conn.execute(
+            update(users).where(users.c.id == bindparam("user_id")).values(phone_number=bindparam("number")),
+            changes,
+        )
+    print(f"  normalized {len(changes)} phone number(s)")
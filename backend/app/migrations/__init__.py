@@ -0,0 +1,162 @@
+import importlib
+import pkgutil
+import re
+import time
+from dataclasses import dataclass
+from sqlalchemy import inspect, text
+
+# Versioned schema migrations.
+#
+# Each module in this package is named NNNN_description.py and defines
+# `upgrade(op)`. Applied versions are recorded in schema_migrations, so
+# `python migrate.py` only runs what is new. Migrations must be idempotent
+# where they touch objects that older databases may already have (the
+# Operations helpers below check first).
+#
+# Modules that set TRANSACTIONAL = False run in autocommit mode. That is
+# required for CREATE INDEX CONCURRENTLY on Postgres, which builds the index
+# without blocking writes to the table but cannot run inside a transaction.
+
+MIGRATIONS_TABLE = "schema_migrations"
+# Serializes concurrent runs (e.g. several instances deploying at once)
+ADVISORY_LOCK_ID = 0x76696C6C  # "vill"
+
+_MODULE_RE = re.compile(r"^(\d{4})_(\w+)$")
+
+
+@dataclass
+class Migration:
+    version: str
+    name: str
+    module: object
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+
+def discover() -> list[Migration]:
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        migrations.append(Migration(version=match.group(1), name=match.group(2), module=module))
+    return sorted(migrations, key=lambda m: m.version)
+
+
+class Operations:
+    """Schema helpers handed to each migration's upgrade()."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+
+    def execute(self, sql: str, **params):
+        return self.conn.execute(text(sql), params)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(c["name"] == column for c in inspect(self.conn).get_columns(table))
+
+    def add_column(self, table: str, column: str, ddl: str):
+        """ALTER TABLE ... ADD COLUMN unless the column already exists."""
+        if not self.has_column(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    def create_index(self, name: str, table: str, columns: list[str], unique: bool = False, where: str | None = None,
+                     include: list[str] | None = None):
+        """Create an index without locking writes where the database supports it.
+
+        `include` adds non-key columns so the index covers a query (INCLUDE on
+        Postgres; appended to the key elsewhere).
+        """
+        unique_sql = "UNIQUE " if unique else ""
+        where_sql = f" WHERE {where}" if where else ""
+        cols = ", ".join(columns)
+        if include and self.dialect == "postgresql":
+            where_sql = f" INCLUDE ({', '.join(include)}){where_sql}"
+        elif include:
+            cols = ", ".join(columns + include)
+        if self.dialect == "postgresql":
+            # A failed CONCURRENTLY build leaves an INVALID index behind that
+            # IF NOT EXISTS would happily skip, so drop it and build again.
+            invalid = self.execute(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid",
+                name=name,
+            ).first()
+            if invalid:
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            self.execute(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols}){where_sql}")
+        else:
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({cols}){where_sql}")
+
+    def drop_index(self, name: str):
+        concurrently = "CONCURRENTLY " if self.dialect == "postgresql" else ""
+        self.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+    def analyze(self, table: str):
+        self.execute(f"ANALYZE {table}")
+
+
+def _ensure_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            "version VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, applied_at FLOAT NOT NULL)"
+        ))
+
+
+def applied_versions(engine) -> set[str]:
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+
+def _record(conn, migration: Migration):
+    conn.execute(
+        text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+        {"version": migration.version, "name": migration.name, "applied_at": time.time()},
+    )
+
+
+def _apply(engine, migration: Migration):
+    if migration.transactional:
+        with engine.begin() as conn:
+            migration.module.upgrade(Operations(conn))
+            _record(conn, migration)
+        return
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        migration.module.upgrade(Operations(conn))
+        _record(conn, migration)
+
+
+def upgrade(engine, log=print) -> list[Migration]:
+    """Apply every pending migration in version order. Returns what was applied."""
+    lock_conn = None
+    if engine.dialect.name == "postgresql":
+        lock_conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+    try:
+        done = applied_versions(engine)
+        applied = []
+        for migration in discover():
+            if migration.version in done:
+                continue
+            log(f"Applying {migration.version}_{migration.name}...")
+            start = time.perf_counter()
+            _apply(engine, migration)
+            log(f"  done in {time.perf_counter() - start:.2f}s")
+            applied.append(migration)
+        return applied
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+            lock_conn.close()
+
+
+def status(engine) -> list[tuple[Migration, bool]]:
+    done = applied_versions(engine)
+    return [(migration, migration.version in done) for migration in discover()]
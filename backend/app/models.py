@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Date
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -9,6 +9,11 @@ class Village(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     district = Column(String)
+    # Maintained by app/village_counts.py; member_count covers every status
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_count = Column(Integer, nullable=False, default=0, server_default="0")
+    approved_count = Column(Integer, nullable=False, default=0, server_default="0")
+    sabhasad_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     users = relationship("User", back_populates="village")
 
@@ -18,11 +23,11 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False) # Primary login pre-payment
     hashed_password = Column(String)
-    full_name = Column(String)
+    full_name = Column(String, nullable=False) # directory keyset sort key
     phone_number = Column(String, unique=True, index=True, nullable=True)
     address = Column(String, nullable=True)
     role = Column(String, default="user") # user, admin
-    status = Column(String, default="pending") # pending, approved, member, rejected
+    status = Column(String, default="pending", index=True) # pending, approved, member, rejected
     profession = Column(String, nullable=True)
     date_of_birth = Column(Date, nullable=True)
     admin_comment = Column(String, nullable=True) # Admin approval/rejection comment
@@ -33,7 +38,20 @@ class User(Base):
     village_id = Column(Integer, ForeignKey("villages.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    village = relationship("Village", back_populates="users")
+    # Indexes are created by migrations (app/migrations); keep these in sync
+    __table_args__ = (
+        Index("ix_users_village_id_status", "village_id", "status"), # members/?village_id=
+        # Keyset pagination sort keys (members/, members/pending)
+        Index("ix_users_full_name_id", "full_name", "id"),
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_village_id_full_name_id", "village_id", "full_name", "id"),
+        Index("ix_users_status_created_at_id", "status", "created_at", "id"),
+    )
+
+    # UserResponse embeds the village: routes must eager-load it (joinedload /
+    # selectinload), and a forgotten load raises instead of issuing one
+    # SELECT per serialized user.
+    village = relationship("Village", back_populates="users", lazy="raise_on_sql")
     payments = relationship("Payment", back_populates="user")
     
     # Optional relation to see which family members link to this user account
@@ -43,13 +61,25 @@ class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     amount = Column(Float)
     currency = Column(String, default="INR")
     status = Column(String, default="completed")
     purpose = Column(String, default="general", nullable=False)
     transaction_id = Column(String, unique=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_payments_status_created_at", "status", "created_at"), # recent-donations, chart
+        Index("ix_payments_status_amount", "status", "amount"), # recent-donations?sort_by=amount
+        # Covering indexes for payments/history and payments/me (see migration 0007)
+        Index("ix_payments_created_at_id", "created_at", "id",
+              postgresql_include=["user_id", "amount", "purpose", "status", "transaction_id"]),
+        Index("ix_payments_user_id_created_at_id", "user_id", "created_at", "id",
+              postgresql_include=["amount", "purpose", "status", "transaction_id"]),
+    )
+    # Read created_at back in the INSERT (RETURNING) so the rollup hook has its day
+    __mapper_args__ = {"eager_defaults": True}
 
     user = relationship("User", back_populates="payments")
 
@@ -69,17 +99,45 @@ class FamilyMember(Base):
     __tablename__ = "family_members"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False) # Owner of the tree
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True) # Owner of the tree
     name = Column(String, nullable=False)
     relation = Column(String, nullable=False)  # Father, Mother, Son, Daughter, Spouse, etc.
-    parent_id = Column(Integer, ForeignKey("family_members.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("family_members.id"), nullable=True, index=True)
     gender = Column(String, default="male")  # male, female
     age = Column(Integer, nullable=True)
     profession = Column(String, nullable=True)
-    linked_user_id = Column(Integer, ForeignKey("users.id"), nullable=True) # Direct link to another community member
+    linked_user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True) # Direct link to another community member
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", foreign_keys=[user_id], backref="family_members")
     linked_user = relationship("User", foreign_keys=[linked_user_id], back_populates="linked_family_members")
     children = relationship("FamilyMember", backref="parent", remote_side=[id])
 
+class OtpCode(Base):
+    __tablename__ = "otp_codes"
+
+    key = Column(String, primary_key=True) # Identifier, e.g. email, phone or "reset_<email>"
+    otp = Column(String, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True) # Unix timestamp
+    attempts = Column(Integer, default=0, nullable=False) # Failed verification attempts
+
+class IdCounter(Base):
+    __tablename__ = "id_counters"
+
+    # One row per allocated identifier series, e.g. "sabhasad"; see app/sabhasad_ids.py
+    name = Column(String, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0, server_default="0")
+
+class PaymentRollup(Base):
+    __tablename__ = "payment_rollups"
+
+    # Completed-payment totals maintained by app/payment_rollups.py.
+    # dimension is "purpose", "day" (key: ISO date) or "donor" (key: user id)
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    payments = Column(Integer, nullable=False, default=0, server_default="0")
+    amount = Column(Float, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_payment_rollups_dimension_amount", "dimension", "amount"), # top donor
+    )
@@ -0,0 +1,192 @@
+import heapq
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import case, create_engine, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from . import models
+
+# OTPs must be visible to every worker: with gunicorn the OTP is often
+# requested on one worker and verified on another. OTP_STORE picks the backend:
+#   "database" (default) — the otp_codes table, shared by all workers and hosts.
+#                          OTP_STORE_URL may point it at a separate database,
+#                          e.g. sqlite:////tmp/otp.db for a single-host file.
+#   "memory"             — per-process dict with an expiry heap (single worker / dev).
+OTP_STORE = os.getenv("OTP_STORE", "database")
+OTP_STORE_URL = os.getenv("OTP_STORE_URL", "")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "300"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+
+# Results of OtpStore.verify()
+OTP_OK = "ok"
+OTP_MISSING = "missing"
+OTP_EXPIRED = "expired"
+OTP_INVALID = "invalid"
+OTP_LOCKED = "locked"
+
+
+@dataclass
+class OtpEntry:
+    otp: str
+    expires_at: float
+    attempts: int = 0
+
+
+class OtpStore(ABC):
+    """Interface shared by the OTP backends.
+
+    verify() checks and, on success, consumes an OTP in one atomic step, so
+    a correct OTP logs in exactly one request and parallel wrong guesses
+    cannot slip past OTP_MAX_ATTEMPTS. A locked key stays locked until its
+    OTP expires: put() leaves it alone, and a new OTP for a key that is not
+    locked keeps the attempts already made.
+    """
+
+    @abstractmethod
+    def put(self, key: str, otp: str, ttl: int = OTP_TTL_SECONDS):
+        """Issue an OTP for `key`, replacing any earlier one unless the key is locked."""
+
+    @abstractmethod
+    def verify(self, key: str, otp: str) -> str:
+        """OTP_OK (and the OTP is consumed), or why it was refused."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove expired entries. Returns how many were removed."""
+
+
+class MemoryOtpStore(OtpStore):
+    """Per-process store. Expired entries are swept from a min-heap in O(log n)."""
+
+    def __init__(self):
+        self._entries: dict[str, OtpEntry] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def _sweep_locked(self, now: float) -> int:
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            # Skip heap items left behind by a re-issued OTP
+            if entry is not None and entry.expires_at == expires_at:
+                del self._entries[key]
+                removed += 1
+        return removed
+
+    def put(self, key: str, otp: str, ttl: int = OTP_TTL_SECONDS):
+        now = time.time()
+        with self._lock:
+            self._sweep_locked(now)
+            previous = self._entries.get(key)
+            attempts = previous.attempts if previous is not None else 0
+            if attempts >= OTP_MAX_ATTEMPTS:
+                return
+            entry = OtpEntry(otp=otp, expires_at=now + ttl, attempts=attempts)
+            self._entries[key] = entry
+            heapq.heappush(self._heap, (entry.expires_at, key))
+
+    def verify(self, key: str, otp: str) -> str:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return OTP_MISSING
+            if time.time() > entry.expires_at:
+                del self._entries[key]
+                return OTP_EXPIRED
+            if entry.attempts >= OTP_MAX_ATTEMPTS:
+                return OTP_LOCKED
+            if entry.otp != otp:
+                entry.attempts += 1
+                return OTP_LOCKED if entry.attempts >= OTP_MAX_ATTEMPTS else OTP_INVALID
+            del self._entries[key]
+            return OTP_OK
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_locked(time.time())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseOtpStore(OtpStore):
+    """Store shared by all workers, backed by the otp_codes table."""
+
+    # Expired rows are deleted at most this often, using the expires_at index.
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.table = models.OtpCode.__table__
+        self._last_sweep = 0.0
+
+    def _reissue(self, conn, key: str, otp: str, now: float, ttl: int) -> bool:
+        """New OTP on an existing row, unless it is locked. Attempts survive unless it had expired."""
+        t = self.table
+        result = conn.execute(
+            update(t)
+            .where(t.c.key == key, or_(t.c.attempts < OTP_MAX_ATTEMPTS, t.c.expires_at < now))
+            .values(
+                otp=otp,
+                expires_at=now + ttl,
+                attempts=case((t.c.expires_at < now, 0), else_=t.c.attempts),
+            )
+        )
+        return bool(result.rowcount)
+
+    def put(self, key: str, otp: str, ttl: int = OTP_TTL_SECONDS):
+        now = time.time()
+        if now - self._last_sweep > self.SWEEP_INTERVAL:
+            self.sweep()
+        with self.engine.begin() as conn:
+            if self._reissue(conn, key, otp, now, ttl):
+                return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.table).values(key=key, otp=otp, expires_at=now + ttl, attempts=0))
+        except IntegrityError:
+            # The row exists: locked (leave it), or inserted by another worker just now
+            with self.engine.begin() as conn:
+                self._reissue(conn, key, otp, now, ttl)
+
+    def verify(self, key: str, otp: str) -> str:
+        t = self.table
+        now = time.time()
+        live = (t.c.key == key, t.c.expires_at >= now, t.c.attempts < OTP_MAX_ATTEMPTS)
+        with self.engine.begin() as conn:
+            # Only one of several requests with the right OTP gets the row back
+            if conn.execute(delete(t).where(*live, t.c.otp == otp).returning(t.c.key)).first():
+                return OTP_OK
+            attempts = conn.execute(
+                update(t).where(*live).values(attempts=t.c.attempts + 1).returning(t.c.attempts)
+            ).scalar()
+            if attempts is not None:
+                return OTP_LOCKED if attempts >= OTP_MAX_ATTEMPTS else OTP_INVALID
+            # Neither: say why
+            row = conn.execute(select(t.c.expires_at, t.c.attempts).where(t.c.key == key)).first()
+            if row is None:
+                return OTP_MISSING
+            if row.expires_at < now:
+                conn.execute(delete(t).where(t.c.key == key))
+                return OTP_EXPIRED
+            return OTP_LOCKED
+
+    def sweep(self) -> int:
+        self._last_sweep = time.time()
+        with self.engine.begin() as conn:
+            result = conn.execute(delete(self.table).where(self.table.c.expires_at < self._last_sweep))
+        return result.rowcount
+
+
+def create_otp_store() -> OtpStore:
+    if OTP_STORE == "memory":
+        return MemoryOtpStore()
+    if OTP_STORE_URL:
+        engine = create_engine(OTP_STORE_URL)
+        models.OtpCode.__table__.create(bind=engine, checkfirst=True)
+    else:
+        from .database import engine
+    return DatabaseOtpStore(engine)
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, text, tuple_
+
+# Keyset (cursor) pagination helpers.
+#
+# A page is fetched with WHERE (sort_key, id) > (:last_sort_key, :last_id)
+# ORDER BY sort_key, id LIMIT n, which an index on (sort_key, id) answers by
+# seeking straight to the cursor — page 1000 costs the same as page 1,
+# unlike OFFSET which reads and discards every earlier row.
+#
+# List endpoints keep returning a plain JSON array; the cursor and optional
+# total travel in response headers so existing clients keep working.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_EXACT_HEADER = "X-Total-Count-Exact"
+
+
+def encode_cursor(values: list) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset(query, columns: list, cursor: str | None, limit: int, descending: bool = False):
+    """Order `query` by `columns` and start after `cursor`. Fetches limit + 1 rows
+    so the caller can tell whether another page exists."""
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        for i, column in enumerate(columns):
+            # Cursor values come back from JSON; restore datetimes for the comparison
+            if isinstance(values[i], str) and column.type.python_type is datetime:
+                try:
+                    values[i] = datetime.fromisoformat(values[i])
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+        key = tuple_(*columns)
+        query = query.where(key < tuple_(*values) if descending else key > tuple_(*values))
+    order = [c.desc() for c in columns] if descending else list(columns)
+    return query.order_by(*order).limit(limit + 1)
+
+
+def page(rows: list, limit: int, key) -> tuple[list, str | None]:
+    """Trim the extra row fetched by keyset() and build the next cursor from `key(row)`."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
+
+
+async def count(db, query, exact: bool) -> tuple[int, bool]:
+    """Row count for `query`. When not exact and on Postgres, use the planner's
+    estimate instead of counting, which is constant-time on large tables."""
+    count_query = select(func.count()).select_from(query.order_by(None).subquery())
+
+    def estimate(session):
+        bind = session.get_bind()
+        if bind.dialect.name != "postgresql":
+            return None
+        compiled = count_query.compile(bind, compile_kwargs={"literal_binds": True})
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        # The aggregate's input node carries the row estimate for the filter
+        node = plan[0]["Plan"]
+        while node.get("Plans") and node.get("Node Type") in ("Aggregate", "Subquery Scan"):
+            node = node["Plans"][0]
+        return int(node["Plan Rows"])
+
+    if not exact:
+        estimated = await db.run_sync(estimate)
+        if estimated is not None:
+            return estimated, False
+    return await db.scalar(count_query), True
+
+
+def set_page_headers(response: Response, next_cursor: str | None, total: tuple[int, bool] | None = None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total[0])
+        response.headers[TOTAL_EXACT_HEADER] = "true" if total[1] else "false"
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from passlib.context import CryptContext
+
+# bcrypt is deliberately slow (tens of ms per call). Running it inline in a
+# request holds one of AnyIO's threadpool slots for that whole time, so a burst
+# of logins starves every other sync route. Hashing instead runs on a
+# dedicated, size-bounded executor that async endpoints await.
+#
+# HASH_POOL_KIND=process sidesteps the GIL for CPU-bound work; "thread" is the
+# default because bcrypt releases the GIL and threads start instantly.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread")
+
+
+def build_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    # Pinning min/max rounds to the configured cost makes needs_update() flag
+    # hashes made with any other cost, so they get rehashed on next login.
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+pwd_context = build_context()
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+_pool_size = HASH_POOL_SIZE
+_pool_kind = HASH_POOL_KIND
+
+
+# Worker functions live at module level so they can be pickled for a process pool.
+_worker_contexts: dict = {}
+
+def _worker_context(rounds: int) -> CryptContext:
+    context = _worker_contexts.get(rounds)
+    if context is None:
+        context = _worker_contexts[rounds] = build_context(rounds)
+    return context
+
+def _hash_worker(password: str, rounds: int) -> str:
+    return _worker_context(rounds).hash(password)
+
+def _verify_and_update_worker(password: str, hashed_password: str, rounds: int):
+    return _worker_context(rounds).verify_and_update(password, hashed_password)
+
+
+def configure(size: int | None = None, kind: str | None = None):
+    """Replace the hashing executor. Used by the benchmark and at shutdown."""
+    global _pool_size, _pool_kind
+    shutdown()
+    if size is not None:
+        _pool_size = size
+    if kind is not None:
+        _pool_kind = kind
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if _pool_kind == "process":
+                    _executor = ProcessPoolExecutor(max_workers=_pool_size)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=_pool_size, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _hash_worker, password, BCRYPT_ROUNDS)
+
+
+async def verify_and_update(password: str, hashed_password: str):
+    """Return (valid, new_hash). new_hash is set when the stored cost is outdated."""
+    if not hashed_password:
+        return False, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), _verify_and_update_worker, password, hashed_password, BCRYPT_ROUNDS
+    )
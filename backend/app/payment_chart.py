@@ -0,0 +1,180 @@
+import os
+from datetime import date, timedelta
+from sqlalchemy import DateTime, case, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from . import local_time, models
+
+# Cumulative donation chart for /payments/chart.
+#
+# Running totals are window sums computed by the database, so only the points
+# that are returned leave it. Histories longer than max_points are first
+# bucketed in SQL (hour, day or month: the finest one that keeps the bucket
+# count near the budget) and then thinned to exactly max_points with
+# Largest-Triangle-Three-Buckets, which keeps the visual shape of the curve
+# (steps and spikes) rather than sampling every n-th point.
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+
+RAW = "raw"
+AUTO = "auto"
+BUCKETS = {"hour": timedelta(hours=1), "day": timedelta(days=1), "month": timedelta(days=31)}
+RESOLUTIONS = (AUTO, RAW, *BUCKETS)
+
+# How many buckets auto may fetch per returned point before LTTB thins them
+_AUTO_OVERSAMPLE = 4
+
+
+class date_bucket(FunctionElement):
+    """Start of the hour/day/month (in APP_TIMEZONE) containing a timestamp, as an instant."""
+
+    type = DateTime(timezone=True)
+    inherit_cache = True
+    # The unit and zone are part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [
+        ("unit", InternalTraversal.dp_string),
+        ("zone", InternalTraversal.dp_string),
+    ]
+
+    def __init__(self, unit: str, timestamp, zone: str = local_time.APP_TIMEZONE):
+        if unit not in BUCKETS:
+            raise ValueError(f"unknown bucket {unit!r}")
+        self.unit = unit
+        self.zone = zone
+        super().__init__(timestamp)
+
+
+@compiles(date_bucket, "postgresql")
+def _date_bucket_postgresql(element, compiler, **kw):
+    # Unit and zone are inlined, not bound, so GROUP BY matches the selected
+    # expression; both come from fixed settings, never from the request
+    zone = element.zone.replace("'", "''")
+    timestamp = compiler.process(element.clauses, **kw)
+    return f"(date_trunc('{element.unit}', {timestamp} AT TIME ZONE '{zone}') AT TIME ZONE '{zone}')"
+
+
+_SQLITE_FORMATS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00", "month": "%Y-%m-01 00:00:00"}
+
+
+@compiles(date_bucket)
+def _date_bucket_default(element, compiler, **kw):
+    # SQLite has no named zones: shift by the zone's current UTC offset (exact
+    # for zones without daylight saving, such as Asia/Kolkata)
+    offset = local_time.utc_offset_minutes()
+    timestamp = compiler.process(element.clauses, **kw)
+    local = f"strftime('{_SQLITE_FORMATS[element.unit]}', {timestamp}, '{offset:+d} minutes')"
+    return f"datetime({local}, '{-offset:+d} minutes')"
+
+
+def chart_filters(start_date: date | None = None, end_date: date | None = None,
+                  month: int | None = None, year: int | None = None, years: range | None = None) -> list:
+    """Completed payments in the requested period (see local_time.created_at_filters)."""
+    return [
+        models.Payment.status == "completed",
+        *local_time.created_at_filters(models.Payment.created_at, start_date, end_date, month, year, years),
+    ]
+
+
+def years_query():
+    """First and last completed payment: index seeks on (status, created_at)."""
+    created_at = models.Payment.created_at
+    return select(func.min(created_at), func.max(created_at)).where(models.Payment.status == "completed")
+
+
+def years_between(first, last) -> range:
+    if first is None:
+        return range(0)
+    return range(local_time.local_date(first).year, local_time.local_date(last).year + 1)
+
+
+def span_query(filters: list):
+    """Number of matching payments and the time range they cover."""
+    created_at = models.Payment.created_at
+    return select(func.count(models.Payment.id), func.min(created_at), func.max(created_at)).where(*filters)
+
+
+def points_query(user_id: int, filters: list, resolution: str = RAW):
+    """(timestamp, donation_amount, amount, personal_amount) rows in time order.
+
+    `amount` and `personal_amount` are running totals up to and including the
+    point; with a bucket resolution, donation_amount is the bucket's sum.
+    """
+    payment = models.Payment
+    personal = case((payment.user_id == user_id, payment.amount), else_=0)
+    if resolution == RAW:
+        window = {"order_by": (payment.created_at, payment.id), "rows": (None, 0)}
+        return (
+            select(
+                payment.created_at.label("timestamp"),
+                payment.amount.label("donation_amount"),
+                func.sum(payment.amount).over(**window).label("amount"),
+                func.sum(personal).over(**window).label("personal_amount"),
+            )
+            .where(*filters)
+            .order_by(payment.created_at, payment.id)
+        )
+
+    bucket = date_bucket(resolution, payment.created_at)
+    buckets = (
+        select(
+            bucket.label("timestamp"),
+            func.sum(payment.amount).label("donation_amount"),
+            func.sum(personal).label("personal"),
+        )
+        .where(*filters)
+        .group_by(bucket)
+        .subquery()
+    )
+    window = {"order_by": buckets.c.timestamp}
+    return select(
+        buckets.c.timestamp,
+        buckets.c.donation_amount,
+        func.sum(buckets.c.donation_amount).over(**window).label("amount"),
+        func.sum(buckets.c.personal).over(**window).label("personal_amount"),
+    ).order_by(buckets.c.timestamp)
+
+
+def pick_resolution(count: int, first, last, max_points: int) -> str:
+    """Finest resolution whose point count stays within a few times max_points."""
+    if count <= max_points or first is None:
+        return RAW
+    span = last - first
+    for unit, width in BUCKETS.items():
+        if span / width <= max_points * _AUTO_OVERSAMPLE:
+            return unit
+    return "month"
+
+
+def lttb(points: list, threshold: int, x, y) -> list:
+    """Largest-Triangle-Three-Buckets: keep `threshold` points that preserve the curve's shape.
+
+    The first and last points are always kept. The rest are split into
+    threshold - 2 equal buckets, and from each the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    """
+    size = len(points)
+    if threshold >= size or threshold < 3:
+        return points
+    xs = [x(p) for p in points]
+    ys = [y(p) for p in points]
+    every = (size - 2) / (threshold - 2)
+    kept = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        # Average of the next bucket (just the last point for the final bucket)
+        span = range(end, next_end) if end < next_end else range(size - 1, size)
+        avg_x = sum(xs[j] for j in span) / len(span)
+        avg_y = sum(ys[j] for j in span) / len(span)
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(points[best])
+        a = best
+    kept.append(points[-1])
+    return kept
@@ -0,0 +1,152 @@
+import os
+import threading
+from dataclasses import dataclass
+from cachetools import TTLCache
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from . import member_filter, member_search, models, sabhasad_ids, user_cache
+
+# Recording a captured Razorpay payment. The browser's verify calls and the
+# gateway's webhook (app/razorpay_webhook.py) both land here, often for the
+# same payment and sometimes at the same moment, so recording is idempotent
+# on transaction_id (the Razorpay payment id):
+#
+# - ids recorded or queued recently by this process are kept in a TTL cache,
+#   so a redelivered webhook is dropped without a query (claim());
+# - record() looks the id up on its unique index before inserting;
+# - two inserts that race past that lookup meet the unique constraint, and
+#   the loser rolls back and returns the winner's row instead of a 500.
+RECENT_PAYMENT_IDS_TTL = int(os.getenv("RECENT_PAYMENT_IDS_TTL", "3600"))
+RECENT_PAYMENT_IDS_MAXSIZE = int(os.getenv("RECENT_PAYMENT_IDS_MAXSIZE", "100000"))
+MEMBERSHIP_PURPOSE = "membership_fee"
+
+_lock = threading.Lock()
+_recent = TTLCache(maxsize=RECENT_PAYMENT_IDS_MAXSIZE, ttl=RECENT_PAYMENT_IDS_TTL)
+
+
+def claim(transaction_id: str) -> bool:
+    """Mark a payment id as being handled. False if it was recorded or claimed recently."""
+    with _lock:
+        if transaction_id in _recent:
+            return False
+        _recent[transaction_id] = True
+        return True
+
+
+def release(transaction_id: str):
+    """Forget a claim whose recording failed, so a redelivery is processed."""
+    with _lock:
+        _recent.pop(transaction_id, None)
+
+
+def _remember(transaction_id: str):
+    with _lock:
+        _recent[transaction_id] = True
+
+
+def clear():
+    with _lock:
+        _recent.clear()
+
+
+@dataclass
+class Recorded:
+    payment: models.Payment
+    # False when the payment was already recorded (a retry, or the other path won)
+    created: bool
+    # Membership payments: the payer, upgraded if they were approved. None
+    # if the payer no longer exists or the payment has no user.
+    user: models.User | None = None
+    # Event donations: the event's total after this payment
+    event_raised: float | None = None
+
+
+async def find(db, transaction_id: str) -> models.Payment | None:
+    return await db.scalar(select(models.Payment).where(models.Payment.transaction_id == transaction_id))
+
+
+async def _existing(db, payment: models.Payment, purpose: str, event_id: int | None) -> Recorded:
+    _remember(payment.transaction_id)
+    user = event_raised = None
+    # Load the payer for a membership retry even when the stored row has another purpose
+    if MEMBERSHIP_PURPOSE in (purpose, payment.purpose) and payment.user_id is not None:
+        user = await db.get(models.User, payment.user_id, options=[joinedload(models.User.village)],
+                            populate_existing=True)
+    if event_id is not None:
+        event_raised = await db.scalar(select(models.DonationEvent.raised).where(models.DonationEvent.id == event_id))
+    return Recorded(payment, False, user, event_raised)
+
+
+async def _grant_membership(db, user_id: int) -> models.User | None:
+    """Give an approved user their Sabhasad ID and member status, in the caller's transaction."""
+    # Claim the user's row before reading it: a second membership payment for
+    # the same user waits here, then sees the ID and records its payment
+    # without taking a second number. A no-op UPDATE rather than SELECT ...
+    # FOR UPDATE, so that SQLite takes its write lock here as well.
+    users = models.User.__table__
+    await db.execute(
+        update(users).where(users.c.id == user_id).values(sabhasad_id=users.c.sabhasad_id)
+    )
+    # Read the row as it is now, over any user_cache snapshot already in the
+    # session: the status it started from decides the village count deltas
+    user = await db.get(models.User, user_id, options=[joinedload(models.User.village)], populate_existing=True)
+    if user is None:
+        return None
+    if user.sabhasad_id:
+        return user  # already a member: record the payment only
+    if user.status == "approved":
+        user.sabhasad_id = await sabhasad_ids.allocate(db)
+        user.status = "member"
+    else:
+        print(f"⚠️  Membership payment for user {user_id} with status {user.status!r}: recorded, not upgraded")
+    return user
+
+
+async def record(db, transaction_id: str, amount: float, purpose: str, user_id: int | None,
+                 event_id: int | None = None) -> Recorded:
+    """Record a captured payment once, apply its side effects and commit.
+
+    Membership payments upgrade the payer; event donations add to the
+    event's raised total. A transaction_id that is already recorded returns
+    the stored payment (created=False) and changes nothing.
+    """
+    existing = await find(db, transaction_id)
+    if existing is not None:
+        return await _existing(db, existing, purpose, event_id)
+
+    payment = models.Payment(
+        user_id=user_id,
+        amount=amount,
+        transaction_id=transaction_id,
+        status="completed",
+        purpose=purpose
+    )
+    db.add(payment)
+    user = event_raised = None
+    if purpose == MEMBERSHIP_PURPOSE and user_id is not None:
+        user = await _grant_membership(db, user_id)
+    if event_id is not None:
+        events = models.DonationEvent.__table__
+        event_raised = await db.scalar(
+            update(events).where(events.c.id == event_id)
+            .values(raised=func.coalesce(events.c.raised, 0) + amount)
+            .returning(events.c.raised)
+        )
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        existing = await find(db, transaction_id)
+        if existing is None:
+            raise
+        return await _existing(db, existing, purpose, event_id)
+
+    _remember(transaction_id)
+    if user_id is not None:
+        member_filter.mark_paid(user_id)
+    if user is not None:
+        user_cache.invalidate_user(user)
+        member_search.upsert_user(user)
+        member_filter.upsert_user(user)
+    return Recorded(payment, True, user, event_raised)
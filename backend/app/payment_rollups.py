@@ -0,0 +1,178 @@
+from collections import defaultdict
+from sqlalchemy import Integer, cast, delete, event, func, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import local_time, models
+from .payment_chart import date_bucket
+
+# Running totals of completed payments, per purpose, per day (in
+# APP_TIMEZONE) and per donor.
+#
+# /payments/stats is public and sits on the landing page; it reads these
+# rows instead of summing every payment and grouping every donor. An
+# after_flush hook upserts `payments + n, amount + x` into payment_rollups
+# on the same connection whenever a flush inserts, deletes or changes a
+# Payment, so every verify path (general, special, membership, event
+# donation) keeps them current and they commit or roll back with the
+# payment. Rows are touched in key order so concurrent payments cannot
+# deadlock on them. Core bulk writes bypass the hook;
+# `python repair_payment_rollups.py` recomputes everything from payments.
+
+PURPOSE = "purpose"
+DAY = "day"
+DONOR = "donor"
+
+_TRACKED = ("user_id", "purpose", "status", "amount", "created_at")
+
+
+def _before(payment, attr: str):
+    """Value of `attr` as of the start of the transaction."""
+    history = inspect(payment).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _keys(user_id, purpose, created_at) -> list[tuple[str, str]]:
+    keys = [(PURPOSE, purpose)]
+    if created_at is not None:
+        keys.append((DAY, local_time.local_date(created_at).isoformat()))
+    if user_id is not None:
+        keys.append((DONOR, str(user_id)))
+    return keys
+
+
+def _add(deltas, values: tuple, sign: int):
+    user_id, purpose, status, amount, created_at = values
+    if status != "completed":
+        return
+    for key in _keys(user_id, purpose, created_at):
+        deltas[key][0] += sign
+        deltas[key][1] += sign * (amount or 0)
+
+
+def _insert(conn):
+    return postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+
+
+def _upsert(conn, rows: list[dict], increment: bool):
+    """Insert rows, or on conflict add to (increment) or overwrite the stored totals."""
+    rollups = models.PaymentRollup.__table__
+    statement = _insert(conn)(rollups).values(rows)
+    excluded = statement.excluded
+    if increment:
+        values = {"payments": rollups.c.payments + excluded.payments, "amount": rollups.c.amount + excluded.amount}
+    else:
+        values = {"payments": excluded.payments, "amount": excluded.amount}
+    conn.execute(statement.on_conflict_do_update(index_elements=[rollups.c.dimension, rollups.c.key], set_=values))
+
+
+def _after_flush(session, flush_context):
+    deltas = defaultdict(lambda: [0, 0.0])
+    for obj in session.new:
+        if isinstance(obj, models.Payment):
+            _add(deltas, tuple(getattr(obj, attr) for attr in _TRACKED), 1)
+    for obj in session.deleted:
+        if isinstance(obj, models.Payment):
+            _add(deltas, tuple(_before(obj, attr) for attr in _TRACKED), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, models.Payment) or obj in session.deleted:
+            continue
+        old = tuple(_before(obj, attr) for attr in _TRACKED)
+        new = tuple(getattr(obj, attr) for attr in _TRACKED)
+        if old != new:
+            _add(deltas, old, -1)
+            _add(deltas, new, 1)
+
+    rows = [
+        {"dimension": dimension, "key": key, "payments": payments, "amount": amount}
+        for (dimension, key), (payments, amount) in sorted(deltas.items())
+        if payments or amount
+    ]
+    if rows:
+        _upsert(session.connection(), rows, increment=True)
+
+
+def install():
+    """Register the flush hook on every Session (sync and async). Idempotent."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+# ─── Reads ────────────────────────────────────────────────────
+
+def total_query():
+    """Sum of all completed payments (one row per purpose to add up)."""
+    rollups = models.PaymentRollup
+    return select(func.coalesce(func.sum(rollups.amount), 0)).where(rollups.dimension == PURPOSE)
+
+
+def top_donor_query():
+    """(full_name, amount) of the largest donor; an index seek on (dimension, amount)."""
+    rollups = models.PaymentRollup
+    return (
+        select(models.User.full_name, rollups.amount)
+        .join(models.User, models.User.id == cast(rollups.key, Integer))
+        .where(rollups.dimension == DONOR)
+        .order_by(rollups.amount.desc())
+        .limit(1)
+    )
+
+
+# ─── Backfill / consistency check ─────────────────────────────
+
+def _expected(conn) -> dict:
+    """(dimension, key) -> (payments, amount) recomputed from payments."""
+    payments = models.Payment.__table__
+    totals = (func.count(payments.c.id), func.coalesce(func.sum(payments.c.amount), 0))
+    day = date_bucket("day", payments.c.created_at)
+    expected = {}
+    for dimension, column, to_key in (
+        (PURPOSE, payments.c.purpose, str),
+        (DAY, day, lambda value: local_time.local_date(value).isoformat()),
+        (DONOR, payments.c.user_id, str),
+    ):
+        rows = conn.execute(
+            select(column, *totals).where(payments.c.status == "completed", column.isnot(None)).group_by(column)
+        )
+        for value, count, amount in rows:
+            expected[(dimension, to_key(value))] = (count, float(amount))
+    return expected
+
+
+def drift(conn) -> list[dict]:
+    """Stored rollups that differ from payments, including missing and stale rows."""
+    rollups = models.PaymentRollup.__table__
+    expected = _expected(conn)
+    stored = {
+        (row.dimension, row.key): (row.payments, row.amount)
+        for row in conn.execute(select(rollups.c.dimension, rollups.c.key, rollups.c.payments, rollups.c.amount))
+    }
+    found = []
+    for key in sorted(expected.keys() | stored.keys()):
+        have = stored.get(key, (0, 0.0))
+        want = expected.get(key, (0, 0.0))
+        if have[0] != want[0] or abs(have[1] - want[1]) > 0.005:
+            found.append({"dimension": key[0], "key": key[1], "stored": have, "actual": want})
+    return found
+
+
+def recount(conn) -> int:
+    """Rewrite every rollup that drifted. Returns how many were fixed."""
+    rollups = models.PaymentRollup.__table__
+    if conn.dialect.name == "postgresql":
+        # Hold off the flush hook's increments until this transaction commits:
+        # payments committed earlier are in the recount, later ones apply
+        # their delta on top of it.
+        conn.execute(text("LOCK TABLE payment_rollups IN EXCLUSIVE MODE"))
+    fixed = drift(conn)
+    rows = []
+    for entry in fixed:
+        payments, amount = entry["actual"]
+        if payments:
+            rows.append({"dimension": entry["dimension"], "key": entry["key"], "payments": payments, "amount": amount})
+        else:
+            conn.execute(delete(rollups).where(rollups.c.dimension == entry["dimension"], rollups.c.key == entry["key"]))
+    if rows:
+        _upsert(conn, rows, increment=False)
+    return len(fixed)
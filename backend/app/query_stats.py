@@ -0,0 +1,95 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+
+# Per-request SQL query counting, built on engine cursor events.
+#
+# The collector lives in a ContextVar, which follows the request into
+# run_in_threadpool (DB_MODE=sync) and into the greenlet SQLAlchemy uses to
+# drive async drivers, so every statement a request issues is attributed to
+# it. With QUERY_DEBUG_HEADERS=true each response carries X-DB-Query-Count
+# and X-DB-Query-Time-Ms; check_query_counts.py uses the same collector to
+# fail on N+1 regressions.
+QUERY_DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", "false").lower() in ("1", "true", "yes")
+
+COUNT_HEADER = "X-DB-Query-Count"
+TIME_HEADER = "X-DB-Query-Time-Ms"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    statements: list = field(default_factory=list)
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+# The start time rides on the statement's execution context rather than a
+# stack on the connection: a statement that raises never reaches
+# after_cursor_execute, and a stack would keep its entry and pair the next
+# statement with the wrong start.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    stats = _current.get()
+    if stats is not None and start is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - start
+        stats.statements.append(statement)
+
+
+def instrument(engine):
+    """Attach the counters to a sync Engine (use .sync_engine for async engines)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def collect():
+    """Count the queries issued inside the block (and anything it awaits)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "block"):
+    """Fail when the block issues more than `limit` queries, listing them."""
+    with collect() as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(stats.statements))
+        raise AssertionError(f"{label} issued {stats.count} queries (max {limit}):\n{listing}")
+
+
+class QueryCounterMiddleware:
+    """Pure ASGI middleware adding the query count/time headers to each response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with collect() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode()))
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
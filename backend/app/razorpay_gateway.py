@@ -0,0 +1,187 @@
+import asyncio
+import os
+import time
+from collections import deque
+import httpx
+from fastapi import HTTPException
+from .config import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET, RAZORPAY_KEY_ID_SPECIAL, RAZORPAY_KEY_SECRET_SPECIAL
+
+# Calls to the Razorpay Orders API from the event loop, instead of the
+# blocking SDK in a threadpool thread (one thread held for the whole round
+# trip, with no timeout).
+#
+# One httpx.AsyncClient per process keeps HTTPS connections to the gateway
+# alive between calls, for both accounts: they share a host, so each call
+# just sends its own account's key. At most RAZORPAY_CONCURRENCY calls are in
+# flight; a call that cannot start within RAZORPAY_QUEUE_TIMEOUT fails fast
+# rather than piling up behind a slow gateway. Every call has a timeout
+# (RAZORPAY_TIMEOUT overall, RAZORPAY_CONNECT_TIMEOUT to connect).
+#
+# The razorpay SDK (config.get_razorpay_client) is still used to check
+# payment signatures, which is local HMAC work with no network call.
+#
+# RAZORPAY_API_URL points the client at another server, e.g. fake_razorpay.py
+# for load tests.
+RAZORPAY_API_URL = os.getenv("RAZORPAY_API_URL", "https://api.razorpay.com")
+RAZORPAY_TIMEOUT = float(os.getenv("RAZORPAY_TIMEOUT", "10"))  # seconds
+RAZORPAY_CONNECT_TIMEOUT = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT", "3"))
+RAZORPAY_CONCURRENCY = int(os.getenv("RAZORPAY_CONCURRENCY", "100"))
+RAZORPAY_QUEUE_TIMEOUT = float(os.getenv("RAZORPAY_QUEUE_TIMEOUT", "2"))
+RAZORPAY_KEEPALIVE = int(os.getenv("RAZORPAY_KEEPALIVE", "20"))  # idle connections kept open
+RAZORPAY_KEEPALIVE_EXPIRY = float(os.getenv("RAZORPAY_KEEPALIVE_EXPIRY", "30"))
+
+MAIN = "main"
+SPECIAL = "special"
+ACCOUNTS = {
+    MAIN: (RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET),
+    SPECIAL: (RAZORPAY_KEY_ID_SPECIAL, RAZORPAY_KEY_SECRET_SPECIAL),
+}
+
+
+class GatewayError(Exception):
+    """Razorpay refused the call, or could not be reached."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GatewayUnavailable(GatewayError):
+    """The call timed out, or too many calls were already waiting."""
+
+
+class RazorpayGateway:
+    def __init__(self, base_url: str = RAZORPAY_API_URL, concurrency: int = RAZORPAY_CONCURRENCY):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self._client: httpx.AsyncClient | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._loop = None
+        self._auth = {account: httpx.BasicAuth(*keys) for account, keys in ACCOUNTS.items()}
+        self._in_flight = 0
+        self._waiting = 0
+        self._latencies = deque(maxlen=1000)
+        self._counters = {"calls": 0, "errors": 0, "timeouts": 0, "busy": 0}
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (tests, scripts): pooled
+            # connections belong to the loop that opened them
+            self._close_stale_client()
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(RAZORPAY_TIMEOUT, connect=RAZORPAY_CONNECT_TIMEOUT),
+                # retries=1 only repeats a failed connect, never a sent request
+                transport=httpx.AsyncHTTPTransport(
+                    retries=1,
+                    limits=httpx.Limits(
+                        max_connections=self.concurrency,
+                        max_keepalive_connections=RAZORPAY_KEEPALIVE,
+                        keepalive_expiry=RAZORPAY_KEEPALIVE_EXPIRY,
+                    ),
+                ),
+            )
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    def _close_stale_client(self):
+        # The app's lifespan closes the client on shutdown; scripts running
+        # several event loops should await gateway.aclose() before each one
+        # ends. A client left open can only be closed on its own loop
+        client, loop = self._client, self._loop
+        self._client = None
+        if client is None:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            print("WARNING: Razorpay client left open by a finished event loop; "
+                  "call gateway.aclose() before the loop ends")
+
+    async def _acquire(self):
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), RAZORPAY_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._counters["busy"] += 1
+            raise GatewayUnavailable("Payment gateway is busy")
+        finally:
+            self._waiting -= 1
+
+    async def request(self, account: str, method: str, path: str, json: dict | None = None,
+                      timeout: float | None = None) -> dict:
+        """One Razorpay API call; the decoded JSON body, or GatewayError."""
+        client = self._ensure_client()
+        await self._acquire()
+        self._in_flight += 1
+        self._counters["calls"] += 1
+        start = time.monotonic()
+        try:
+            response = await client.request(
+                method, path, json=json, auth=self._auth[account],
+                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+            )
+        except httpx.TimeoutException:
+            self._counters["timeouts"] += 1
+            raise GatewayUnavailable("Payment gateway timed out")
+        except httpx.HTTPError as e:
+            self._counters["errors"] += 1
+            raise GatewayError(f"Payment gateway unreachable: {e.__class__.__name__}")
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+            self._latencies.append(time.monotonic() - start)
+
+        if response.status_code >= 400:
+            self._counters["errors"] += 1
+            try:
+                message = response.json()["error"]["description"]
+            except (ValueError, KeyError, TypeError):
+                message = f"HTTP {response.status_code}"
+            raise GatewayError(message, response.status_code)
+        return response.json()
+
+    async def create_order(self, account: str, data: dict, timeout: float | None = None) -> dict:
+        return await self.request(account, "POST", "/v1/orders", json=data, timeout=timeout)
+
+    async def fetch_order(self, account: str, order_id: str, timeout: float | None = None) -> dict:
+        return await self.request(account, "GET", f"/v1/orders/{order_id}", timeout=timeout)
+
+    async def aclose(self):
+        if self._loop is not asyncio.get_running_loop():
+            self._close_stale_client()
+        elif self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+        self._loop = None
+
+    def stats(self) -> dict:
+        data = dict(self._counters)
+        latencies = sorted(self._latencies)
+        data["in_flight"] = self._in_flight
+        data["waiting"] = self._waiting
+        data["concurrency"] = self.concurrency
+        if latencies:
+            data["latency_avg_ms"] = round(sum(latencies) / len(latencies) * 1000, 1)
+            data["latency_p99_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1)
+        else:
+            data["latency_avg_ms"] = data["latency_p99_ms"] = 0.0
+        return data
+
+
+gateway = RazorpayGateway()
+
+
+async def checkout_order(account: str, data: dict, failure: str) -> dict:
+    """Create an order for a checkout route: 503 when the gateway is slow or saturated, else 500."""
+    try:
+        return await gateway.create_order(account, data)
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"{e}, please try again")
+    except GatewayError as e:
+        raise HTTPException(status_code=500, detail=f"{failure}: {e}")
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from . import database, payment_ingest
+from .razorpay_gateway import MAIN, SPECIAL, gateway
+
+# Razorpay webhooks, so a captured payment is recorded even when the browser
+# never calls /verify (tab closed, network dropped).
+#
+# The route only checks the HMAC signature, drops payment ids this process
+# recorded or queued recently (payment_ingest.claim) and puts the event on a
+# bounded queue, so a burst of deliveries costs no database work in the
+# request. Worker tasks on the event loop record each payment through
+# payment_ingest.record, which is idempotent with the verify routes. A full
+# queue answers 503 and Razorpay redelivers later; a failed recording is
+# retried with backoff, then released so a redelivery can try again.
+#
+# The queue lives in memory: an event accepted just before the process dies
+# is lost unless Razorpay redelivers it or the browser's /verify records it.
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "3"))
+WEBHOOK_RETRY_BACKOFF = float(os.getenv("WEBHOOK_RETRY_BACKOFF", "1"))  # seconds, doubled per retry
+
+SPECIAL_FUND_PURPOSE = "special_fund"
+# Both carry the payment entity; order.paid also carries the order (and its notes)
+HANDLED_EVENTS = ("payment.captured", "order.paid")
+
+
+def sign(body: bytes, secret: str) -> str:
+    """X-Razorpay-Signature for a body: hex HMAC-SHA256 keyed with the webhook secret."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def signature_valid(body: bytes, signature: str | None, secret: str) -> bool:
+    return bool(signature) and hmac.compare_digest(sign(body, secret), signature)
+
+
+@dataclass
+class CapturedPayment:
+    account: str
+    transaction_id: str
+    order_id: str | None
+    amount: float  # rupees
+    notes: dict
+    attempts: int = 0
+    received_at: float = field(default_factory=time.monotonic)
+
+
+def parse(event: dict, account: str) -> CapturedPayment | None:
+    """The captured payment in a webhook event, or None for events we do not record."""
+    if event.get("event") not in HANDLED_EVENTS:
+        return None
+    payload = event.get("payload") or {}
+    payment = (payload.get("payment") or {}).get("entity") or {}
+    if not payment.get("id") or payment.get("status") != "captured":
+        return None
+    order = (payload.get("order") or {}).get("entity") or {}
+    return CapturedPayment(
+        account=account,
+        transaction_id=payment["id"],
+        order_id=payment.get("order_id") or order.get("id"),
+        amount=payment.get("amount", 0) / 100,  # paise
+        notes={**(payment.get("notes") or {}), **(order.get("notes") or {})},
+    )
+
+
+def _int(value) -> int | None:
+    return int(value) if str(value or "").isdigit() else None
+
+
+class WebhookQueue:
+    def __init__(self, workers: int = WEBHOOK_WORKERS, maxsize: int = WEBHOOK_QUEUE_SIZE):
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: asyncio.Queue | None = None
+        self._loop = None
+        self._tasks: list[asyncio.Task] = []
+        self._pending_retries = 0
+        self._latencies = deque(maxlen=500)
+        self._counters = {"received": 0, "duplicates": 0, "ignored": 0, "rejected": 0,
+                          "recorded": 0, "already_recorded": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # First use, or a new event loop (tests, scripts): tasks are bound to their loop
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [loop.create_task(self._worker(), name=f"webhook-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        """Finish queued events (up to `timeout` seconds), then stop the workers."""
+        tasks, self._tasks = self._tasks, []
+        if not tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️  Webhook queue stopped with {self._queue.qsize()} event(s) unprocessed")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def join(self):
+        """Wait until every queued event (including retries) has been handled."""
+        while self._queue is not None:
+            await self._queue.join()
+            if not self._pending_retries:
+                return
+            await asyncio.sleep(0.01)
+
+    def count(self, name: str):
+        self._counters[name] += 1
+
+    def submit(self, capture: CapturedPayment) -> str:
+        """Queue a payment: "queued", "duplicate", or "full" (the caller answers 503)."""
+        self.start()
+        if not payment_ingest.claim(capture.transaction_id):
+            self.count("duplicates")
+            return "duplicate"
+        try:
+            self._queue.put_nowait(capture)
+        except asyncio.QueueFull:
+            payment_ingest.release(capture.transaction_id)
+            self.count("rejected")
+            return "full"
+        return "queued"
+
+    def _retry_later(self, capture: CapturedPayment):
+        delay = WEBHOOK_RETRY_BACKOFF * (2 ** (capture.attempts - 1))
+        self.count("retried")
+        self._pending_retries += 1
+
+        def requeue():
+            self._pending_retries -= 1
+            try:
+                self._queue.put_nowait(capture)
+            except asyncio.QueueFull:
+                payment_ingest.release(capture.transaction_id)
+                self.count("failed")
+
+        self._loop.call_later(delay, requeue)
+
+    async def _notes(self, capture: CapturedPayment) -> dict:
+        """The order's notes (user, purpose, event) when the event did not carry them."""
+        if "user_id" in capture.notes or not capture.order_id:
+            return capture.notes
+        order = await gateway.fetch_order(capture.account, capture.order_id)
+        return {**capture.notes, **(order.get("notes") or {})}
+
+    async def _record(self, capture: CapturedPayment) -> bool:
+        notes = await self._notes(capture)
+        event_id = _int(notes.get("event_id"))
+        purpose = SPECIAL_FUND_PURPOSE if capture.account == SPECIAL else notes.get("purpose") or "general"
+        db = database.create_session()
+        try:
+            recorded = await payment_ingest.record(
+                db, capture.transaction_id, capture.amount, purpose, _int(notes.get("user_id")), event_id
+            )
+        finally:
+            await db.close()
+        return recorded.created
+
+    async def _worker(self):
+        while True:
+            capture = await self._queue.get()
+            try:
+                capture.attempts += 1
+                created = await self._record(capture)
+                self.count("recorded" if created else "already_recorded")
+                self._latencies.append(time.monotonic() - capture.received_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Webhook payment {capture.transaction_id} failed (attempt {capture.attempts}): {e}")
+                if capture.attempts <= WEBHOOK_MAX_RETRIES:
+                    self._retry_later(capture)
+                else:
+                    payment_ingest.release(capture.transaction_id)
+                    self.count("failed")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        data = dict(self._counters)
+        latencies = sorted(self._latencies)
+        data["pending_retries"] = self._pending_retries
+        data["depth"] = self._queue.qsize() if self._queue is not None else 0
+        data["workers"] = len(self._tasks)
+        if latencies:
+            data["latency_avg_ms"] = round(sum(latencies) / len(latencies) * 1000, 1)
+            data["latency_p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+        else:
+            data["latency_avg_ms"] = data["latency_p95_ms"] = 0.0
+        return data
+
+
+webhook_queue = WebhookQueue()
@@ -0,0 +1,705 @@
+import asyncio
+import functools
+import hashlib
+import html
+import io
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from string import Formatter
+from cachetools import LRUCache
+from sqlalchemy import select
+from . import local_time, models
+
+# Payment receipts for /payments/{id}/receipt, as HTML or PDF.
+#
+# A completed payment's amount, purpose and date never change, but the donor's
+# name, Sabhasad ID and village shown beside them can. Each request therefore
+# reads the receipt row (one primary-key query) and reuses a rendering only if
+# it was made from the same values: completed receipts are kept in a
+# per-process LRU cache keyed by (payment id, format) together with the
+# fields they were rendered from. Every receipt carries a strong ETag (a hash
+# of the bytes) and "no-cache", so browsers revalidate and get a 304 while
+# nothing has changed. Receipts of payments that are not completed are
+# rendered every time.
+#
+# The HTML template is parsed once at import. PDFs are drawn with reportlab on
+# a dedicated executor: a render holds the GIL for tens of milliseconds, so
+# RECEIPT_PDF_POOL_KIND defaults to "process" to keep it off the event loop
+# and AnyIO's threadpool alike.
+RECEIPT_CACHE_SIZE = int(os.getenv("RECEIPT_CACHE_SIZE", "2048"))
+RECEIPT_PDF_POOL_SIZE = int(os.getenv("RECEIPT_PDF_POOL_SIZE", str(min(2, os.cpu_count() or 1))))
+RECEIPT_PDF_POOL_KIND = os.getenv("RECEIPT_PDF_POOL_KIND", "process")
+
+HTML = "html"
+PDF = "pdf"
+FORMATS = (HTML, PDF)
+MEDIA_TYPES = {HTML: "text/html; charset=utf-8", PDF: "application/pdf"}
+
+CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class Receipt:
+    body: bytes
+    etag: str
+    media_type: str
+    filename: str
+    fields: dict
+
+
+_lock = threading.Lock()
+_cache = LRUCache(maxsize=RECEIPT_CACHE_SIZE)
+_counters = {"hits": 0, "misses": 0}
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def number_to_words(n: int) -> str:
+    """Amount in words, for Indian Rupees (lakh and crore grouping)."""
+    units = ["", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen", "Nineteen"]
+    tens = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
+    if n < 20: return units[n]
+    if n < 100: return tens[n // 10] + (" " + units[n % 10] if (n % 10 != 0) else "")
+    if n < 1000: return units[n // 100] + " Hundred" + (" and " + number_to_words(n % 100) if (n % 100 != 0) else "")
+    if n < 100000: return number_to_words(n // 1000) + " Thousand" + (" " + number_to_words(n % 1000) if (n % 1000 != 0) else "")
+    # Annual statement totals run past a lakh
+    if n < 10000000: return number_to_words(n // 100000) + " Lakh" + (" " + number_to_words(n % 100000) if (n % 100000 != 0) else "")
+    return number_to_words(n // 10000000) + " Crore" + (" " + number_to_words(n % 10000000) if (n % 10000000 != 0) else "")
+
+
+def receipt_query(payment_id: int):
+    """Everything a receipt shows, in one query."""
+    return (
+        select(
+            models.Payment.id,
+            models.Payment.amount,
+            models.Payment.purpose,
+            models.Payment.status,
+            models.Payment.created_at,
+            models.User.full_name,
+            models.User.sabhasad_id,
+            models.Village.name.label("village_name"),
+        )
+        .outerjoin(models.User, models.User.id == models.Payment.user_id)
+        .outerjoin(models.Village, models.Village.id == models.User.village_id)
+        .where(models.Payment.id == payment_id)
+    )
+
+
+def receipt_fields(row) -> dict:
+    """Template values (all strings) for a receipt_query row."""
+    return {
+        "receipt_no": f"REC-{row.id:06d}",
+        # The calendar day in APP_TIMEZONE, as the date filters count it
+        "payment_date": local_time.local_date(row.created_at).strftime("%d %B %Y") if row.created_at else "—",
+        "donor_name": row.full_name or "Community Supporter",
+        "sabhasad_id": row.sabhasad_id or "N/A",
+        "village_name": row.village_name or "N/A",
+        "purpose": row.purpose.replace("_", " ").title() if row.purpose else "Donation",
+        "amount": f"{row.amount:,.2f}",
+        "amount_in_words": f"{number_to_words(int(row.amount))} Rupees Only",
+    }
+
+
+def _compile(template: str) -> list[tuple[str, str | None]]:
+    """Split a str.format template into (literal text, field name) pairs once."""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+def render_html(fields: dict) -> bytes:
+    return "".join(
+        literal + (html.escape(fields[name]) if name else "") for literal, name in _HTML_TEMPLATE
+    ).encode()
+
+
+# ─── PDF ─────────────────────────────────────────────────────
+# Shared with the annual statements (app/statements.py). reportlab is
+# imported on first use, in whichever process draws.
+#
+# The built-in fonts have no Gujarati or ₹ glyphs, so PDFs carry the
+# English labels only and amounts in "Rs.".
+
+@functools.cache
+def pdf_styles() -> dict:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+    navy = colors.HexColor("#1a237e")
+    normal = getSampleStyleSheet()["Normal"]
+    return {
+        "navy": navy,
+        "gold": colors.HexColor("#b8860b"),
+        "normal": normal,
+        "right": ParagraphStyle("right", parent=normal, alignment=TA_RIGHT),
+        "centered": ParagraphStyle("centered", parent=normal, alignment=TA_CENTER, fontSize=8, leading=11),
+        "heading": ParagraphStyle("heading", parent=getSampleStyleSheet()["Title"], textColor=navy, fontSize=16,
+                                  spaceAfter=2),
+        "title": ParagraphStyle("title", parent=getSampleStyleSheet()["Heading2"], alignment=TA_CENTER,
+                                textColor=colors.white, backColor=navy, borderPadding=4, spaceBefore=6, spaceAfter=10),
+    }
+
+
+def pdf_table(rows: list, widths: list, header: bool = False, **options):
+    """A gold-ruled table; with header, the first row is a navy band (repeated on every page)."""
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    styles = pdf_styles()
+    grid = Table(rows, colWidths=widths, repeatRows=1 if header else 0, **options)
+    style = [
+        ("GRID", (0, 0), (-1, -1), 0.5, styles["gold"]),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+    if header:
+        style += [("BACKGROUND", (0, 0), (-1, 0), styles["navy"]), ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                  ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold")]
+    grid.setStyle(TableStyle(style))
+    return grid
+
+
+def pdf_letterhead(title: str) -> list:
+    from reportlab.platypus import Paragraph
+
+    styles = pdf_styles()
+    return [
+        Paragraph("SHREE SATHWARA KADIA PRAGATI MANDAL", styles["heading"]),
+        Paragraph("Service | Cooperation | Progress", styles["centered"]),
+        Paragraph("Address: Pragati Mandal, Ahmedabad - 382481, Gujarat, India. Web: www.satvarasamaj.com<br/>"
+                  "Contact: Ahmedabad/Gandhinagar, pragatimandal@gmail.com, Morbi: 0000000000", styles["centered"]),
+        Paragraph(title, styles["title"]),
+    ]
+
+
+def pdf_signature() -> list:
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = pdf_styles()
+    return [
+        Spacer(1, 18 * mm),
+        Paragraph("Authorized Signatory<br/>FOR, SHREE SATHWARA KADIA PRAGATI MANDAL", styles["normal"]),
+        Spacer(1, 10 * mm),
+        Paragraph("Forward Towards Unity and Service", styles["centered"]),
+    ]
+
+
+def pdf_build(story: list, title: str) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = io.BytesIO()
+    # invariant: no timestamp or random document id, so equal content gives equal bytes (and ETags)
+    document = SimpleDocTemplate(buffer, pagesize=A4, invariant=1, title=title,
+                                 leftMargin=20 * mm, rightMargin=20 * mm, topMargin=15 * mm, bottomMargin=15 * mm)
+    document.build(story)
+    return buffer.getvalue()
+
+
+# Runs on the PDF executor; module level so a process pool can pickle it.
+def render_pdf(fields: dict) -> bytes:
+    """A4 receipt with the HTML receipt's content."""
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, Spacer
+
+    normal = pdf_styles()["normal"]
+    text = {key: html.escape(value) for key, value in fields.items()}
+    story = [
+        *pdf_letterhead("RECEIPT"),
+        pdf_table([["Receipt No", text["receipt_no"], "Date", text["payment_date"]]], [30 * mm, 55 * mm, 30 * mm, 55 * mm]),
+        Spacer(1, 6 * mm),
+        pdf_table([
+            ["MEMBER DETAILS", ""],
+            ["Member Name", Paragraph(text["donor_name"], normal)],
+            ["e-Sabhasad ID", text["sabhasad_id"]],
+            ["Village", Paragraph(text["village_name"], normal)],
+        ], [60 * mm, 110 * mm], header=True),
+        Spacer(1, 6 * mm),
+        pdf_table([
+            ["Purpose", "Year", "Amount (Rs.)"],
+            [Paragraph(text["purpose"], normal), "2024-25", text["amount"]],
+            ["TOTAL AMOUNT", "", f"Rs. {text['amount']}"],
+        ], [90 * mm, 35 * mm, 45 * mm], header=True),
+        Spacer(1, 4 * mm),
+        Paragraph(f"<b>Total Amount in Words:</b> {text['amount_in_words']}", normal),
+        *pdf_signature(),
+    ]
+    return pdf_build(story, f"Receipt {fields['receipt_no']}")
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if RECEIPT_PDF_POOL_KIND == "process":
+                    _executor = ProcessPoolExecutor(max_workers=RECEIPT_PDF_POOL_SIZE)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=RECEIPT_PDF_POOL_SIZE, thread_name_prefix="receipt-pdf")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def cached(row, fmt: str) -> Receipt | None:
+    """The stored rendering of a receipt_query row, unless the row has changed since."""
+    with _lock:
+        receipt = _cache.get((row.id, fmt))
+        if receipt is not None and receipt.fields != receipt_fields(row):
+            receipt = None
+        _counters["hits" if receipt is not None else "misses"] += 1
+    return receipt
+
+
+async def render(row, fmt: str) -> Receipt:
+    """Render a receipt_query row; completed payments are cached."""
+    fields = receipt_fields(row)
+    if fmt == PDF:
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(get_executor(), render_pdf, fields)
+    else:
+        body = render_html(fields)
+    receipt = Receipt(
+        body=body,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        media_type=MEDIA_TYPES[fmt],
+        filename=f"{fields['receipt_no']}.{fmt}",
+        fields=fields,
+    )
+    if row.status == "completed":
+        with _lock:
+            _cache[(row.id, fmt)] = receipt
+    return receipt
+
+
+def not_modified(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_counters, "size": len(_cache), "maxsize": _cache.maxsize}
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+# str.format syntax: {field} is a value from receipt_fields (HTML-escaped on
+# render), {{ and }} are literal braces.
+_HTML = """
+<!DOCTYPE html>
+<html lang="gu">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Receipt {receipt_no}</title>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&family=Noto+Sans+Gujarati:wght@400;700&family=Dancing+Script:wght@700&display=swap" rel="stylesheet">
+    <style>
+        :root {{
+            --primary: #B8860B;
+            --saffron: #E67E22;
+            --navy: #000080;
+            --text-dark: #1a1a1a;
+            --text-muted: #555555;
+            --border: #d4af37;
+            --bg: #fdfdfd;
+        }}
+
+        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+
+        @page {{
+            size: A4;
+            margin: 5mm;
+        }}
+
+        body {{
+            font-family: 'Inter', 'Noto Sans Gujarati', sans-serif;
+            background-color: #f0f0f0;
+            display: flex;
+            justify-content: center;
+            padding: 20px 0;
+        }}
+
+        .receipt-card {{
+            background: white;
+            width: 95%;
+            max-width: 210mm;
+            min-height: 285mm; /* Reduced slightly to prevent blank 2nd page */
+            height: auto;
+            position: relative;
+            overflow: hidden;
+            display: flex;
+            flex-direction: column;
+            align-items: center;
+            padding: 5mm;
+            box-shadow: 0 0 20px rgba(0,0,0,0.1);
+        }}
+
+        .receipt-inner {{
+            width: 100%;
+            flex: 1;
+            border: 2px solid var(--primary);
+            padding: 6mm;
+            position: relative;
+            display: flex;
+            flex-direction: column;
+        }}
+
+        /* Gold Frame Corner Accents */
+        .receipt-inner::before {{
+            content: '';
+            position: absolute;
+            top: 5px; left: 5px; right: 5px; bottom: 5px;
+            border: 1px solid rgba(184, 134, 11, 0.3);
+            pointer-events: none;
+        }}
+
+        .header {{
+            text-align: center;
+            margin-bottom: 20px;
+        }}
+
+        .logo-circle {{
+            width: 90px;
+            height: 90px;
+            margin: 0 auto 10px;
+            background: #fdf2e9;
+            border: 2px solid var(--primary);
+            border-radius: 50%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            overflow: hidden;
+        }}
+        .logo-circle img {{ width: 80%; height: auto; }}
+
+        .gujarati-head {{
+            font-size: 26px;
+            color: #800000;
+            font-weight: 700;
+            margin-bottom: 2px;
+        }}
+
+        .english-head {{
+            font-size: 14px;
+            font-weight: 700;
+            color: #800000;
+            letter-spacing: 0.5px;
+        }}
+
+        .tagline {{
+            font-size: 12px;
+            color: var(--text-dark);
+            margin-bottom: 5px;
+            font-weight: 600;
+        }}
+
+        .contact-info {{
+            font-size: 9px;
+            color: var(--text-muted);
+            max-width: 90%;
+            margin: 0 auto;
+            line-height: 1.3;
+        }}
+
+        .title-bar {{
+            background: linear-gradient(90deg, #d35400, #e67e22, #d35400);
+            color: white;
+            text-align: center;
+            padding: 6px;
+            font-weight: 700;
+            font-size: 18px;
+            margin-bottom: 15px;
+            clip-path: polygon(1% 0%, 99% 0%, 100% 50%, 99% 100%, 1% 100%, 0% 50%);
+        }}
+
+        .table-section {{
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 12px;
+            font-size: 12px;
+        }}
+
+        .table-section td, .table-section th {{
+            border: 1px solid #ccc;
+            padding: 6px 10px;
+        }}
+
+        .bg-light {{ background-color: #fcf8e3; font-weight: 700; }}
+        .text-center {{ text-align: center; }}
+        .text-right {{ text-align: right; }}
+
+        /* Table 1: Receipt Info */
+        .info-grid {{
+            display: flex;
+            justify-content: space-between;
+            gap: 15px;
+            margin-bottom: 12px;
+        }}
+        .info-table {{ width: 48%; margin-bottom: 0; }}
+
+        /* Table 2: Member Details */
+        .member-details th {{
+            background: #fdf2e9;
+            text-align: center;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+            padding: 4px;
+        }}
+
+        /* Table 3: Financials */
+        .financial-table th {{
+            background: #fdf2e9;
+            padding: 4px;
+        }}
+
+        .total-row {{
+            background: #fcf8e3;
+            font-weight: 700;
+            font-size: 14px;
+        }}
+
+        .words-row {{
+            font-size: 11px;
+            font-style: italic;
+            padding: 8px;
+            border: 1px solid #ccc;
+            margin-bottom: 20px;
+            background: #fafafa;
+        }}
+
+        .footer-row {{
+            display: flex;
+            justify-content: space-between;
+            align-items: flex-end;
+            margin-top: auto;
+            padding: 10px 10px 0 10px;
+        }}
+
+        .signatory {{
+            text-align: center;
+        }}
+
+        .signature-font {{
+            font-family: 'Dancing Script', cursive;
+            color: var(--navy);
+            font-size: 18px;
+            margin-bottom: 3px;
+        }}
+
+        .sig-label {{
+            font-size: 10px;
+            font-weight: 700;
+            border-top: 1px solid #000;
+            padding-top: 3px;
+            text-transform: uppercase;
+        }}
+
+        .seal-container {{
+            position: relative;
+            width: 80px;
+            height: 80px;
+        }}
+
+        .verified-seal {{
+            width: 75px;
+            height: 75px;
+            background: radial-gradient(circle, #f1c40f, #d4af37, #b8860b);
+            border-radius: 50%;
+            display: flex;
+            flex-direction: column;
+            align-items: center;
+            justify-content: center;
+            color: #800000;
+            font-weight: 800;
+            font-size: 9px;
+            border: 2px dashed #800000;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.15);
+            transform: rotate(-15deg);
+        }}
+
+            .bottom-banner {{
+                background: #d35400;
+                color: white;
+                text-align: center;
+                padding: 8px;
+                font-size: 11px;
+                font-weight: 600;
+                margin-top: 15px; /* Reduced */
+                border-radius: 4px;
+            }}
+
+            .no-print {{
+                position: fixed;
+                bottom: 20px;
+                left: 50%;
+                transform: translateX(-50%);
+                display: flex;
+                gap: 10px;
+                z-index: 1000;
+            }}
+
+            .btn {{
+                padding: 10px 20px;
+                background: #333;
+                color: white;
+                border: none;
+                border-radius: 30px;
+                font-weight: 700;
+                cursor: pointer;
+                box-shadow: 0 4px 15px rgba(0,0,0,0.2);
+            }}
+
+            @media screen and (max-width: 600px) {{
+                body {{ padding: 10px 0; }}
+                .receipt-card {{ padding: 3mm; }}
+                .receipt-inner {{ padding: 4mm; }}
+                .gujarati-head {{ font-size: 20px; }}
+                .english-head {{ font-size: 11px; }}
+                .tagline {{ font-size: 10px; }}
+                .contact-info {{ font-size: 8px; }}
+                .title-bar {{ font-size: 16px; padding: 4px; }}
+                .table-section {{ font-size: 10px; }}
+                .words-row {{ font-size: 10px; margin-bottom: 15px; }}
+            }}
+
+            @media print {{
+                body {{ background: white; padding: 0; }}
+                .receipt-card {{
+                    box-shadow: none;
+                    margin: 0;
+                    width: 100%;
+                    max-width: none;
+                    min-height: 0;
+                }}
+                .no-print {{ display: none; }}
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="receipt-card">
+        <div class="receipt-inner">
+            <header class="header">
+                <div class="logo-circle">
+                    <img src="https://res.cloudinary.com/dgzgvwtsd/image/upload/v1772518018/vishwakarma-god-png-transparent-vishwakarma-god-images-40_p9efq5.png" onerror="this.src='https://ui-avatars.com/api/?name=SKPM&background=B8860B&color=fff'" alt="SKPM Logo">
+                </div>
+                <h1 class="gujarati-head">શ્રી સથવારા કડિયા પ્રગતિ મંડળ</h1>
+                <h2 class="english-head">SHREE SATHWARA KADIA PRAGATI MANDAL</h2>
+                <p class="tagline">સેવા | સહકાર | પ્રગતિ (Service | Cooperation | Progress)</p>
+                <p class="contact-info">
+                    Address: Pragati Mandal, Ahmedabad - 382481, Gujarat, India. Web: www.satvarasamaj.com<br>
+                    Contact: Ahmedabad/Gandhinagar, pragatimandal@gmail.com, Morbi: 0000000000
+                </p>
+            </header>
+
+            <div class="title-bar">રસીદ / RECEIPT</div>
+
+            <div class="info-grid">
+                <table class="table-section info-table">
+                    <tr>
+                        <td class="bg-light">રસીદ નં. / Receipt No:</td>
+                    </tr>
+                    <tr>
+                        <td>{receipt_no}</td>
+                    </tr>
+                </table>
+                <table class="table-section info-table">
+                    <tr>
+                        <td class="bg-light">તારીખ / Date:</td>
+                    </tr>
+                    <tr>
+                        <td>{payment_date}</td>
+                    </tr>
+                </table>
+            </div>
+
+            <table class="table-section member-details">
+                <tr>
+                    <th colspan="2">સભાસદ વિગતો / MEMBER DETAILS</th>
+                </tr>
+                <tr>
+                    <td width="40%" class="bg-light">સભાસદ નામ / Member Name:</td>
+                    <td>{donor_name}</td>
+                </tr>
+                <tr>
+                    <td class="bg-light">સભાસદ આઈડી / e-Sabhasad ID:</td>
+                    <td>{sabhasad_id}</td>
+                </tr>
+                <tr>
+                    <td class="bg-light">ગામ / Village:</td>
+                    <td>{village_name}</td>
+                </tr>
+            </table>
+
+            <table class="table-section financial-table">
+                <tr>
+                    <th colspan="3" class="text-center">દાન / ફાળાની વિગતો / DONATION / CONTRIBUTION DETAILS</th>
+                </tr>
+                <tr class="bg-light">
+                    <td width="50%">હેતુ / Purpose</td>
+                    <td width="25%" class="text-center">વર્ષ / Year</td>
+                    <td width="25%" class="text-right">રકમ (₹) / Amount (₹)</td>
+                </tr>
+                <tr>
+                    <td>{purpose}</td>
+                    <td class="text-center">2024-25</td>
+                    <td class="text-right">{amount}</td>
+                </tr>
+                <tr class="total-row">
+                    <td colspan="2" class="text-right">કુલ રકમ / TOTAL AMOUNT:</td>
+                    <td class="text-right">₹ {amount}</td>
+                </tr>
+            </table>
+
+            <div class="words-row">
+                <strong>ફક્ત અક્ષરે / Total Amount in Words:</strong><br>
+                {amount_in_words}
+            </div>
+
+            <div class="footer-row">
+                <div class="signatory">
+                    <p class="signature-font">Authorized Staff</p>
+                    <p class="sig-label">Authorized Signatory</p>
+                    <p style="font-size: 9px; color: var(--navy); margin-top: 5px;">FOR, SHREE SATHWARA<br>KADIA PRAGATI MANDAL</p>
+                </div>
+                <div class="seal-container">
+                    <div class="verified-seal">
+                        <span style="font-size: 8px;">VERIFIED</span>
+                        <div style="margin: 2px 0;">★ ★ ★</div>
+                        <span>OFFICIAL</span>
+                    </div>
+                </div>
+            </div>
+
+            <div class="bottom-banner">
+                એકતા અને સેવા તરફ આગળ (Forward Towards Unity and Service)
+            </div>
+        </div>
+    </div>
+
+    <div class="no-print">
+        <button class="btn" onclick="window.print()">Print Receipt</button>
+        <button class="btn" onclick="window.close()" style="background: #666;">Close</button>
+    </div>
+</body>
+</html>
+"""
+_HTML_TEMPLATE = _compile(_HTML)
@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 from typing import Annotated, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
 from .. import models, schemas, database
 from ..email_utils import send_otp_email
+from ..email_queue import email_queue
+from ..razorpay_webhook import webhook_queue
+from ..razorpay_gateway import gateway as razorpay_gateway
+from .. import user_cache, password_hashing, member_search, member_filter
+from ..identifiers import find_user_by_identifier, classify_identifier, normalize_phone, phone_taken, EMAIL, PHONE
+from ..otp_store import create_otp_store, OTP_MISSING, OTP_EXPIRED, OTP_INVALID, OTP_LOCKED
 import os
-import time
 import random
 from ..cloudinary_config import upload_image, delete_image
 
@@ -24,12 +31,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 ACCESS_TOKEN_EXPIRE_DAYS = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = password_hashing.pwd_context
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
 
-# In-memory OTP store: { email: { "otp": "123456", "expires": timestamp } }
-otp_store = {}
+# OTP store shared by all workers (see app/otp_store.py for backends)
+otp_store = create_otp_store()
 
 # Helpers
 def verify_password(plain_password, hashed_password):
@@ -48,82 +55,121 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(database.get_db)):
+async def check_otp(key: str, otp: str, missing_detail: str):
+    """Validate and consume an OTP, raising the matching HTTP error."""
+    result = await run_in_threadpool(otp_store.verify, key, otp)
+    if result == OTP_MISSING:
+        raise HTTPException(status_code=400, detail=missing_detail)
+    if result == OTP_EXPIRED:
+        raise HTTPException(status_code=400, detail="OTP has expired. Please request a new one.")
+    if result == OTP_LOCKED:
+        raise HTTPException(status_code=429, detail="Too many incorrect attempts. Please wait a few minutes and request a new OTP.")
+    if result == OTP_INVALID:
+        raise HTTPException(status_code=401, detail="Invalid OTP. Please try again.")
+
+def decode_token_subject(token: str):
+    """Return the `sub` claim of a JWT, using the per-process token cache."""
+    username = user_cache.get_token_subject(token)
+    if username is not None:
+        return username
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if username is not None:
+        user_cache.set_token_subject(token, username, payload.get("exp"))
+    return username
+
+async def get_user_by_email(db, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def load_user(db, user_id: int):
+    """(Re)load a user together with its village so UserResponse never lazy-loads."""
+    result = await db.execute(
+        select(models.User)
+        .options(joinedload(models.User.village))
+        .where(models.User.id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(database.get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        username: str = decode_token_subject(token)
         if username is None:
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == token_data.username).first()
+    user = await user_cache.get_user_by_email(db, token_data.username)
     if user is None:
         raise credentials_exception
+    # End the lookup's read transaction before the route runs, so a request
+    # holds no connection (or, in sync mode, session slot) while it awaits
+    # other work, such as a shared index build that needs one of its own
+    await db.commit()
     return user
 
-async def get_current_user_optional(token: Annotated[Optional[str], Depends(oauth2_scheme_optional)], db: Session = Depends(database.get_db)):
+async def get_current_user_optional(token: Annotated[Optional[str], Depends(oauth2_scheme_optional)], db: AsyncSession = Depends(database.get_async_db)):
     if not token:
         return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        username: str = decode_token_subject(token)
         if username is None:
             return None
-        return db.query(models.User).filter(models.User.email == username).first()
+        user = await user_cache.get_user_by_email(db, username)
     except JWTError:
         return None
+    await db.commit()  # as in get_current_user
+    return user
 
 # ─── Standard Auth Routes ─────────────────────────────────────
 
 @router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
     # Check for duplicate email
-    if db.query(models.User).filter(models.User.email == user.email).first():
+    if await get_user_by_email(db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered.")
         
     # Check for duplicate phone number
-    if user.phone_number and db.query(models.User).filter(models.User.phone_number == user.phone_number).first():
+    phone_number = normalize_phone(user.phone_number)
+    if phone_number and await phone_taken(db, user.phone_number):
         raise HTTPException(status_code=400, detail="Phone number already registered.")
 
-    hashed_password = get_password_hash(user.password)
+    # End the read transaction so the pooled connection isn't held while bcrypt runs
+    await db.commit()
+    hashed_password = await password_hashing.hash_password(user.password)
     new_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
         full_name=user.full_name,
-        phone_number=user.phone_number,
+        phone_number=phone_number,
         village_id=user.village_id,
         profession=user.profession,
         date_of_birth=user.date_of_birth,
         status="pending"
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    new_user = await load_user(db, new_user.id)
+    member_search.upsert_user(new_user)
+    member_filter.upsert_user(new_user)
     return new_user
 
 
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     remember_me: bool = Form(False),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    # Retrieve user by email or sabhasad_id
-    from sqlalchemy import or_
-    user = db.query(models.User).filter(
-        or_(
-            models.User.email == form_data.username,
-            models.User.sabhasad_id == form_data.username,
-            models.User.phone_number == form_data.username
-        )
-    ).first()
+    # Retrieve user by email, phone number or sabhasad_id
+    user = await find_user_by_identifier(db, form_data.username)
     
     if not user:
         raise HTTPException(
@@ -132,19 +178,28 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    if not verify_password(form_data.password, user.hashed_password):
+    email, hashed_password = user.email, user.hashed_password
+    # End the read transaction so the pooled connection isn't held while bcrypt runs
+    await db.commit()
+    valid, new_hash = await password_hashing.verify_and_update(form_data.password, hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password. Please try again.",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash used an outdated bcrypt cost — upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
+        user_cache.invalidate_user(email=email)
     if remember_me:
         access_token_expires = timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
     else:
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -155,21 +210,28 @@ async def read_users_me(current_user: Annotated[models.User, Depends(get_current
 async def update_user_me(
     user_update: schemas.UserUpdate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     update_data = user_update.dict(exclude_unset=True)
+    if "full_name" in update_data and not (update_data["full_name"] or "").strip():
+        raise HTTPException(status_code=400, detail="Full name cannot be empty")
+    if "phone_number" in update_data:
+        update_data["phone_number"] = normalize_phone(update_data["phone_number"])
     for key, value in update_data.items():
         setattr(current_user, key, value)
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    user_cache.invalidate_user(current_user)
+    user = await load_user(db, current_user.id)
+    member_search.upsert_user(user)
+    member_filter.upsert_user(user)
+    return user
 
 @router.post("/upload-profile-image", response_model=schemas.UserResponse)
 async def upload_profile_image(
     file: UploadFile = File(...),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     # Validate file type
     if not file.content_type.startswith("image/"):
@@ -182,23 +244,23 @@ async def upload_profile_image(
             raise HTTPException(status_code=400, detail="Uploaded file is empty.")
             
         # Upload to Cloudinary
-        image_url = upload_image(file_content, folder="profile_images")
+        image_url = await run_in_threadpool(upload_image, file_content, folder="profile_images")
         if not image_url:
             raise HTTPException(status_code=500, detail="Failed to upload image to Cloudinary. Please check server logs.")
 
         # Delete old image if it exists on Cloudinary
         if current_user.profile_image:
             try:
-                delete_image(current_user.profile_image)
+                await run_in_threadpool(delete_image, current_user.profile_image)
             except Exception as e:
                 print(f"Non-critical error deleting old image: {e}")
 
         # Update user profile
         current_user.profile_image = image_url
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        user_cache.invalidate_user(current_user)
 
-        return current_user
+        return await load_user(db, current_user.id)
     except HTTPException:
         raise
     except Exception as e:
@@ -207,6 +269,48 @@ async def upload_profile_image(
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error during upload: {str(e)}")
 
+@router.get("/cache-stats")
+async def get_user_cache_stats(current_user: Annotated[models.User, Depends(get_current_user)]):
+    """Hit/miss counters for the token and user caches. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_cache.stats()
+
+@router.get("/email-queue-stats")
+async def get_email_queue_stats(current_user: Annotated[models.User, Depends(get_current_user)]):
+    """Depth, delivery counts and latency of the outbound email queue. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return email_queue.stats()
+
+@router.get("/webhook-queue-stats")
+async def get_webhook_queue_stats(current_user: Annotated[models.User, Depends(get_current_user)]):
+    """Received, duplicate and recorded Razorpay webhook events, queue depth and latency. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return webhook_queue.stats()
+
+@router.get("/razorpay-gateway-stats")
+async def get_razorpay_gateway_stats(current_user: Annotated[models.User, Depends(get_current_user)]):
+    """Razorpay API calls in flight and waiting, errors, timeouts and latency. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return razorpay_gateway.stats()
+
+@router.get("/member-index-stats")
+async def get_member_index_stats(current_user: Annotated[models.User, Depends(get_current_user)]):
+    """Size and age of this worker's member search and filter indexes. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {"search": member_search.stats(), "filter": member_filter.stats()}
+
+@router.get("/db-pool-stats")
+async def get_db_pool_stats(current_user: Annotated[models.User, Depends(get_current_user)]):
+    """Checked-out/idle connections and checkout wait times per engine. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return database.get_pool_stats()
+
 
 # ─── User OTP Login ──────────────────────────────────────────
 
@@ -217,10 +321,10 @@ class CheckDuplicatesRequest(BaseModel):
     phone_number: str
 
 @router.post("/check-duplicates")
-def check_duplicates(request: CheckDuplicatesRequest, db: Session = Depends(database.get_db)):
+async def check_duplicates(request: CheckDuplicatesRequest, db: AsyncSession = Depends(database.get_async_db)):
     """Check if email or phone number is already registered."""
-    email_exists = db.query(models.User).filter(models.User.email == request.email).first() is not None
-    phone_exists = db.query(models.User).filter(models.User.phone_number == request.phone_number).first() is not None
+    email_exists = await db.scalar(select(models.User.id).where(models.User.email == request.email)) is not None
+    phone_exists = await phone_taken(db, request.phone_number)
     
     return {
         "email_exists": email_exists,
@@ -228,60 +332,39 @@ def check_duplicates(request: CheckDuplicatesRequest, db: Session = Depends(data
     }
 
 @router.post("/request-otp")
-def user_request_otp(request: schemas.UserOtpRequest, db: Session = Depends(database.get_db)):
+async def user_request_otp(request: schemas.UserOtpRequest, db: AsyncSession = Depends(database.get_async_db)):
     """Request an OTP for user login. OTP is printed to the server console or emailed."""
-    from sqlalchemy import or_
-    user = db.query(models.User).filter(
-        or_(
-            models.User.email == request.identifier,
-            models.User.phone_number == request.identifier
-        )
-    ).first()
+    kind, identifier = classify_identifier(request.identifier)
+    user = await find_user_by_identifier(db, request.identifier, kinds=(EMAIL, PHONE))
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found. Please register first.")
 
     # Generate 6-digit OTP
     otp = str(random.randint(100000, 999999))
-    otp_store[request.identifier] = {
-        "otp": otp,
-        "expires": time.time() + 300  # 5 minutes
-    }
+    await run_in_threadpool(otp_store.put, identifier, otp)
 
     # If identifier is an email, try sending email
-    if "@" in request.identifier:
-        email_sent = send_otp_email(request.identifier, otp, subject="Your Login OTP")
+    if kind == EMAIL:
+        email_sent = send_otp_email(identifier, otp, subject="Your Login OTP")
         if email_sent:
             return {"message": "OTP sent to your email. Please check your inbox."}
             
     # Fallback to console print for SMS/Email failures or phone numbers
-    print(f"\n{'='*40}\n[DEV LOG] OTP for {request.identifier}: {otp}\n{'='*40}\n", flush=True)
+    print(f"\n{'='*40}\n[DEV LOG] OTP for {identifier}: {otp}\n{'='*40}\n", flush=True)
     return {"message": "OTP generated successfully. (Check server console in DEV mode)"}
 
 @router.post("/verify-otp", response_model=schemas.Token)
-def user_verify_otp(request: schemas.UserOtpVerify, db: Session = Depends(database.get_db)):
+async def user_verify_otp(request: schemas.UserOtpVerify, db: AsyncSession = Depends(database.get_async_db)):
     """Verify the OTP and issue a JWT token for user login."""
-    stored = otp_store.get(request.identifier)
-    if not stored:
-        raise HTTPException(status_code=400, detail="No OTP requested for this identifier. Please request a new OTP.")
-
-    if time.time() > stored["expires"]:
-        del otp_store[request.identifier]
-        raise HTTPException(status_code=400, detail="OTP has expired. Please request a new one.")
+    _, identifier = classify_identifier(request.identifier)
+    await check_otp(identifier, request.otp, "No OTP requested for this identifier. Please request a new OTP.")
 
-    if stored["otp"] != request.otp:
-        raise HTTPException(status_code=401, detail="Invalid OTP. Please try again.")
-
-    # OTP is valid — clean up and issue token
-    del otp_store[request.identifier]
+    # OTP is valid (and consumed) — issue token
     
-    from sqlalchemy import or_
-    user = db.query(models.User).filter(
-        or_(
-            models.User.email == request.identifier,
-            models.User.phone_number == request.identifier
-        )
-    ).first()
+    user = await find_user_by_identifier(db, request.identifier, kinds=(EMAIL, PHONE))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found. Please register first.")
 
     if request.remember_me:
         access_token_expires = timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
@@ -303,9 +386,9 @@ class AdminOtpVerify(BaseModel):
     otp: str
 
 @router.post("/admin/request-otp")
-def admin_request_otp(request: AdminOtpRequest, db: Session = Depends(database.get_db)):
+async def admin_request_otp(request: AdminOtpRequest, db: AsyncSession = Depends(database.get_async_db)):
     """Request an OTP for admin login. OTP is printed to the server console."""
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await get_user_by_email(db, request.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.role != "admin":
@@ -313,10 +396,7 @@ def admin_request_otp(request: AdminOtpRequest, db: Session = Depends(database.g
 
     # Generate 6-digit OTP
     otp = str(random.randint(100000, 999999))
-    otp_store[request.email] = {
-        "otp": otp,
-        "expires": time.time() + 300  # 5 minutes
-    }
+    await run_in_threadpool(otp_store.put, request.email, otp)
 
     # Send OTP via email (falls back to console if SMTP not configured)
     email_sent = send_otp_email(request.email, otp, subject="Admin Login OTP")
@@ -327,23 +407,13 @@ def admin_request_otp(request: AdminOtpRequest, db: Session = Depends(database.g
         return {"message": "OTP generated. Check the server console (email not configured)."}
 
 @router.post("/admin/verify-otp", response_model=schemas.Token)
-def admin_verify_otp(request: AdminOtpVerify, db: Session = Depends(database.get_db)):
+async def admin_verify_otp(request: AdminOtpVerify, db: AsyncSession = Depends(database.get_async_db)):
     """Verify the OTP and issue a JWT token for admin login."""
-    stored = otp_store.get(request.email)
-    if not stored:
-        raise HTTPException(status_code=400, detail="No OTP requested for this email. Please request a new OTP.")
-
-    if time.time() > stored["expires"]:
-        del otp_store[request.email]
-        raise HTTPException(status_code=400, detail="OTP has expired. Please request a new one.")
+    await check_otp(request.email, request.otp, "No OTP requested for this email. Please request a new OTP.")
 
-    if stored["otp"] != request.otp:
-        raise HTTPException(status_code=401, detail="Invalid OTP. Please try again.")
+    # OTP is valid (and consumed) — issue token
 
-    # OTP is valid — clean up and issue token
-    del otp_store[request.email]
-
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await get_user_by_email(db, request.email)
     if not user or user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied.")
 
@@ -364,17 +434,14 @@ class ForgotPasswordReset(BaseModel):
     new_password: str
 
 @router.post("/forgot-password/request-otp")
-def forgot_password_request_otp(request: ForgotPasswordRequest, db: Session = Depends(database.get_db)):
+async def forgot_password_request_otp(request: ForgotPasswordRequest, db: AsyncSession = Depends(database.get_async_db)):
     """Request an OTP for password reset."""
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await get_user_by_email(db, request.email)
     if not user:
         raise HTTPException(status_code=404, detail="Email not registered. Please register first.")
 
     otp = str(random.randint(100000, 999999))
-    otp_store[f"reset_{request.email}"] = {
-        "otp": otp,
-        "expires": time.time() + 300  # 5 minutes
-    }
+    await run_in_threadpool(otp_store.put, f"reset_{request.email}", otp)
     email_sent = send_otp_email(request.email, otp, subject="Password Reset OTP")
     if email_sent:
         return {"message": "OTP sent to your email. Please check your inbox."}
@@ -382,34 +449,25 @@ def forgot_password_request_otp(request: ForgotPasswordRequest, db: Session = De
         return {"message": "OTP generated. Check the server console (email not configured)."}
 
 @router.post("/forgot-password/reset")
-def forgot_password_reset(request: ForgotPasswordReset, db: Session = Depends(database.get_db)):
+async def forgot_password_reset(request: ForgotPasswordReset, db: AsyncSession = Depends(database.get_async_db)):
     """Verify the OTP and reset the user's password."""
     store_key = f"reset_{request.email}"
-    stored = otp_store.get(store_key)
-    
-    if not stored:
-        raise HTTPException(status_code=400, detail="No OTP requested for this email. Please request a new OTP.")
-
-    if time.time() > stored["expires"]:
-        del otp_store[store_key]
-        raise HTTPException(status_code=400, detail="OTP has expired. Please request a new one.")
-
-    if stored["otp"] != request.otp:
-        raise HTTPException(status_code=401, detail="Invalid OTP. Please try again.")
+    await check_otp(store_key, request.otp, "No OTP requested for this email. Please request a new OTP.")
 
-    # OTP is valid — update password and clean up
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    # OTP is valid — hash before touching the DB so no connection is held while bcrypt runs
+    hashed_password = await password_hashing.hash_password(request.new_password)
+    user = await get_user_by_email(db, request.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
 
-    user.hashed_password = get_password_hash(request.new_password)
-    db.commit()
-    del otp_store[store_key]
+    user.hashed_password = hashed_password
+    await db.commit()
+    user_cache.invalidate_user(user)
 
     return {"message": "Password reset successfully. You can now login with your new password."}
 
 @router.post("/check-email")
-def check_email(request: ForgotPasswordRequest, db: Session = Depends(database.get_db)):
+async def check_email(request: ForgotPasswordRequest, db: AsyncSession = Depends(database.get_async_db)):
     """Check if an email is already registered. Returns {"exists": True/False}"""
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await get_user_by_email(db, request.email)
     return {"exists": user is not None}
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List, Annotated
 from pydantic import BaseModel
-from .. import models, schemas, database
-from ..config import razorpay_client, RAZORPAY_KEY_ID
+from .. import models, schemas, database, payment_ingest, razorpay_gateway
+from ..config import get_razorpay_client, RAZORPAY_KEY_ID
 from .auth import get_current_user
 from ..cloudinary_config import upload_image, delete_image
 import uuid
@@ -22,21 +24,21 @@ async def upload_event_image(
         raise HTTPException(status_code=403, detail="Admin access required")
         
     # Upload to Cloudinary
-    image_url = upload_image(file.file, folder="events")
+    image_url = await run_in_threadpool(upload_image, file.file, folder="events")
     if not image_url:
         raise HTTPException(status_code=500, detail="Failed to upload image to Cloudinary")
         
     return {"url": image_url}
 
 @router.get("/", response_model=List[schemas.DonationEvent])
-def list_events(db: Session = Depends(database.get_db)):
-    return db.query(models.DonationEvent).order_by(models.DonationEvent.created_at.desc()).all()
+async def list_events(db: AsyncSession = Depends(database.get_read_db)):
+    return (await db.scalars(select(models.DonationEvent).order_by(models.DonationEvent.created_at.desc()))).all()
 
 @router.post("/", response_model=schemas.DonationEvent)
-def create_event(
+async def create_event(
     event: schemas.DonationEventCreate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -49,21 +51,21 @@ def create_event(
         category=event.category
     )
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.refresh(db_event)
     return db_event
 
 @router.patch("/{event_id}", response_model=schemas.DonationEvent)
-def update_event(
+async def update_event(
     event_id: int,
     event_update: schemas.DonationEventUpdate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    db_event = db.query(models.DonationEvent).filter(models.DonationEvent.id == event_id).first()
+    db_event = await db.get(models.DonationEvent, event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
     
@@ -71,34 +73,34 @@ def update_event(
     
     # If image is being updated, delete the old one
     if "image" in update_data and db_event.image and update_data["image"] != db_event.image:
-        delete_image(db_event.image)
+        await run_in_threadpool(delete_image, db_event.image)
 
     for key, value in update_data.items():
         setattr(db_event, key, value)
     
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.refresh(db_event)
     return db_event
 
 @router.delete("/{event_id}")
-def delete_event(
+async def delete_event(
     event_id: int,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    db_event = db.query(models.DonationEvent).filter(models.DonationEvent.id == event_id).first()
+    db_event = await db.get(models.DonationEvent, event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
     
     # Delete image from Cloudinary if it exists
     if db_event.image:
-        delete_image(db_event.image)
+        await run_in_threadpool(delete_image, db_event.image)
 
-    db.delete(db_event)
-    db.commit()
+    await db.delete(db_event)
+    await db.commit()
     return {"message": "Event deleted successfully"}
 
 class DonateRequest(BaseModel):
@@ -111,14 +113,14 @@ class VerifyDonationRequest(BaseModel):
     amount: float
 
 @router.post("/{event_id}/donate")
-def create_donation_order(
+async def create_donation_order(
     event_id: int,
     donation: DonateRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Create a Razorpay order for a donation to an event."""
-    event = db.query(models.DonationEvent).filter(models.DonationEvent.id == event_id).first()
+    event = await db.get(models.DonationEvent, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
@@ -128,20 +130,19 @@ def create_donation_order(
     # Razorpay expects amount in paise (1 INR = 100 paise)
     amount_in_paise = int(donation.amount * 100)
 
-    try:
-        order_data = {
-            "amount": amount_in_paise,
-            "currency": "INR",
-            "receipt": f"DON-{event_id}-{uuid.uuid4().hex[:8]}",
-            "notes": {
-                "event_id": str(event_id),
-                "user_id": str(current_user.id),
-                "event_title": event.title
-            }
+    order_data = {
+        "amount": amount_in_paise,
+        "currency": "INR",
+        "receipt": f"DON-{event_id}-{uuid.uuid4().hex[:8]}",
+        "notes": {
+            "event_id": str(event_id),
+            "user_id": str(current_user.id),
+            "event_title": event.title
         }
-        razorpay_order = razorpay_client.order.create(data=order_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
+    }
+    razorpay_order = await razorpay_gateway.checkout_order(
+        razorpay_gateway.MAIN, order_data, "Failed to create payment order"
+    )
 
     return {
         "order_id": razorpay_order["id"],
@@ -152,20 +153,20 @@ def create_donation_order(
     }
 
 @router.post("/{event_id}/verify-donation")
-def verify_donation(
+async def verify_donation(
     event_id: int,
     payment: VerifyDonationRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Verify Razorpay payment signature and record the donation."""
-    event = db.query(models.DonationEvent).filter(models.DonationEvent.id == event_id).first()
+    event = await db.get(models.DonationEvent, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
     # Verify the payment signature
     try:
-        razorpay_client.utility.verify_payment_signature({
+        get_razorpay_client().utility.verify_payment_signature({
             "razorpay_order_id": payment.razorpay_order_id,
             "razorpay_payment_id": payment.razorpay_payment_id,
             "razorpay_signature": payment.razorpay_signature
@@ -173,23 +174,16 @@ def verify_donation(
     except Exception:
         raise HTTPException(status_code=400, detail="Payment verification failed. Invalid signature.")
 
-    # Signature is valid — record the payment
-    db_payment = models.Payment(
-        user_id=current_user.id,
-        amount=payment.amount,
-        transaction_id=payment.razorpay_payment_id,
-        status="completed"
+    # Signature is valid — record the payment and add it to the event's total
+    # (once, even if the client retries or the webhook got there first)
+    recorded = await payment_ingest.record(
+        db, payment.razorpay_payment_id, payment.amount, "general", current_user.id, event_id=event.id
     )
-    db.add(db_payment)
-
-    # Update event raised amount
-    event.raised = (event.raised or 0) + payment.amount
-    db.commit()
 
     return {
         "message": "Donation successful",
-        "amount": payment.amount,
+        "amount": recorded.payment.amount,
         "event_title": event.title,
-        "new_total": event.raised,
+        "new_total": recorded.event_raised,
         "transaction_id": payment.razorpay_payment_id
     }
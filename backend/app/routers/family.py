@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated, List
 from .. import models, schemas, database
 from .auth import get_current_user
@@ -9,26 +10,25 @@ router = APIRouter(
     tags=["family"]
 )
 
+def family_members_query(user_id: int):
+    return select(models.FamilyMember).where(models.FamilyMember.user_id == user_id)
+
 @router.get("/", response_model=List[schemas.FamilyMemberResponse])
-def get_family_members(
+async def get_family_members(
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Get all family members for the logged-in user (flat list)."""
-    members = db.query(models.FamilyMember).filter(
-        models.FamilyMember.user_id == current_user.id
-    ).all()
+    members = (await db.scalars(family_members_query(current_user.id))).all()
     return members
 
 @router.get("/tree")
-def get_family_tree(
+async def get_family_tree(
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Get the family tree as a nested structure. Root = user themselves."""
-    members = db.query(models.FamilyMember).filter(
-        models.FamilyMember.user_id == current_user.id
-    ).all()
+    members = (await db.scalars(family_members_query(current_user.id))).all()
 
     # Build a map of id -> member data
     member_map = {}
@@ -67,24 +67,24 @@ def get_family_tree(
     return tree
 
 @router.get("/tree/{user_id}")
-def get_user_family_tree(
+async def get_user_family_tree(
     user_id: int,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Get the family tree for a specific user (public to authenticated users)."""
     # Verify the target user exists and is a member
-    target_user = db.query(models.User).filter(
+    target_user = await db.scalar(select(models.User).where(
         models.User.id == user_id,
         models.User.status == "member"
-    ).first()
+    ))
     
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    members = db.query(models.FamilyMember).filter(
+    members = (await db.scalars(select(models.FamilyMember).where(
         models.FamilyMember.user_id == user_id
-    ).all()
+    ))).all()
 
     # Build a map of id -> member data
     member_map = {}
@@ -124,26 +124,26 @@ def get_user_family_tree(
 
 
 @router.post("/", response_model=schemas.FamilyMemberResponse, status_code=status.HTTP_201_CREATED)
-def add_family_member(
+async def add_family_member(
     member: schemas.FamilyMemberCreate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Add a new family member to the current user's tree."""
     
     # Check parent exists and belongs to this user
     if member.parent_id:
-        parent = db.query(models.FamilyMember).filter(
+        parent = await db.scalar(select(models.FamilyMember).where(
             models.FamilyMember.id == member.parent_id,
             models.FamilyMember.user_id == current_user.id
-        ).first()
+        ))
         if not parent:
             raise HTTPException(status_code=404, detail="Parent family member not found or doesn't belong to you")
 
     # If linked_sabhasad_id is provided, look up the target user
     linked_user_id = None
     if member.linked_sabhasad_id:
-        linked_target = db.query(models.User).filter(models.User.sabhasad_id == member.linked_sabhasad_id).first()
+        linked_target = await db.scalar(select(models.User).where(models.User.sabhasad_id == member.linked_sabhasad_id))
         if not linked_target:
             raise HTTPException(status_code=404, detail=f"No community member found with Sabhasad ID: {member.linked_sabhasad_id}")
         linked_user_id = linked_target.id
@@ -160,20 +160,18 @@ def add_family_member(
     )
     
     db.add(db_member)
-    db.commit()
-    db.refresh(db_member)
+    await db.commit()
+    await db.refresh(db_member)
     return db_member
 
 @router.delete("/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_family_member(
+async def delete_family_member(
     member_id: int,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Delete a family member and reassign their children to no parent (root level)."""
-    member = db.query(models.FamilyMember).filter(
-        models.FamilyMember.id == member_id
-    ).first()
+    member = await db.get(models.FamilyMember, member_id)
     
     if not member:
         raise HTTPException(status_code=404, detail="Family member not found")
@@ -182,9 +180,9 @@ def delete_family_member(
         raise HTTPException(status_code=403, detail="Not authorized to delete this family member")
 
     # Move children to root level
-    db.query(models.FamilyMember).filter(
+    await db.execute(update(models.FamilyMember).where(
         models.FamilyMember.parent_id == member_id
-    ).update({"parent_id": None})
+    ).values(parent_id=None))
 
-    db.delete(member)
-    db.commit()
+    await db.delete(member)
+    await db.commit()
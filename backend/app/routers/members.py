@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Annotated
 from datetime import datetime, date
 from pydantic import BaseModel
-from .. import models, schemas, database
-from .auth import get_current_user
+from .. import models, schemas, database, user_cache, pagination, member_search, member_filter
+from .auth import get_current_user, load_user
 
 router = APIRouter(
     prefix="/members",
@@ -20,51 +22,166 @@ class MembershipApplication(BaseModel):
 class AdminAction(BaseModel):
     comment: Optional[str] = None
 
+# Keyset sort keys for the directory; each has a matching (key, id) index
+MEMBER_SORT_KEYS = {
+    "name": [models.User.full_name, models.User.id],
+    "created_at": [models.User.created_at, models.User.id],
+}
+
+def members_query(village_id: Optional[int] = None):
+    """Directory members; ix_users_status / ix_users_village_id_status serve the filters."""
+    query = select(models.User).options(selectinload(models.User.village)).where(
+        models.User.status.in_(["approved", "member"]),
+        models.User.role != "admin"
+    )
+    if village_id:
+        query = query.where(models.User.village_id == village_id)
+    return query
+
+def pending_members_query():
+    return select(models.User).options(selectinload(models.User.village)).where(models.User.status == "pending")
+
 @router.get("/", response_model=List[schemas.UserResponse])
-def read_members(
+async def read_members(
+    response: Response,
     skip: int = 0, 
-    limit: int = 100, 
+    limit: int = Query(100, ge=1, le=500),
     village_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "name",
+    include_total: bool = False,
     current_user: Annotated[models.User, Depends(get_current_user)] = None,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    """List members. Requires authenticated user with approved/member/admin status."""
+    """List members. Requires authenticated user with approved/member/admin status.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next
+    page. With include_total, X-Total-Count is exact when filtered by village
+    and a planner estimate otherwise (see X-Total-Count-Exact).
+    """
     if not current_user or current_user.status not in ("approved", "member") and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="You must be an approved member to view the members list")
-    
-    query = db.query(models.User).filter(
-        models.User.status.in_(["approved", "member"]),
-        models.User.role != "admin"
+    if sort not in MEMBER_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(MEMBER_SORT_KEYS)}")
+
+    columns = MEMBER_SORT_KEYS[sort]
+    query = pagination.keyset(members_query(village_id), columns, cursor, limit)
+    if skip and not cursor:
+        # Legacy offset paging; cursors are preferred for deep pages
+        query = query.offset(skip)
+    result = await db.execute(query)
+    members, next_cursor = pagination.page(
+        result.scalars().all(), limit, lambda u: [getattr(u, c.key) for c in columns]
     )
-    if village_id:
-        query = query.filter(models.User.village_id == village_id)
-        
-    users = query.offset(skip).limit(limit).all()
-    return users
+
+    total = await pagination.count(db, members_query(village_id), exact=bool(village_id)) if include_total else None
+    pagination.set_page_headers(response, next_cursor, total)
+    return members
 
 @router.get("/pending", response_model=List[schemas.UserResponse])
-def get_pending_members(
+async def get_pending_members(
+    response: Response,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db)
 ):
+    """Pending applications, oldest first, with the exact pending total in X-Total-Count."""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
-    return db.query(models.User).filter(models.User.status == "pending").all()
+    columns = [models.User.created_at, models.User.id]
+    result = await db.execute(pagination.keyset(pending_members_query(), columns, cursor, limit))
+    pending, next_cursor = pagination.page(
+        result.scalars().all(), limit, lambda u: [u.created_at, u.id]
+    )
+    total = await pagination.count(db, pending_members_query(), exact=True)
+    pagination.set_page_headers(response, next_cursor, total)
+    return pending
+
+@router.get("/search", response_model=List[schemas.UserResponse])
+async def search_members(
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Ranked search over name, profession, phone, Sabhasad ID and village.
+
+    Matches prefixes, substrings and near-misses, in Gujarati or Latin script.
+    Admins also see pending applicants.
+    """
+    if current_user.status not in ("approved", "member") and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    await member_search.ensure_index()
+    if current_user.role == "admin":
+        hits = member_search.search(q, limit, statuses={"pending", "approved", "member"})
+    else:
+        hits = member_search.search(q, limit, statuses={"approved", "member"}, exclude_roles={"admin"})
+    if not hits:
+        return []
+
+    ids = [member_id for member_id, _ in hits]
+    result = await db.execute(
+        select(models.User).options(selectinload(models.User.village)).where(models.User.id.in_(ids))
+    )
+    by_id = {user.id: user for user in result.scalars().all()}
+    # Keep the index's ranking; skip anyone deleted since it was built
+    return [by_id[member_id] for member_id in ids if member_id in by_id]
+
+@router.post("/query", response_model=schemas.MemberQueryResponse)
+async def query_members(
+    query: schemas.MemberQuery,
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Filter members by any AND/OR/NOT combination of village, status,
+    profession, position, age and payment, with facet counts. Admin only.
+
+    Answered from an in-memory bitmap snapshot of the users table, so any
+    combination costs the same and needs no dedicated index. Members come
+    back in id order; pass X-Next-Cursor back as `cursor` for the next page.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    after_id = pagination.decode_cursor(query.cursor, 1)[0] if query.cursor else None
+    if after_id is not None and not isinstance(after_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    await member_filter.ensure_index()
+    total, facets, ids, more = member_filter.query(
+        query.filter.model_dump(by_alias=True, exclude_none=True), query.facets, query.limit, after_id
+    )
+    members = []
+    if ids:
+        result = await db.execute(
+            select(models.User).options(selectinload(models.User.village)).where(models.User.id.in_(ids))
+        )
+        by_id = {user.id: user for user in result.scalars().all()}
+        members = [by_id[member_id] for member_id in ids if member_id in by_id]
+
+    pagination.set_page_headers(response, pagination.encode_cursor([ids[-1]]) if more else None)
+    return {"total": total, "facets": facets, "members": members}
 
 @router.get("/{member_id}", response_model=schemas.UserResponse)
-def get_member(
+async def get_member(
     member_id: int,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Get profile of a specific member. Requires approved+ status."""
     if current_user.status not in ("approved", "member") and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    user = db.query(models.User).filter(
-        models.User.id == member_id, 
-        models.User.status.in_(["approved", "member"])
-    ).first()
+    result = await db.execute(
+        select(models.User).options(joinedload(models.User.village)).where(
+            models.User.id == member_id, 
+            models.User.status.in_(["approved", "member"])
+        )
+    )
+    user = result.scalars().first()
     
     if not user:
         raise HTTPException(status_code=404, detail="Member not found")
@@ -72,16 +189,17 @@ def get_member(
     return user
 
 @router.put("/apply", response_model=schemas.UserResponse)
-def apply_for_membership(
+async def apply_for_membership(
     application: MembershipApplication,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
+    current_user = await user_cache.fresh(db, current_user)
     if current_user.status in ("approved", "member"):
         raise HTTPException(status_code=400, detail="You are already approved or a member")
 
     # Verify village exists
-    village = db.query(models.Village).filter(models.Village.id == application.village_id).first()
+    village = await db.get(models.Village, application.village_id)
     if not village:
         raise HTTPException(status_code=404, detail="Village not found")
 
@@ -91,22 +209,25 @@ def apply_for_membership(
     current_user.date_of_birth = application.date_of_birth
     current_user.status = "pending"
 
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    user_cache.invalidate_user(current_user)
+    user = await load_user(db, current_user.id)
+    member_search.upsert_user(user)
+    member_filter.upsert_user(user)
+    return user
 
 
 @router.put("/{member_id}/approve", response_model=schemas.UserResponse)
-def approve_member(
+async def approve_member(
     member_id: int,
     action: AdminAction,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    user = db.query(models.User).filter(models.User.id == member_id).first()
+    user = await db.get(models.User, member_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.status != "pending":
@@ -114,46 +235,56 @@ def approve_member(
 
     user.status = "approved"
     user.admin_comment = action.comment or "Application approved"
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    user_cache.invalidate_user(user)
+    user = await load_user(db, user.id)
+    member_search.upsert_user(user)
+    member_filter.upsert_user(user)
     return user
 
 
 @router.put("/{member_id}/reject")
-def reject_member(
+async def reject_member(
     member_id: int,
     action: AdminAction,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    user = db.query(models.User).filter(models.User.id == member_id).first()
+    user = await db.get(models.User, member_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.status != "pending":
         raise HTTPException(status_code=400, detail="User is not in pending status")
 
-    db.delete(user)
-    db.commit()
+    email = user.email
+    await db.delete(user)
+    await db.commit()
+    user_cache.invalidate_user(email=email)
+    member_search.remove_user(member_id)
+    member_filter.remove_user(member_id)
     return {"message": "Application rejected and user removed successfully"}
 @router.put("/{member_id}/position", response_model=schemas.UserResponse)
-def update_member_position(
+async def update_member_position(
     member_id: int,
     position_data: schemas.UserPositionUpdate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Update a member's official position. Admin only."""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    user = db.query(models.User).filter(models.User.id == member_id).first()
+    user = await db.get(models.User, member_id)
     if not user:
         raise HTTPException(status_code=404, detail="Member not found")
 
     user.position = position_data.position
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    user_cache.invalidate_user(user)
+    user = await load_user(db, user.id)
+    member_search.upsert_user(user)
+    member_filter.upsert_user(user)
     return user
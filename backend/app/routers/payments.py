@@ -1,20 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from datetime import datetime, date
-from sqlalchemy.orm import Session
-from sqlalchemy import func, Date, Integer, extract
-from typing import List, Annotated
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Annotated, Literal
 from pydantic import BaseModel
-from .. import models, schemas, database
-from ..config import razorpay_client, razorpay_client_special, RAZORPAY_KEY_ID, RAZORPAY_KEY_ID_SPECIAL
+from .. import models, schemas, database, local_time, pagination, payment_chart, payment_ingest, payment_rollups, razorpay_gateway, razorpay_webhook, receipts, user_cache
+from ..config import (
+    get_razorpay_client, get_razorpay_client_special, RAZORPAY_KEY_ID, RAZORPAY_KEY_ID_SPECIAL,
+    RAZORPAY_WEBHOOK_SECRET, RAZORPAY_WEBHOOK_SECRET_SPECIAL,
+)
 from .auth import get_current_user, get_current_user_optional
+import json
 import uuid
-import io
-from fastapi.responses import Response, HTMLResponse
-from reportlab.lib.pagesizes import A5
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.units import cm
 
 router = APIRouter(
     prefix="/payments",
@@ -34,51 +31,40 @@ class VerifyPaymentRequest(BaseModel):
     amount: float
     purpose: str = "general"
 
-def generate_sabhasad_id(db: Session) -> str:
-    """Generate next sequential Sabhasad ID like eSAB-0001, eSAB-0002, etc."""
-    # Find highest existing sabhasad_id
-    last = db.query(models.User).filter(
-        models.User.sabhasad_id.isnot(None)
-    ).order_by(models.User.sabhasad_id.desc()).first()
-    
-    if last and last.sabhasad_id:
-        try:
-            num = int(last.sabhasad_id.split("-")[1]) + 1
-        except (IndexError, ValueError):
-            num = 1
-    else:
-        num = 1
-    
-    return f"eSAB-{num:04d}"
-
 # ─── Membership Payment ───────────────────────────────────
 
 @router.post("/membership/create-order")
-def create_membership_order(
+async def create_membership_order(
     current_user: Annotated[models.User, Depends(get_current_user)],
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Create a Razorpay order for membership payment. Only for approved users."""
+    # The cached user may predate the approval (made on another worker)
+    current_user = await user_cache.fresh(db, current_user)
     if current_user.status != "approved":
         raise HTTPException(status_code=400, detail="Only approved users can pay the membership fee")
     
     if current_user.sabhasad_id:
         raise HTTPException(status_code=400, detail="You already have a Sabhasad ID")
 
+    user_id = current_user.id
+    # Hold no connection during the gateway call (this expires current_user)
+    await db.rollback()
+
     amount_in_paise = int(MEMBERSHIP_FEE * 100)
 
-    try:
-        order_data = {
-            "amount": amount_in_paise,
-            "currency": "INR",
-            "receipt": f"MEM-{uuid.uuid4().hex[:8]}",
-            "notes": {
-                "user_id": str(current_user.id),
-                "purpose": "membership_fee"
-            }
+    order_data = {
+        "amount": amount_in_paise,
+        "currency": "INR",
+        "receipt": f"MEM-{uuid.uuid4().hex[:8]}",
+        "notes": {
+            "user_id": str(user_id),
+            "purpose": "membership_fee"
         }
-        razorpay_order = razorpay_client.order.create(data=order_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
+    }
+    razorpay_order = await razorpay_gateway.checkout_order(
+        razorpay_gateway.MAIN, order_data, "Failed to create payment order"
+    )
 
     return {
         "order_id": razorpay_order["id"],
@@ -88,18 +74,15 @@ def create_membership_order(
     }
 
 @router.post("/membership/verify")
-def verify_membership_payment(
+async def verify_membership_payment(
     payment: VerifyPaymentRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Verify membership payment, assign Sabhasad ID, and upgrade to member status."""
-    if current_user.status != "approved":
-        raise HTTPException(status_code=400, detail="Only approved users can complete membership payment")
-
     # Verify the payment signature
     try:
-        razorpay_client.utility.verify_payment_signature({
+        get_razorpay_client().utility.verify_payment_signature({
             "razorpay_order_id": payment.razorpay_order_id,
             "razorpay_payment_id": payment.razorpay_payment_id,
             "razorpay_signature": payment.razorpay_signature
@@ -107,27 +90,29 @@ def verify_membership_payment(
     except Exception:
         raise HTTPException(status_code=400, detail="Payment verification failed. Invalid signature.")
 
-    # Record the payment
-    db_payment = models.Payment(
-        user_id=current_user.id,
-        amount=payment.amount,
-        transaction_id=payment.razorpay_payment_id,
-        status="completed"
-    )
-    db.add(db_payment)
-
-    # Generate Sabhasad ID and upgrade status
-    sabhasad_id = generate_sabhasad_id(db)
-    current_user.sabhasad_id = sabhasad_id
-    current_user.status = "member"
-
-    db.commit()
-    db.refresh(current_user)
+    current_user = await user_cache.fresh(db, current_user)
+    if current_user.status != "approved":
+        # A retry of the verification (or webhook) that already made them a member gets the same answer
+        existing = await payment_ingest.find(db, payment.razorpay_payment_id)
+        if existing is None or existing.user_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Only approved users can complete membership payment")
 
+    recorded = await payment_ingest.record(
+        db, payment.razorpay_payment_id, payment.amount, payment_ingest.MEMBERSHIP_PURPOSE, current_user.id
+    )
+    if recorded.payment.user_id != current_user.id:
+        raise HTTPException(status_code=409, detail="This payment is already recorded for another account")
+    if recorded.user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if recorded.payment.purpose != payment_ingest.MEMBERSHIP_PURPOSE and not recorded.user.sabhasad_id:
+        raise HTTPException(
+            status_code=409,
+            detail=f"This payment is already recorded as a {recorded.payment.purpose} payment, not a membership fee"
+        )
     return {
         "message": "Payment successful! Welcome to the community!",
-        "sabhasad_id": sabhasad_id,
-        "status": "member"
+        "sabhasad_id": recorded.user.sabhasad_id,
+        "status": recorded.user.status
     }
 
 @router.get("/membership/fee")
@@ -138,7 +123,7 @@ def get_membership_fee():
 # ─── General Payments ─────────────────────────────────────
 
 @router.post("/create-order")
-def create_order(
+async def create_order(
     order: CreateOrderRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
 ):
@@ -148,19 +133,18 @@ def create_order(
 
     amount_in_paise = int(order.amount * 100)
 
-    try:
-        order_data = {
-            "amount": amount_in_paise,
-            "currency": "INR",
-            "receipt": f"PAY-{uuid.uuid4().hex[:8]}",
-            "notes": {
-                "user_id": str(current_user.id),
-                "purpose": order.purpose
-            }
+    order_data = {
+        "amount": amount_in_paise,
+        "currency": "INR",
+        "receipt": f"PAY-{uuid.uuid4().hex[:8]}",
+        "notes": {
+            "user_id": str(current_user.id),
+            "purpose": order.purpose
         }
-        razorpay_order = razorpay_client.order.create(data=order_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
+    }
+    razorpay_order = await razorpay_gateway.checkout_order(
+        razorpay_gateway.MAIN, order_data, "Failed to create payment order"
+    )
 
     return {
         "order_id": razorpay_order["id"],
@@ -171,14 +155,14 @@ def create_order(
     }
 
 @router.post("/verify", response_model=schemas.Payment)
-def verify_payment(
+async def verify_payment(
     payment: VerifyPaymentRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Verify Razorpay payment signature and record the payment."""
     try:
-        razorpay_client.utility.verify_payment_signature({
+        get_razorpay_client().utility.verify_payment_signature({
             "razorpay_order_id": payment.razorpay_order_id,
             "razorpay_payment_id": payment.razorpay_payment_id,
             "razorpay_signature": payment.razorpay_signature
@@ -186,22 +170,15 @@ def verify_payment(
     except Exception:
         raise HTTPException(status_code=400, detail="Payment verification failed. Invalid signature.")
 
-    db_payment = models.Payment(
-        user_id=current_user.id,
-        amount=payment.amount,
-        transaction_id=payment.razorpay_payment_id,
-        status="completed",
-        purpose=payment.purpose
+    recorded = await payment_ingest.record(
+        db, payment.razorpay_payment_id, payment.amount, payment.purpose, current_user.id
     )
-    db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
-    return db_payment
+    return recorded.payment
 
 # ─── Special Welfare Fund ─────────────────────────────────
 
 @router.post("/special/create-order")
-def create_special_order(
+async def create_special_order(
     order: CreateOrderRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
 ):
@@ -211,20 +188,19 @@ def create_special_order(
 
     amount_in_paise = int(order.amount * 100)
 
-    try:
-        order_data = {
-            "amount": amount_in_paise,
-            "currency": "INR",
-            "receipt": f"SPF-{uuid.uuid4().hex[:8]}",
-            "notes": {
-                "user_id": str(current_user.id),
-                "purpose": "special_fund"
-            }
+    order_data = {
+        "amount": amount_in_paise,
+        "currency": "INR",
+        "receipt": f"SPF-{uuid.uuid4().hex[:8]}",
+        "notes": {
+            "user_id": str(current_user.id),
+            "purpose": "special_fund"
         }
-        # Use the special client for this fund
-        razorpay_order = razorpay_client_special.order.create(data=order_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create special fund order: {str(e)}")
+    }
+    # Orders for this fund go to the special account
+    razorpay_order = await razorpay_gateway.checkout_order(
+        razorpay_gateway.SPECIAL, order_data, "Failed to create special fund order"
+    )
 
     return {
         "order_id": razorpay_order["id"],
@@ -235,15 +211,15 @@ def create_special_order(
     }
 
 @router.post("/special/verify", response_model=schemas.Payment)
-def verify_special_payment(
+async def verify_special_payment(
     payment: VerifyPaymentRequest,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Verify special fund payment using the special client."""
     try:
         # Use the special client to verify
-        razorpay_client_special.utility.verify_payment_signature({
+        get_razorpay_client_special().utility.verify_payment_signature({
             "razorpay_order_id": payment.razorpay_order_id,
             "razorpay_payment_id": payment.razorpay_payment_id,
             "razorpay_signature": payment.razorpay_signature
@@ -251,465 +227,80 @@ def verify_special_payment(
     except Exception:
         raise HTTPException(status_code=400, detail="Payment verification failed. Invalid signature.")
 
-    db_payment = models.Payment(
-        user_id=current_user.id,
-        amount=payment.amount,
-        transaction_id=payment.razorpay_payment_id,
-        status="completed",
-        purpose="special_fund"
+    recorded = await payment_ingest.record(
+        db, payment.razorpay_payment_id, payment.amount, razorpay_webhook.SPECIAL_FUND_PURPOSE, current_user.id
     )
-    db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
-    return db_payment
+    return recorded.payment
+
+# ─── Razorpay Webhooks ────────────────────────────────────
+
+async def accept_webhook(request: Request, account: str, secret: str):
+    if not secret:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+    body = await request.body()
+    if not razorpay_webhook.signature_valid(body, request.headers.get("x-razorpay-signature"), secret):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not JSON")
+
+    queue = razorpay_webhook.webhook_queue
+    queue.count("received")
+    capture = razorpay_webhook.parse(event, account)
+    if capture is None:
+        queue.count("ignored")
+        return {"status": "ignored"}
+    status = queue.submit(capture)
+    if status == "full":
+        # Razorpay redelivers on any non-2xx answer
+        raise HTTPException(status_code=503, detail="Webhook queue is full, retry later")
+    return {"status": status}
+
+@router.post("/webhook")
+async def razorpay_payment_webhook(request: Request):
+    """Record payments captured on the main Razorpay account (payment.captured, order.paid)."""
+    return await accept_webhook(request, razorpay_webhook.MAIN, RAZORPAY_WEBHOOK_SECRET)
+
+@router.post("/special/webhook")
+async def razorpay_special_webhook(request: Request):
+    """Record payments captured on the Special Welfare Fund account."""
+    return await accept_webhook(request, razorpay_webhook.SPECIAL, RAZORPAY_WEBHOOK_SECRET_SPECIAL)
 
 # ─── Receipts ─────────────────────────────────────────────
 
 @router.get("/{payment_id}/receipt")
-def get_payment_receipt(
+async def get_payment_receipt(
     payment_id: int,
-    db: Session = Depends(database.get_db)
+    request: Request,
+    fmt: Literal[receipts.FORMATS] = Query(receipts.HTML, alias="format"),
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    """Generate a premium, branded HTML receipt for a payment."""
-    payment = db.query(models.Payment).filter(models.Payment.id == payment_id).first()
-    if not payment:
+    """Branded receipt for a payment, as HTML (default) or ?format=pdf. Cached; see app/receipts.py."""
+    row = (await db.execute(receipts.receipt_query(payment_id))).one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Payment record not found")
-    
-    user = db.query(models.User).filter(models.User.id == payment.user_id).first()
-    donor_name = user.full_name if user else "Community Supporter"
-    sabhasad_id = user.sabhasad_id if user and user.sabhasad_id else "N/A"
-    village_name = user.village.name if user and user.village else "N/A"
-    receipt_no = f"REC-{payment.id:06d}"
-    payment_date = payment.created_at.strftime("%d %B %Y") if payment.created_at else "—"
-    purpose = payment.purpose.replace("_", " ").title() if payment.purpose else "Donation"
-
-    # Amount in words logic (simple version for Indian Rupees)
-    def number_to_words(n):
-        units = ["", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen", "Nineteen"]
-        tens = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
-        if n < 20: return units[n]
-        if n < 100: return tens[n // 10] + (" " + units[n % 10] if (n % 10 != 0) else "")
-        if n < 1000: return units[n // 100] + " Hundred" + (" and " + number_to_words(n % 100) if (n % 100 != 0) else "")
-        if n < 100000: return number_to_words(n // 1000) + " Thousand" + (" " + number_to_words(n % 1000) if (n % 1000 != 0) else "")
-        return str(n) # Fallback
-
-    amount_in_words = f"{number_to_words(int(payment.amount))} Rupees Only"
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="gu">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Receipt {receipt_no}</title>
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&family=Noto+Sans+Gujarati:wght@400;700&family=Dancing+Script:wght@700&display=swap" rel="stylesheet">
-        <style>
-            :root {{
-                --primary: #B8860B;
-                --saffron: #E67E22;
-                --navy: #000080;
-                --text-dark: #1a1a1a;
-                --text-muted: #555555;
-                --border: #d4af37;
-                --bg: #fdfdfd;
-            }}
-
-            * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-
-            @page {{
-                size: A4;
-                margin: 5mm;
-            }}
-
-            body {{
-                font-family: 'Inter', 'Noto Sans Gujarati', sans-serif;
-                background-color: #f0f0f0;
-                display: flex;
-                justify-content: center;
-                padding: 20px 0;
-            }}
-
-            .receipt-card {{
-                background: white;
-                width: 95%;
-                max-width: 210mm;
-                min-height: 285mm; /* Reduced slightly to prevent blank 2nd page */
-                height: auto;
-                position: relative;
-                overflow: hidden;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                padding: 5mm;
-                box-shadow: 0 0 20px rgba(0,0,0,0.1);
-            }}
-
-            .receipt-inner {{
-                width: 100%;
-                flex: 1;
-                border: 2px solid var(--primary);
-                padding: 6mm;
-                position: relative;
-                display: flex;
-                flex-direction: column;
-            }}
-
-            /* Gold Frame Corner Accents */
-            .receipt-inner::before {{
-                content: '';
-                position: absolute;
-                top: 5px; left: 5px; right: 5px; bottom: 5px;
-                border: 1px solid rgba(184, 134, 11, 0.3);
-                pointer-events: none;
-            }}
-
-            .header {{
-                text-align: center;
-                margin-bottom: 20px;
-            }}
-
-            .logo-circle {{
-                width: 90px;
-                height: 90px;
-                margin: 0 auto 10px;
-                background: #fdf2e9;
-                border: 2px solid var(--primary);
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                overflow: hidden;
-            }}
-            .logo-circle img {{ width: 80%; height: auto; }}
-
-            .gujarati-head {{
-                font-size: 26px;
-                color: #800000;
-                font-weight: 700;
-                margin-bottom: 2px;
-            }}
-
-            .english-head {{
-                font-size: 14px;
-                font-weight: 700;
-                color: #800000;
-                letter-spacing: 0.5px;
-            }}
-
-            .tagline {{
-                font-size: 12px;
-                color: var(--text-dark);
-                margin-bottom: 5px;
-                font-weight: 600;
-            }}
-
-            .contact-info {{
-                font-size: 9px;
-                color: var(--text-muted);
-                max-width: 90%;
-                margin: 0 auto;
-                line-height: 1.3;
-            }}
-
-            .title-bar {{
-                background: linear-gradient(90deg, #d35400, #e67e22, #d35400);
-                color: white;
-                text-align: center;
-                padding: 6px;
-                font-weight: 700;
-                font-size: 18px;
-                margin-bottom: 15px;
-                clip-path: polygon(1% 0%, 99% 0%, 100% 50%, 99% 100%, 1% 100%, 0% 50%);
-            }}
-
-            .table-section {{
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 12px;
-                font-size: 12px;
-            }}
-
-            .table-section td, .table-section th {{
-                border: 1px solid #ccc;
-                padding: 6px 10px;
-            }}
-
-            .bg-light {{ background-color: #fcf8e3; font-weight: 700; }}
-            .text-center {{ text-align: center; }}
-            .text-right {{ text-align: right; }}
-
-            /* Table 1: Receipt Info */
-            .info-grid {{
-                display: flex;
-                justify-content: space-between;
-                gap: 15px;
-                margin-bottom: 12px;
-            }}
-            .info-table {{ width: 48%; margin-bottom: 0; }}
-
-            /* Table 2: Member Details */
-            .member-details th {{
-                background: #fdf2e9;
-                text-align: center;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-                padding: 4px;
-            }}
-
-            /* Table 3: Financials */
-            .financial-table th {{
-                background: #fdf2e9;
-                padding: 4px;
-            }}
-
-            .total-row {{
-                background: #fcf8e3;
-                font-weight: 700;
-                font-size: 14px;
-            }}
-
-            .words-row {{
-                font-size: 11px;
-                font-style: italic;
-                padding: 8px;
-                border: 1px solid #ccc;
-                margin-bottom: 20px;
-                background: #fafafa;
-            }}
-
-            .footer-row {{
-                display: flex;
-                justify-content: space-between;
-                align-items: flex-end;
-                margin-top: auto;
-                padding: 10px 10px 0 10px;
-            }}
-
-            .signatory {{
-                text-align: center;
-            }}
-
-            .signature-font {{
-                font-family: 'Dancing Script', cursive;
-                color: var(--navy);
-                font-size: 18px;
-                margin-bottom: 3px;
-            }}
-
-            .sig-label {{
-                font-size: 10px;
-                font-weight: 700;
-                border-top: 1px solid #000;
-                padding-top: 3px;
-                text-transform: uppercase;
-            }}
-
-            .seal-container {{
-                position: relative;
-                width: 80px;
-                height: 80px;
-            }}
-
-            .verified-seal {{
-                width: 75px;
-                height: 75px;
-                background: radial-gradient(circle, #f1c40f, #d4af37, #b8860b);
-                border-radius: 50%;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                color: #800000;
-                font-weight: 800;
-                font-size: 9px;
-                border: 2px dashed #800000;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.15);
-                transform: rotate(-15deg);
-            }}
-
-                .bottom-banner {{
-                    background: #d35400;
-                    color: white;
-                    text-align: center;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: 600;
-                    margin-top: 15px; /* Reduced */
-                    border-radius: 4px;
-                }}
-
-                .no-print {{
-                    position: fixed;
-                    bottom: 20px;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    display: flex;
-                    gap: 10px;
-                    z-index: 1000;
-                }}
-
-                .btn {{
-                    padding: 10px 20px;
-                    background: #333;
-                    color: white;
-                    border: none;
-                    border-radius: 30px;
-                    font-weight: 700;
-                    cursor: pointer;
-                    box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-                }}
-
-                @media screen and (max-width: 600px) {{
-                    body {{ padding: 10px 0; }}
-                    .receipt-card {{ padding: 3mm; }}
-                    .receipt-inner {{ padding: 4mm; }}
-                    .gujarati-head {{ font-size: 20px; }}
-                    .english-head {{ font-size: 11px; }}
-                    .tagline {{ font-size: 10px; }}
-                    .contact-info {{ font-size: 8px; }}
-                    .title-bar {{ font-size: 16px; padding: 4px; }}
-                    .table-section {{ font-size: 10px; }}
-                    .words-row {{ font-size: 10px; margin-bottom: 15px; }}
-                }}
-
-                @media print {{
-                    body {{ background: white; padding: 0; }}
-                    .receipt-card {{
-                        box-shadow: none;
-                        margin: 0;
-                        width: 100%;
-                        max-width: none;
-                        min-height: 0;
-                    }}
-                    .no-print {{ display: none; }}
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="receipt-card">
-            <div class="receipt-inner">
-                <header class="header">
-                    <div class="logo-circle">
-                        <img src="https://res.cloudinary.com/dgzgvwtsd/image/upload/v1772518018/vishwakarma-god-png-transparent-vishwakarma-god-images-40_p9efq5.png" onerror="this.src='https://ui-avatars.com/api/?name=SKPM&background=B8860B&color=fff'" alt="SKPM Logo">
-                    </div>
-                    <h1 class="gujarati-head">શ્રી સથવારા કડિયા પ્રગતિ મંડળ</h1>
-                    <h2 class="english-head">SHREE SATHWARA KADIA PRAGATI MANDAL</h2>
-                    <p class="tagline">સેવા | સહકાર | પ્રગતિ (Service | Cooperation | Progress)</p>
-                    <p class="contact-info">
-                        Address: Pragati Mandal, Ahmedabad - 382481, Gujarat, India. Web: www.satvarasamaj.com<br>
-                        Contact: Ahmedabad/Gandhinagar, pragatimandal@gmail.com, Morbi: 0000000000
-                    </p>
-                </header>
-
-                <div class="title-bar">રસીદ / RECEIPT</div>
-
-                <div class="info-grid">
-                    <table class="table-section info-table">
-                        <tr>
-                            <td class="bg-light">રસીદ નં. / Receipt No:</td>
-                        </tr>
-                        <tr>
-                            <td>{receipt_no}</td>
-                        </tr>
-                    </table>
-                    <table class="table-section info-table">
-                        <tr>
-                            <td class="bg-light">તારીખ / Date:</td>
-                        </tr>
-                        <tr>
-                            <td>{payment_date}</td>
-                        </tr>
-                    </table>
-                </div>
-
-                <table class="table-section member-details">
-                    <tr>
-                        <th colspan="2">સભાસદ વિગતો / MEMBER DETAILS</th>
-                    </tr>
-                    <tr>
-                        <td width="40%" class="bg-light">સભાસદ નામ / Member Name:</td>
-                        <td>{donor_name}</td>
-                    </tr>
-                    <tr>
-                        <td class="bg-light">સભાસદ આઈડી / e-Sabhasad ID:</td>
-                        <td>{sabhasad_id}</td>
-                    </tr>
-                    <tr>
-                        <td class="bg-light">ગામ / Village:</td>
-                        <td>{village_name}</td>
-                    </tr>
-                </table>
-
-                <table class="table-section financial-table">
-                    <tr>
-                        <th colspan="3" class="text-center">દાન / ફાળાની વિગતો / DONATION / CONTRIBUTION DETAILS</th>
-                    </tr>
-                    <tr class="bg-light">
-                        <td width="50%">હેતુ / Purpose</td>
-                        <td width="25%" class="text-center">વર્ષ / Year</td>
-                        <td width="25%" class="text-right">રકમ (₹) / Amount (₹)</td>
-                    </tr>
-                    <tr>
-                        <td>{purpose}</td>
-                        <td class="text-center">2024-25</td>
-                        <td class="text-right">{payment.amount:,.2f}</td>
-                    </tr>
-                    <tr class="total-row">
-                        <td colspan="2" class="text-right">કુલ રકમ / TOTAL AMOUNT:</td>
-                        <td class="text-right">₹ {payment.amount:,.2f}</td>
-                    </tr>
-                </table>
-
-                <div class="words-row">
-                    <strong>ફક્ત અક્ષરે / Total Amount in Words:</strong><br>
-                    {amount_in_words}
-                </div>
-
-                <div class="footer-row">
-                    <div class="signatory">
-                        <p class="signature-font">Authorized Staff</p>
-                        <p class="sig-label">Authorized Signatory</p>
-                        <p style="font-size: 9px; color: var(--navy); margin-top: 5px;">FOR, SHREE SATHWARA<br>KADIA PRAGATI MANDAL</p>
-                    </div>
-                    <div class="seal-container">
-                        <div class="verified-seal">
-                            <span style="font-size: 8px;">VERIFIED</span>
-                            <div style="margin: 2px 0;">★ ★ ★</div>
-                            <span>OFFICIAL</span>
-                        </div>
-                    </div>
-                </div>
-
-                <div class="bottom-banner">
-                    એકતા અને સેવા તરફ આગળ (Forward Towards Unity and Service)
-                </div>
-            </div>
-        </div>
-
-        <div class="no-print">
-            <button class="btn" onclick="window.print()">Print Receipt</button>
-            <button class="btn" onclick="window.close()" style="background: #666;">Close</button>
-        </div>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content)
+    receipt = receipts.cached(row, fmt) or await receipts.render(row, fmt)
+
+    headers = {"ETag": receipt.etag, "Cache-Control": receipts.CACHE_CONTROL}
+    if receipts.not_modified(request.headers.get("if-none-match"), receipt.etag):
+        return Response(status_code=304, headers=headers)
+    if fmt == receipts.PDF:
+        headers["Content-Disposition"] = f'inline; filename="{receipt.filename}"'
+    return Response(content=receipt.body, media_type=receipt.media_type, headers=headers)
 
 from typing import Optional
 from datetime import date
 
-@router.get("/recent-donations", response_model=List[schemas.DashboardDonationResponse])
-def get_recent_donations(
-    db: Session = Depends(database.get_db),
-    limit: int = 10,
-    offset: int = 0,
+def recent_donations_query(
     sort_by: str = "date",
     order: str = "desc",
     start_date: Optional[date] = None,
     end_date: Optional[date] = None
 ):
+    """Completed payments with donor names; served by ix_payments_status_created_at."""
     query = (
-        db.query(
+        select(
             models.Payment.id,
             models.Payment.amount,
             models.Payment.purpose,
@@ -717,14 +308,11 @@ def get_recent_donations(
             models.User.full_name.label("donor_name")
         )
         .join(models.User, models.User.id == models.Payment.user_id)
-        .filter(models.Payment.status == "completed")
+        .where(models.Payment.status == "completed")
     )
 
-    if start_date:
-        query = query.filter(models.Payment.created_at >= start_date)
-    if end_date:
-        # Cast to date to include the whole day
-        query = query.filter(func.cast(models.Payment.created_at, Date) <= end_date)
+    # Half-open ranges on created_at (end_date is inclusive), see local_time
+    query = query.where(*local_time.created_at_filters(models.Payment.created_at, start_date, end_date))
 
     if sort_by == "amount":
         if order == "asc":
@@ -736,8 +324,20 @@ def get_recent_donations(
             query = query.order_by(models.Payment.created_at.asc())
         else:
             query = query.order_by(models.Payment.created_at.desc())
+    return query
 
-    donations = query.limit(limit).offset(offset).all()
+@router.get("/recent-donations", response_model=List[schemas.DashboardDonationResponse])
+async def get_recent_donations(
+    db: AsyncSession = Depends(database.get_read_db),
+    limit: int = 10,
+    offset: int = 0,
+    sort_by: str = "date",
+    order: str = "desc",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    query = recent_donations_query(sort_by, order, start_date, end_date)
+    donations = (await db.execute(query.limit(limit).offset(offset))).all()
     
     # SQLAlchemy row objects need to be converted to dicts to match schema
     return [
@@ -750,24 +350,84 @@ def get_recent_donations(
         } for d in donations
     ]
 
+# Newest first; ix_payments_created_at_id / ix_payments_user_id_created_at_id
+# cover these columns, so a page never loads ORM objects or heap rows
+PAYMENT_HISTORY_KEYS = [models.Payment.created_at, models.Payment.id]
+
+def payment_history_query(
+    user_id: Optional[int] = None,
+    purpose: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    """Columns of schemas.Payment with the history filters applied; ranges stay sargable."""
+    query = select(
+        models.Payment.id,
+        models.Payment.user_id,
+        models.Payment.amount,
+        models.Payment.transaction_id,
+        models.Payment.purpose,
+        models.Payment.status,
+        models.Payment.created_at
+    )
+    if user_id is not None:
+        query = query.where(models.Payment.user_id == user_id)
+    if purpose:
+        query = query.where(models.Payment.purpose == purpose)
+    if status:
+        query = query.where(models.Payment.status == status)
+    return query.where(*local_time.created_at_filters(models.Payment.created_at, start_date, end_date))
+
+async def payment_history_page(db, response: Response, query, cursor: Optional[str], limit: int) -> list:
+    result = await db.execute(pagination.keyset(query, PAYMENT_HISTORY_KEYS, cursor, limit, descending=True))
+    rows, next_cursor = pagination.page(result.all(), limit, lambda p: [p.created_at, p.id])
+    pagination.set_page_headers(response, next_cursor)
+    return [row._asdict() for row in rows]
+
 @router.get("/history", response_model=List[schemas.Payment])
-def payment_history(db: Session = Depends(database.get_db)):
-    return db.query(models.Payment).order_by(models.Payment.created_at.desc()).all()
+async def payment_history(
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    purpose: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(database.get_read_db)
+):
+    """All payments, newest first. Admin only.
+
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    query = payment_history_query(user_id, purpose, status, start_date, end_date)
+    return await payment_history_page(db, response, query, cursor, limit)
+
+@router.get("/me", response_model=List[schemas.Payment])
+async def my_payments(
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    purpose: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """The caller's own payments, newest first, paged like /payments/history."""
+    query = payment_history_query(current_user.id, purpose, status, start_date, end_date)
+    return await payment_history_page(db, response, query, cursor, limit)
 
 @router.get("/stats")
-def payment_stats(db: Session = Depends(database.get_db)):
-    total = db.query(func.coalesce(func.sum(models.Payment.amount), 0)).scalar()
-    
-    top_donor_query = (
-        db.query(
-            models.User.full_name,
-            func.sum(models.Payment.amount).label("total")
-        )
-        .join(models.Payment, models.Payment.user_id == models.User.id)
-        .group_by(models.User.id, models.User.full_name)
-        .order_by(func.sum(models.Payment.amount).desc())
-        .first()
-    )
+async def payment_stats(db: AsyncSession = Depends(database.get_read_db)):
+    # Both reads hit payment_rollups (app/payment_rollups.py), not payments
+    total = await db.scalar(payment_rollups.total_query())
+    top_donor_query = (await db.execute(payment_rollups.top_donor_query())).first()
     
     return {
         "total_collection": float(total),
@@ -782,51 +442,44 @@ class ChartDataResponse(BaseModel):
     personal_amount: float
     donation_amount: float
 
-from sqlalchemy import case, literal
 
 @router.get("/chart", response_model=List[ChartDataResponse])
-def get_chart_data(
+async def get_chart_data(
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_read_db),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    month: Optional[int] = None,
-    year: Optional[int] = None
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1, le=9998),
+    resolution: Literal[payment_chart.RESOLUTIONS] = payment_chart.AUTO,
+    max_points: int = Query(payment_chart.CHART_MAX_POINTS, ge=3, le=5000),
 ):
-    """Get every individual donation with cumulative totals for a highly granular growth chart."""
-    
-    query = db.query(
-        models.Payment
-    ).filter(models.Payment.status == "completed")
-
-    # Apply filters
-    if start_date:
-        query = query.filter(func.cast(models.Payment.created_at, Date) >= start_date)
-    if end_date:
-        query = query.filter(func.cast(models.Payment.created_at, Date) <= end_date)
-    
-    if year:
-        query = query.filter(extract('year', models.Payment.created_at) == year)
-    if month:
-        query = query.filter(extract('month', models.Payment.created_at) == month)
-
-    # Sort strictly by creation time
-    results = query.order_by(models.Payment.created_at.asc()).all()
+    """Cumulative donation totals (overall and the caller's own) over time.
 
-    running_total = 0
-    running_personal = 0
-    response = []
-    
-    for p in results:
-        running_total += p.amount
-        if current_user and p.user_id == current_user.id:
-            running_personal += p.amount
-            
-        response.append({
-            "timestamp": p.created_at,
-            "amount": running_total,
-            "personal_amount": running_personal,
-            "donation_amount": p.amount
-        })
+    `resolution=raw` gives one point per donation; hour/day/month give one
+    point per bucket with donation_amount summed. `auto` (the default) is
+    raw when the range has at most `max_points` donations and otherwise the
+    finest bucket that keeps the result small. Whatever is left above
+    `max_points` is thinned with LTTB.
+    """
+    years = None
+    if month and not year:
+        # That month in every year with donations, as one range per year
+        years = payment_chart.years_between(*(await db.execute(payment_chart.years_query())).one())
+    filters = payment_chart.chart_filters(start_date, end_date, month, year, years)
+    if resolution == payment_chart.AUTO:
+        count, first, last = (await db.execute(payment_chart.span_query(filters))).one()
+        resolution = payment_chart.pick_resolution(count, first, last, max_points)
+
+    rows = (await db.execute(payment_chart.points_query(current_user.id, filters, resolution))).all()
+    if len(rows) > max_points:
+        rows = payment_chart.lttb(rows, max_points, x=lambda r: r.timestamp.timestamp(), y=lambda r: r.amount)
 
-    return response
+    return [
+        {
+            "timestamp": r.timestamp,
+            "amount": r.amount,
+            "personal_amount": r.personal_amount,
+            "donation_amount": r.donation_amount,
+        } for r in rows
+    ]
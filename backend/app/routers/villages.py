@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Annotated
-from .. import models, schemas, database
+from .. import models, schemas, database, member_search, village_summary
 from .auth import get_current_user
 
-from sqlalchemy import func
+from sqlalchemy import select
 
 router = APIRouter(
     prefix="/villages",
@@ -12,77 +12,88 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[schemas.Village])
-def read_villages(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    results = db.query(
-        models.Village,
-        func.count(models.User.id).label("member_count")
-    ).outerjoin(models.User, models.Village.id == models.User.village_id).group_by(models.Village.id).offset(skip).limit(limit).all()
-    
-    villages_with_count = []
-    for village, count in results:
-        village_dict = village.__dict__.copy()
-        village_dict["member_count"] = count
-        villages_with_count.append(village_dict)
-    
-    return villages_with_count
+async def read_villages(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_read_db)):
+    """Villages with their member counts (kept up to date on write, see app/village_counts.py)."""
+    result = await db.execute(select(models.Village).order_by(models.Village.id).offset(skip).limit(limit))
+    return result.scalars().all()
+
+@router.get("/summary", response_model=List[schemas.VillageSummary])
+async def read_village_summaries(
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Members by status, donations by purpose and membership fees for every village."""
+    if current_user.status not in ("approved", "member") and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    return await village_summary.get_summaries(db)
+
+@router.get("/{village_id}/summary", response_model=schemas.VillageSummary)
+async def read_village_summary(
+    village_id: int,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Dashboard totals for one village, in one round-trip."""
+    if current_user.status not in ("approved", "member") and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    summaries = await village_summary.get_summaries(db, village_id)
+    if not summaries:
+        raise HTTPException(status_code=404, detail="Village not found")
+    return summaries[0]
 
 @router.post("/", response_model=schemas.Village)
-def create_village(
+async def create_village(
     village: schemas.VillageCreate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     # Check for duplicate
-    existing = db.query(models.Village).filter(models.Village.name == village.name).first()
+    existing = await db.scalar(select(models.Village).where(models.Village.name == village.name))
     if existing:
         raise HTTPException(status_code=400, detail="Village already exists")
     db_village = models.Village(name=village.name, district=village.district)
     db.add(db_village)
-    db.commit()
-    db.refresh(db_village)
-    
-    village_dict = db_village.__dict__.copy()
-    village_dict["member_count"] = 0
-    return village_dict
+    await db.commit()
+    await db.refresh(db_village)
+    return db_village
 
 @router.delete("/{village_id}")
-def delete_village(
+async def delete_village(
     village_id: int,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
-    village = db.query(models.Village).filter(models.Village.id == village_id).first()
+    village = await db.get(models.Village, village_id)
     if not village:
         raise HTTPException(status_code=404, detail="Village not found")
     # Check if any users are associated
-    user_count = db.query(models.User).filter(models.User.village_id == village_id).count()
-    if user_count > 0:
-        raise HTTPException(status_code=400, detail=f"Cannot delete village with {user_count} members")
-    db.delete(village)
-    db.commit()
+    if village.member_count > 0:
+        raise HTTPException(status_code=400, detail=f"Cannot delete village with {village.member_count} members")
+    await db.delete(village)
+    await db.commit()
     return {"detail": "Village deleted"}
 
 @router.put("/{village_id}", response_model=schemas.Village)
-def update_village(
+async def update_village(
     village_id: int,
     village_update: schemas.VillageUpdate,
     current_user: Annotated[models.User, Depends(get_current_user)],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    db_village = db.query(models.Village).filter(models.Village.id == village_id).first()
+    db_village = await db.get(models.Village, village_id)
     if not db_village:
         raise HTTPException(status_code=404, detail="Village not found")
         
     if village_update.name is not None:
         # Check for duplicate name if changing
-        existing = db.query(models.Village).filter(models.Village.name == village_update.name, models.Village.id != village_id).first()
+        existing = await db.scalar(select(models.Village).where(models.Village.name == village_update.name, models.Village.id != village_id))
         if existing:
             raise HTTPException(status_code=400, detail="Village with this name already exists")
         db_village.name = village_update.name
@@ -90,13 +101,7 @@ def update_village(
     if village_update.district is not None:
         db_village.district = village_update.district
         
-    db.commit()
-    db.refresh(db_village)
-    
-    # Get member count to return proper schema
-    member_count = db.query(models.User).filter(models.User.village_id == village_id).count()
-    
-    village_dict = db_village.__dict__.copy()
-    village_dict["member_count"] = member_count
-    
-    return village_dict
+    await db.commit()
+    await db.refresh(db_village)
+    member_search.rename_village(db_village.id, db_village.name)
+    return db_village
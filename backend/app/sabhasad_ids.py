@@ -0,0 +1,94 @@
+import asyncio
+import os
+import re
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from . import database, models
+from .identifiers import format_sabhasad_id
+
+# Sabhasad numbers come from a counter row in id_counters rather than from
+# MAX(users.sabhasad_id): allocation is one `UPDATE ... SET last_value =
+# last_value + n RETURNING last_value`, which never scans users and which the
+# database serializes, so concurrent verifications cannot hand out the same
+# number.
+#
+# SABHASAD_ID_BLOCK=1 (default) bumps the counter inside the caller's
+# transaction. The row stays locked until that transaction ends, so numbers
+# are gapless: a rolled-back verification gives its number back. Larger
+# values let each worker reserve that many numbers at a time in a short
+# transaction of its own, so verifications no longer queue on the counter
+# row; numbers stay unique but a worker that exits leaves the unused rest of
+# its block as a gap, and IDs are not in verification order across workers.
+SABHASAD_ID_BLOCK = max(1, int(os.getenv("SABHASAD_ID_BLOCK", "1")))
+if database.DATABASE_URL.startswith("sqlite"):
+    # A write locks the whole SQLite database, so taking a block in a second
+    # session would wait on the caller's own transaction
+    SABHASAD_ID_BLOCK = 1
+COUNTER = "sabhasad"
+
+_NUMBER_RE = re.compile(r"(\d+)$")
+_counters = models.IdCounter.__table__
+
+# Block mode: the worker's reserved range is next_value..end_value
+_block_lock = asyncio.Lock()
+_block = {"next_value": 1, "end_value": 0}
+
+
+def highest_assigned(conn) -> int:
+    """Largest number among existing Sabhasad IDs (a full scan; only used for seeding)."""
+    highest = 0
+    for (sabhasad_id,) in conn.execute(select(models.User.sabhasad_id).where(models.User.sabhasad_id.isnot(None))):
+        match = _NUMBER_RE.search(sabhasad_id)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
+
+
+def seed(conn) -> None:
+    """Create the counter row, starting after the highest ID already assigned. No-op if it exists."""
+    values = {"name": COUNTER, "last_value": highest_assigned(conn)}
+    if conn.dialect.name == "postgresql":
+        conn.execute(postgresql.insert(_counters).values(**values).on_conflict_do_nothing())
+    elif conn.dialect.name == "sqlite":
+        conn.execute(sqlite.insert(_counters).values(**values).on_conflict_do_nothing())
+    elif conn.execute(select(_counters.c.name).where(_counters.c.name == COUNTER)).first() is None:
+        conn.execute(_counters.insert().values(**values))
+
+
+async def _take(db, count: int) -> int:
+    """Advance the counter by `count` and return its new value (the last number taken)."""
+    statement = (
+        update(_counters)
+        .where(_counters.c.name == COUNTER)
+        .values(last_value=_counters.c.last_value + count)
+        .returning(_counters.c.last_value)
+    )
+    last_value = (await db.execute(statement)).scalar()
+    if last_value is None:
+        # Databases built with create_all rather than migrate.py start without the row
+        await db.run_sync(lambda session: seed(session.connection()))
+        last_value = (await db.execute(statement)).scalar()
+    return last_value
+
+
+async def _from_block() -> int:
+    async with _block_lock:
+        if _block["next_value"] > _block["end_value"]:
+            db = database.create_session()
+            try:
+                end_value = await _take(db, SABHASAD_ID_BLOCK)
+                await db.commit()
+            finally:
+                await db.close()
+            _block.update(next_value=end_value - SABHASAD_ID_BLOCK + 1, end_value=end_value)
+        number = _block["next_value"]
+        _block["next_value"] += 1
+        return number
+
+
+async def allocate(db) -> str:
+    """Next Sabhasad ID, e.g. eSAB-0042."""
+    if SABHASAD_ID_BLOCK > 1:
+        return format_sabhasad_id(await _from_block())
+    return format_sabhasad_id(await _take(db, 1))
+
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Literal
 from datetime import datetime, date
 
 class VillageBase(BaseModel):
@@ -16,10 +16,35 @@ class VillageUpdate(BaseModel):
 class Village(VillageBase):
     id: int
     member_count: Optional[int] = 0
+    pending_count: Optional[int] = 0
+    approved_count: Optional[int] = 0
+    sabhasad_count: Optional[int] = 0
     
     class Config:
         from_attributes = True
 
+class VillageMemberCounts(BaseModel):
+    total: int
+    pending: int
+    approved: int
+    member: int
+
+class PurposeTotal(BaseModel):
+    purpose: str
+    count: int
+    amount: float
+
+class VillageSummary(BaseModel):
+    village_id: int
+    name: str
+    district: Optional[str] = None
+    members: VillageMemberCounts
+    donations_total: float
+    donations_count: int
+    donations_by_purpose: List[PurposeTotal]
+    membership_fees_total: float
+    membership_fees_count: int
+
 class UserBase(BaseModel):
     email: EmailStr
     full_name: str
@@ -167,3 +192,34 @@ class UserUpdate(BaseModel):
 
 class UserPositionUpdate(BaseModel):
     position: Optional[str] = None
+
+class MemberFilter(BaseModel):
+    """A filter node: every field given must match; `and`, `or` and `not` nest nodes."""
+    village_id: Optional[List[Optional[int]]] = None
+    status: Optional[List[str]] = None
+    profession: Optional[List[Optional[str]]] = None
+    position: Optional[List[Optional[str]]] = None
+    age_min: Optional[int] = Field(None, ge=0)
+    age_max: Optional[int] = Field(None, ge=0)
+    paid: Optional[bool] = None  # has at least one completed payment
+    and_: Optional[List["MemberFilter"]] = Field(None, alias="and")
+    or_: Optional[List["MemberFilter"]] = Field(None, alias="or")
+    not_: Optional["MemberFilter"] = Field(None, alias="not")
+
+    class Config:
+        populate_by_name = True
+
+class MemberQuery(BaseModel):
+    filter: MemberFilter = MemberFilter()
+    facets: List[Literal["village_id", "status", "profession", "position", "paid"]] = []
+    limit: int = Field(100, ge=1, le=500)
+    cursor: Optional[str] = None
+
+class FacetCount(BaseModel):
+    value: Optional[str | int | bool] = None
+    count: int
+
+class MemberQueryResponse(BaseModel):
+    total: int
+    facets: dict[str, List[FacetCount]] = {}
+    members: List[UserResponse]
@@ -2,6 +2,7 @@ import os
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from dotenv import load_dotenv
+from .email_utils import EmailProvider, EmailMessage
 
 load_dotenv()
 
@@ -60,3 +61,27 @@ def send_sendgrid_otp(recipient_email: str, otp_code: str) -> bool:
     except Exception as e:
         print(f"❌ Failed to send SendGrid email: {e}")
         return False
+
+
+class SendGridProvider(EmailProvider):
+    """SendGrid behind the email queue's provider interface."""
+
+    name = "sendgrid"
+
+    def __init__(self):
+        # One client per queue worker, reused for every message it delivers
+        self.client = SendGridAPIClient(SENDGRID_API_KEY) if SENDGRID_API_KEY else None
+
+    def is_configured(self) -> bool:
+        return bool(SENDGRID_API_KEY)
+
+    def send(self, message: EmailMessage):
+        mail = Mail(
+            from_email=SENDGRID_FROM_EMAIL,
+            to_emails=message.to,
+            subject=message.subject,
+            html_content=message.html
+        )
+        response = self.client.send(mail)
+        if response.status_code >= 400:
+            raise RuntimeError(f"SendGrid returned status {response.status_code}")
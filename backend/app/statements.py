@@ -0,0 +1,126 @@
+import html
+import os
+import re
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Iterator
+from sqlalchemy import func, select
+from . import local_time, models, receipts
+
+# Annual donation statements: one PDF per donor listing every completed
+# payment of a financial year (April to March, calendar days in APP_TIMEZONE).
+#
+# All payments of the year are read by a single query ordered by donor and
+# streamed in batches of STATEMENT_BATCH rows (a server-side cursor on
+# Postgres). donor_statements() folds them into one donor at a time, so
+# memory holds one donor's payments however large the year is.
+# render_statement() is module level so generate_statements.py can run it
+# on a process pool.
+STATEMENT_BATCH = int(os.getenv("STATEMENT_BATCH", "2000"))
+
+
+def financial_year(start_year: int) -> tuple[date, date]:
+    """First and last day of the financial year starting in April of start_year."""
+    return date(start_year, 4, 1), date(start_year + 1, 4, 1) - timedelta(days=1)
+
+
+def financial_year_label(start_year: int) -> str:
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
+
+
+def _filters(start_year: int) -> list:
+    first, last = financial_year(start_year)
+    return [
+        models.Payment.status == "completed",
+        models.Payment.user_id.isnot(None),
+        *local_time.created_at_filters(models.Payment.created_at, first, last),
+    ]
+
+
+def donor_count_query(start_year: int):
+    """How many statements the year has, for progress reporting."""
+    return select(func.count(func.distinct(models.Payment.user_id))).where(*_filters(start_year))
+
+
+def statement_query(start_year: int):
+    """The year's payments with their donor, in (user_id, created_at, id) order."""
+    return (
+        select(
+            models.Payment.user_id,
+            models.User.full_name,
+            models.User.sabhasad_id,
+            models.Village.name.label("village_name"),
+            models.Payment.id,
+            models.Payment.created_at,
+            models.Payment.purpose,
+            models.Payment.amount,
+        )
+        .join(models.User, models.User.id == models.Payment.user_id)
+        .outerjoin(models.Village, models.Village.id == models.User.village_id)
+        .where(*_filters(start_year))
+        .order_by(models.Payment.user_id, models.Payment.created_at, models.Payment.id)
+    )
+
+
+def donor_statements(conn, start_year: int) -> Iterator[dict]:
+    """One plain dict per donor (picklable, for render_statement), streamed."""
+    rows = conn.execution_options(yield_per=STATEMENT_BATCH).execute(statement_query(start_year))
+    label = financial_year_label(start_year)
+    for user_id, group in groupby(rows, key=lambda row: row.user_id):
+        payments = []
+        for row in group:
+            payments.append((
+                f"REC-{row.id:06d}",
+                local_time.local_date(row.created_at).strftime("%d-%m-%Y"),
+                row.purpose.replace("_", " ").title() if row.purpose else "Donation",
+                float(row.amount or 0),
+            ))
+        yield {
+            "user_id": user_id,
+            "donor_name": row.full_name or "Community Supporter",
+            "sabhasad_id": row.sabhasad_id,
+            "village_name": row.village_name or "N/A",
+            "financial_year": label,
+            "payments": payments,
+        }
+
+
+def statement_filename(statement: dict) -> str:
+    """Path inside the ZIP: FY2025-26/eSAB-00001.pdf, or USER-000042.pdf for non-members."""
+    name = statement["sabhasad_id"] or f"USER-{statement['user_id']:06d}"
+    return f"FY{statement['financial_year']}/{re.sub(r'[^A-Za-z0-9_-]', '_', name)}.pdf"
+
+
+# Runs on the statement process pool; see generate_statements.py.
+def render_statement(statement: dict) -> bytes:
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = receipts.pdf_styles()
+    normal = styles["normal"]
+    total = sum(amount for *_, amount in statement["payments"])
+    story = [
+        *receipts.pdf_letterhead("ANNUAL DONATION STATEMENT"),
+        receipts.pdf_table([
+            ["DONOR DETAILS", ""],
+            ["Member Name", Paragraph(html.escape(statement["donor_name"]), normal)],
+            ["e-Sabhasad ID", statement["sabhasad_id"] or "N/A"],
+            ["Village", Paragraph(html.escape(statement["village_name"]), normal)],
+            ["Financial Year", f"{statement['financial_year']} (1 April to 31 March)"],
+        ], [60 * mm, 110 * mm], header=True),
+        Spacer(1, 6 * mm),
+        receipts.pdf_table(
+            [["Date", "Receipt No", "Purpose", "Amount (Rs.)"]]
+            + [
+                [day, receipt_no, Paragraph(html.escape(purpose), normal), f"{amount:,.2f}"]
+                for receipt_no, day, purpose, amount in statement["payments"]
+            ]
+            + [["TOTAL", f"{len(statement['payments'])} payment(s)", "", f"Rs. {total:,.2f}"]],
+            [30 * mm, 35 * mm, 65 * mm, 40 * mm],
+            header=True,
+        ),
+        Spacer(1, 4 * mm),
+        Paragraph(f"<b>Total Amount in Words:</b> {receipts.number_to_words(int(total))} Rupees Only", normal),
+        *receipts.pdf_signature(),
+    ]
+    return receipts.pdf_build(story, f"Donation statement {statement['financial_year']}")
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from cachetools import TTLCache
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from . import models
+
+# Per-process cache for decoded JWTs and resolved users.
+# Every authenticated request goes through get_current_user, so caching the
+# token decode and the `users WHERE email = ?` lookup removes the most frequent
+# query we run. Entries expire after USER_CACHE_TTL seconds so that changes
+# made by other workers become visible quickly; changes made in this process
+# invalidate the entry explicitly via invalidate_user().
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+
+_lock = threading.Lock()
+# token -> (subject, exp timestamp)
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+# email -> detached User snapshot
+_user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+
+_counters = {
+    "token_hits": 0,
+    "token_misses": 0,
+    "user_hits": 0,
+    "user_misses": 0,
+    "invalidations": 0,
+}
+
+
+def _count(name: str):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_token_subject(token: str):
+    """Return the cached subject for a token, or None if it must be decoded."""
+    with _lock:
+        entry = _token_cache.get(token)
+    if entry is None:
+        _count("token_misses")
+        return None
+    subject, exp = entry
+    if exp is not None and time.time() >= exp:
+        # Token expired while cached — force a full decode so jose raises.
+        with _lock:
+            _token_cache.pop(token, None)
+        _count("token_misses")
+        return None
+    _count("token_hits")
+    return subject
+
+
+def set_token_subject(token: str, subject: str, exp=None):
+    with _lock:
+        _token_cache[token] = (subject, exp)
+
+
+def _detached_copy(instance):
+    """Copy the loaded column values of a row into a detached instance."""
+    mapper = sa_inspect(type(instance))
+    columns = {attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs}
+    copy = type(instance)(**columns)
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _snapshot(user: models.User) -> models.User:
+    snapshot = _detached_copy(user)
+    # Carry the village along so UserResponse never needs a lazy load
+    village = _detached_copy(user.village) if user.village is not None else None
+    set_committed_value(snapshot, "village", village)
+    return snapshot
+
+
+async def get_user_by_email(db, email: str):
+    """Resolve a user (with village) by email, serving from the cache when possible.
+
+    Cached users are merged into the caller's session without a SELECT, so
+    routes can modify and commit them exactly like freshly queried rows.
+    """
+    with _lock:
+        snapshot = _user_cache.get(email)
+    if snapshot is not None:
+        _count("user_hits")
+        return await db.merge(snapshot, load=False)
+
+    _count("user_misses")
+    result = await db.execute(
+        select(models.User).options(joinedload(models.User.village)).where(models.User.email == email)
+    )
+    user = result.scalars().first()
+    if user is not None:
+        with _lock:
+            _user_cache[email] = _snapshot(user)
+    return user
+
+
+async def fresh(db, user: models.User) -> models.User | None:
+    """Reload a user from the database, overwriting a cached snapshot in the session.
+
+    Snapshots can be up to USER_CACHE_TTL old, and another worker's writes
+    never invalidate this one's cache. Routes whose write depends on the
+    user's status or village call this first.
+    """
+    return await db.get(models.User, user.id, options=[joinedload(models.User.village)], populate_existing=True)
+
+
+def invalidate_user(user: models.User | None = None, email: str | None = None):
+    """Drop a user from the cache. Call after any commit that changes the user."""
+    key = email if email is not None else (user.email if user is not None else None)
+    if key is None:
+        return
+    with _lock:
+        _user_cache.pop(key, None)
+        _counters["invalidations"] += 1
+
+
+def clear():
+    with _lock:
+        _token_cache.clear()
+        _user_cache.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        data = dict(_counters)
+        data["token_entries"] = len(_token_cache)
+        data["user_entries"] = len(_user_cache)
+    for kind in ("token", "user"):
+        total = data[f"{kind}_hits"] + data[f"{kind}_misses"]
+        data[f"{kind}_hit_rate"] = round(data[f"{kind}_hits"] / total, 4) if total else 0.0
+    data["ttl_seconds"] = USER_CACHE_TTL
+    return data
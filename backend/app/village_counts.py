@@ -0,0 +1,156 @@
+from collections import defaultdict
+from sqlalchemy import event, func, inspect, select, text, update
+from sqlalchemy.orm import Session
+from . import models
+
+# Denormalized per-village member counts.
+#
+# villages.member_count (every user in the village) and the per-status
+# columns below are kept in step by an after_flush hook: whenever a flush
+# inserts, deletes, or changes the village_id/status of a User, it issues
+# `UPDATE villages SET x = x + delta` on the same connection, so the counts
+# commit or roll back with the change itself. This covers every ORM write
+# path (register, apply, approve, reject, membership payment, user deletion)
+# without each route having to remember it. Core bulk inserts bypass the
+# hook; `python repair_village_counts.py` recomputes everything from users.
+#
+# The "before" side of a change is read from the database, not from the
+# object's attribute history: users merged from user_cache carry a snapshot
+# that can be USER_CACHE_TTL old (or older than another worker's write).
+# A before_flush hook reads the rows it is about to change with
+# SELECT ... FOR UPDATE, so concurrent writers to the same user serialize.
+
+STATUS_COLUMNS = {
+    "pending": "pending_count",
+    "approved": "approved_count",
+    "member": "sabhasad_count",
+}
+COUNT_COLUMNS = ("member_count",) + tuple(STATUS_COLUMNS.values())
+
+
+BEFORE_KEY = "village_counts_before"
+
+
+def _changes_counts(user) -> bool:
+    state = inspect(user)
+    return state.attrs.village_id.history.has_changes() or state.attrs.status.history.has_changes()
+
+
+def _before_flush(session, flush_context, instances):
+    ids = [
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, models.User) and obj.id is not None
+        and (obj in session.deleted or _changes_counts(obj))
+    ]
+    if not ids:
+        return
+    users = models.User.__table__
+    with session.no_autoflush:
+        rows = session.execute(
+            select(users.c.id, users.c.village_id, users.c.status)
+            .where(users.c.id.in_(ids))
+            .with_for_update()
+        )
+        # A row that is already gone has nothing to undo
+        before = dict.fromkeys(ids, (None, None))
+        before.update((row.id, (row.village_id, row.status)) for row in rows)
+        session.info[BEFORE_KEY] = before
+
+
+def _before(user, attr: str):
+    """Value of `attr` as of the start of the transaction, per the object's history."""
+    history = inspect(user).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _add(deltas, village_id, status, sign: int):
+    if village_id is None:
+        return
+    deltas[village_id]["member_count"] += sign
+    column = STATUS_COLUMNS.get(status)
+    if column:
+        deltas[village_id][column] += sign
+
+
+def _after_flush(session, flush_context):
+    stored = session.info.pop(BEFORE_KEY, {})
+
+    def before(user):
+        if user.id in stored:
+            return stored[user.id]
+        return (_before(user, "village_id"), _before(user, "status"))
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for obj in session.new:
+        if isinstance(obj, models.User):
+            _add(deltas, obj.village_id, obj.status, 1)
+    for obj in session.deleted:
+        if isinstance(obj, models.User):
+            _add(deltas, *before(obj), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, models.User) or obj in session.deleted:
+            continue
+        if not _changes_counts(obj):
+            continue
+        old = before(obj)
+        new = (obj.village_id, obj.status)
+        if old != new:
+            _add(deltas, *old, -1)
+            _add(deltas, *new, 1)
+
+    villages = models.Village.__table__
+    connection = session.connection()
+    for village_id, columns in deltas.items():
+        values = {name: villages.c[name] + delta for name, delta in columns.items() if delta}
+        if values:
+            connection.execute(update(villages).where(villages.c.id == village_id).values(**values))
+
+
+def install():
+    """Register the flush hooks on every Session (sync and async). Idempotent."""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+def _expected(conn) -> dict:
+    """village_id -> {count column: value} recomputed from users."""
+    users = models.User.__table__
+    counts = [func.count(users.c.id).label("member_count")]
+    for status, column in STATUS_COLUMNS.items():
+        counts.append(func.count(users.c.id).filter(users.c.status == status).label(column))
+    rows = conn.execute(select(users.c.village_id, *counts).group_by(users.c.village_id))
+    return {row.village_id: {c: getattr(row, c) for c in COUNT_COLUMNS} for row in rows}
+
+
+def drift(conn) -> list[dict]:
+    """Stored counts that differ from users, one entry per village and column."""
+    villages = models.Village.__table__
+    expected = _expected(conn)
+    found = []
+    for village in conn.execute(select(villages.c.id, villages.c.name, *[villages.c[c] for c in COUNT_COLUMNS])):
+        actual = expected.get(village.id, dict.fromkeys(COUNT_COLUMNS, 0))
+        for column in COUNT_COLUMNS:
+            if getattr(village, column) != actual[column]:
+                found.append({"village_id": village.id, "name": village.name, "column": column,
+                              "stored": getattr(village, column), "actual": actual[column]})
+    return found
+
+
+def recount(conn) -> int:
+    """Rewrite the counts of every village that drifted. Returns how many were fixed."""
+    villages = models.Village.__table__
+    if conn.dialect.name == "postgresql":
+        # Hold off the flush hook's increments until this transaction commits:
+        # writers that committed earlier are in the recount, later ones apply
+        # their delta on top of it.
+        conn.execute(text("LOCK TABLE villages IN EXCLUSIVE MODE"))
+    expected = _expected(conn)
+    fixed = {entry["village_id"] for entry in drift(conn)}
+    for village_id in fixed:
+        values = expected.get(village_id, dict.fromkeys(COUNT_COLUMNS, 0))
+        conn.execute(update(villages).where(villages.c.id == village_id).values(**values))
+    return len(fixed)
@@ -0,0 +1,154 @@
+import os
+import threading
+from cachetools import TTLCache
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from . import models
+
+# Per-village dashboard aggregates: members by status (the maintained counts
+# on villages) and completed payments by purpose, in one grouped query.
+#
+# Results are cached per village and for the all-villages list. A Session
+# hook marks the cache stale when a flush touches payments, a user's
+# village/status, or a village, and clears it once that transaction
+# commits; other workers' changes show up within VILLAGE_SUMMARY_TTL.
+VILLAGE_SUMMARY_TTL = int(os.getenv("VILLAGE_SUMMARY_TTL", "60"))
+MEMBERSHIP_PURPOSE = "membership_fee"
+
+_STALE_KEY = "village_summary_stale"
+_ALL = "all"
+
+_lock = threading.Lock()
+_cache = TTLCache(maxsize=1024, ttl=VILLAGE_SUMMARY_TTL)
+_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+# Bumped on every clear(), so a result computed before a commit is not cached after it
+_generation = 0
+
+
+def summary_query(village_id: int | None = None):
+    """One row per (village, payment purpose); villages without payments get one row of NULLs."""
+    totals = (
+        select(
+            models.User.village_id,
+            models.Payment.purpose,
+            func.count(models.Payment.id).label("payments"),
+            func.sum(models.Payment.amount).label("amount"),
+        )
+        .join(models.User, models.User.id == models.Payment.user_id)
+        .where(models.Payment.status == "completed")
+        .group_by(models.User.village_id, models.Payment.purpose)
+    )
+    if village_id is not None:
+        totals = totals.where(models.User.village_id == village_id)
+    totals = totals.subquery()
+
+    query = (
+        select(
+            models.Village.id, models.Village.name, models.Village.district,
+            models.Village.member_count, models.Village.pending_count,
+            models.Village.approved_count, models.Village.sabhasad_count,
+            totals.c.purpose, totals.c.payments, totals.c.amount,
+        )
+        .outerjoin(totals, totals.c.village_id == models.Village.id)
+        .order_by(models.Village.id, totals.c.purpose)
+    )
+    if village_id is not None:
+        query = query.where(models.Village.id == village_id)
+    return query
+
+
+def _fold(rows) -> list[dict]:
+    summaries = {}
+    for row in rows:
+        summary = summaries.get(row.id)
+        if summary is None:
+            summary = summaries[row.id] = {
+                "village_id": row.id,
+                "name": row.name,
+                "district": row.district,
+                "members": {
+                    "total": row.member_count,
+                    "pending": row.pending_count,
+                    "approved": row.approved_count,
+                    "member": row.sabhasad_count,
+                },
+                "donations_total": 0.0,
+                "donations_count": 0,
+                "donations_by_purpose": [],
+                "membership_fees_total": 0.0,
+                "membership_fees_count": 0,
+            }
+        if row.purpose is None:
+            continue
+        amount = float(row.amount or 0)
+        if row.purpose == MEMBERSHIP_PURPOSE:
+            summary["membership_fees_total"] += amount
+            summary["membership_fees_count"] += row.payments
+        else:
+            summary["donations_total"] += amount
+            summary["donations_count"] += row.payments
+            summary["donations_by_purpose"].append(
+                {"purpose": row.purpose, "count": row.payments, "amount": amount}
+            )
+    return list(summaries.values())
+
+
+async def get_summaries(db, village_id: int | None = None) -> list[dict]:
+    """Summaries for one village (a list of at most one) or for all villages."""
+    key = village_id if village_id is not None else _ALL
+    with _lock:
+        cached = _cache.get(key)
+        _counters["hits" if cached is not None else "misses"] += 1
+        generation = _generation
+    if cached is not None:
+        return cached
+    summaries = _fold((await db.execute(summary_query(village_id))).all())
+    with _lock:
+        if generation == _generation:
+            _cache[key] = summaries
+    return summaries
+
+
+def clear():
+    global _generation
+    with _lock:
+        _cache.clear()
+        _generation += 1
+        _counters["invalidations"] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_counters, "entries": len(_cache)}
+
+
+# ─── Invalidation ─────────────────────────────────────────────
+
+_TRACKED = (models.User, models.Payment, models.Village)
+
+
+def _after_flush(session, flush_context):
+    changed = any(isinstance(obj, _TRACKED) for obj in (*session.new, *session.deleted)) or any(
+        isinstance(obj, (models.Payment, models.Village))
+        or isinstance(obj, models.User)
+        and any(inspect(obj).attrs[attr].history.has_changes() for attr in ("village_id", "status"))
+        for obj in session.dirty
+    )
+    if changed:
+        session.info[_STALE_KEY] = True
+
+
+def _after_commit(session):
+    if session.info.pop(_STALE_KEY, False):
+        clear()
+
+
+def _after_rollback(session):
+    session.info.pop(_STALE_KEY, None)
+
+
+def install():
+    """Register the invalidation hooks on every Session (sync and async). Idempotent."""
+    for name, fn in (("after_flush", _after_flush), ("after_commit", _after_commit), ("after_rollback", _after_rollback)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
@@ -0,0 +1,125 @@
+"""Compare request throughput with DB_MODE=sync and DB_MODE=async.
+
+Usage:
+    python bench_db_modes.py                       # both modes, throwaway SQLite
+    DATABASE_URL=postgresql://... python bench_db_modes.py --requests 2000 --concurrency 64
+
+Each mode runs in its own subprocess (DB_MODE is read at import time) against
+the same seeded database and the same mix of read endpoints.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_db_modes.db')}"
+
+ENDPOINTS = ["/members/", "/villages/", "/auth/users/me", "/payments/recent-donations?limit=20"]
+PASSWORD = "bench-password"
+
+
+def seed(members: int):
+    from app.database import Base, engine, SessionLocal
+    from app import models, password_hashing
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(models.User).filter(models.User.email == "dbmodes-admin@example.com").first():
+            return
+        villages = [models.Village(name=f"DB Modes Village {i}", district="Bench") for i in range(10)]
+        db.add_all(villages)
+        db.flush()
+        db.add(models.User(
+            email="dbmodes-admin@example.com",
+            hashed_password=password_hashing.pwd_context.hash(PASSWORD),
+            full_name="DB Modes Admin",
+            role="admin",
+            status="approved",
+        ))
+        for i in range(members):
+            user = models.User(
+                email=f"dbmodes{i}@example.com",
+                hashed_password="x",
+                full_name=f"DB Modes Member {i}",
+                phone_number=f"60000{i:05d}",
+                village_id=villages[i % len(villages)].id,
+                status="member",
+            )
+            db.add(user)
+            db.flush()
+            db.add(models.Payment(user_id=user.id, amount=100, transaction_id=f"dbmodes-{i}", status="completed"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_round(requests: int, concurrency: int) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/token", data={"username": "dbmodes-admin@example.com", "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(ENDPOINTS[i % len(ENDPOINTS)], headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"request failed: {response.status_code} {response.text}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    env = dict(os.environ, DB_MODE=mode)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child",
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    output = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_round(args.requests, args.concurrency))))
+        return
+
+    seed(args.members)
+    print(f"requests={args.requests} concurrency={args.concurrency} endpoints={', '.join(ENDPOINTS)}")
+    print(f"{'mode':>6} {'req/s':>10} {'p95 (ms)':>10}")
+    for mode in args.modes:
+        result = run_mode(mode, args)
+        print(f"{mode:>6} {result['throughput']:>10.1f} {result['p95'] * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Compare the old three-way OR login lookup with single-probe identifier resolution.
+
+Usage:
+    python bench_identifier_lookup.py                 # 100k users, throwaway SQLite
+    DATABASE_URL=postgresql://... python bench_identifier_lookup.py --users 100000
+
+Seeds the users table (once) and times lookups by email, phone and Sabhasad ID.
+Prints the query plan of each approach so index usage can be checked.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_identifiers.db')}"
+
+from sqlalchemy import or_, insert, text
+from app.database import Base, engine, SessionLocal
+from app import models
+from app.identifiers import identifier_query, format_sabhasad_id
+
+BATCH = 5000
+
+
+def seed(users: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        existing = conn.execute(text("SELECT COUNT(*) FROM users WHERE email LIKE 'idbench%'")).scalar()
+        for start in range(existing, users, BATCH):
+            rows = [
+                {
+                    "email": f"idbench{i}@example.com",
+                    "hashed_password": "x",
+                    "full_name": f"Identifier Bench {i}",
+                    "phone_number": f"9{i:09d}",
+                    "sabhasad_id": format_sabhasad_id(500000 + i),
+                    "status": "member",
+                }
+                for i in range(start, min(start + BATCH, users))
+            ]
+            conn.execute(insert(models.User), rows)
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE users"))
+
+
+def or_lookup(db, identifier: str):
+    return db.query(models.User).filter(
+        or_(
+            models.User.email == identifier,
+            models.User.sabhasad_id == identifier,
+            models.User.phone_number == identifier
+        )
+    ).first()
+
+
+def probe_lookup(db, identifier: str):
+    return db.execute(identifier_query(identifier)).scalars().first()
+
+
+def explain(db, clause):
+    compiled = db.query(models.User).filter(clause).statement.compile(
+        engine, compile_kwargs={"literal_binds": True}
+    )
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    rows = db.execute(text(prefix + str(compiled))).all()
+    return "\n".join("    " + " ".join(str(c) for c in row) for row in rows)
+
+
+def timed(db, lookup, identifiers):
+    latencies = []
+    for identifier in identifiers:
+        start = time.perf_counter()
+        user = lookup(db, identifier)
+        latencies.append(time.perf_counter() - start)
+        assert user is not None, identifier
+        db.expunge_all()
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.users} users ({engine.dialect.name})...")
+    seed(args.users)
+
+    rng = random.Random(42)
+    identifiers = []
+    for _ in range(args.lookups):
+        i = rng.randrange(args.users)
+        identifiers.append(rng.choice([
+            f"idbench{i}@example.com",
+            f"9{i:09d}",
+            format_sabhasad_id(500000 + i),
+        ]))
+
+    db = SessionLocal()
+    try:
+        print(f"\n{'approach':>12} {'mean (ms)':>10} {'p95 (ms)':>10}")
+        for name, lookup in (("three-way OR", or_lookup), ("single probe", probe_lookup)):
+            mean, p95 = timed(db, lookup, identifiers)
+            print(f"{name:>12} {mean * 1000:>10.3f} {p95 * 1000:>10.3f}")
+
+        sample = f"9{args.users // 2:09d}"
+        print("\nPlan, three-way OR:")
+        print(explain(db, or_(
+            models.User.email == sample,
+            models.User.sabhasad_id == sample,
+            models.User.phone_number == sample
+        )))
+        print("Plan, single probe (phone):")
+        print(explain(db, models.User.phone_number == sample))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
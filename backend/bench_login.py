@@ -0,0 +1,98 @@
+"""Benchmark /auth/token throughput at different bcrypt pool sizes.
+
+Usage:
+    python bench_login.py                          # thread pool, sizes 1 2 4 8
+    python bench_login.py --kind process --sizes 1 2 4 --requests 200
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "bench_login.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+import httpx
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, password_hashing
+
+PASSWORD = "bench-password"
+
+
+def seed(users: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        hashed = password_hashing.pwd_context.hash(PASSWORD)
+        existing = db.query(models.User).filter(models.User.email.like("bench%@example.com")).count()
+        for i in range(existing, users):
+            db.add(models.User(
+                email=f"bench{i}@example.com",
+                hashed_password=hashed,
+                full_name=f"Bench User {i}",
+                phone_number=f"70000{i:05d}",
+                status="member",
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_round(requests: int, concurrency: int, users: int) -> tuple[float, float]:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/auth/token",
+                    data={"username": f"bench{i % users}@example.com", "password": PASSWORD},
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"login failed: {response.status_code} {response.text}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return requests / elapsed, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--kind", choices=["thread", "process"], default="thread")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    seed(args.users)
+    print(f"bcrypt rounds={password_hashing.BCRYPT_ROUNDS} kind={args.kind} "
+          f"requests={args.requests} concurrency={args.concurrency}")
+    print(f"{'pool size':>10} {'logins/s':>10} {'p95 (ms)':>10}")
+    for size in args.sizes:
+        password_hashing.configure(size=size, kind=args.kind)
+        throughput, p95 = asyncio.run(run_round(args.requests, args.concurrency, args.users))
+        print(f"{size:>10} {throughput:>10.1f} {p95 * 1000:>10.1f}")
+    password_hashing.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Build and query times for the bitmap member filter snapshot.
+
+Usage:
+    python bench_member_filter.py                  # 100k synthetic members
+    python bench_member_filter.py --members 500000
+
+Builds a MemberTable from synthetic rows (no database needed), then times
+filter combinations of increasing complexity, with and without facets, and
+prints p50/p95 per case in microseconds.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.member_filter import FACETS, MemberTable
+
+Row = namedtuple("Row", "id village_id status profession position date_of_birth")
+
+PROFESSIONS = ["Farmer", "Teacher", "Engineer", "Doctor", "Trader", "Student", "Retired", None]
+POSITIONS = ["President", "Secretary", "Treasurer", "Trustee"]
+STATUSES = ["member"] * 85 + ["approved"] * 10 + ["pending"] * 5
+
+CASES = {
+    "status": {"status": ["member"]},
+    "village + status": {"village_id": [3], "status": ["member", "approved"]},
+    "age range": {"age_min": 25, "age_max": 40},
+    "age + profession + paid": {"age_min": 30, "age_max": 60, "profession": ["farmer", "trader"], "paid": True},
+    "or of villages / positions": {"or": [{"village_id": [1, 2, 3]}, {"position": ["president", "trustee"]}]},
+    "nested and/or/not": {
+        "status": ["member"],
+        "and": [{"or": [{"profession": ["doctor"]}, {"age_min": 60}]}],
+        "not": {"paid": True},
+    },
+}
+
+
+def build(members: int, villages: int) -> MemberTable:
+    rng = random.Random(5)
+    epoch = date(1940, 1, 1)
+    rows = [
+        Row(
+            i,
+            rng.randint(1, villages),
+            rng.choice(STATUSES),
+            rng.choice(PROFESSIONS),
+            rng.choice(POSITIONS) if rng.random() < 0.01 else None,
+            epoch + timedelta(days=rng.randint(0, 30000)) if rng.random() < 0.8 else None,
+        )
+        for i in range(1, members + 1)
+    ]
+    paid = {row.id for row in rows if rng.random() < 0.6}
+    table = MemberTable()
+    table.load(rows, paid)
+    return table
+
+
+def timed(fn, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--villages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = build(args.members, args.villages)
+    print(f"Built snapshot of {len(table)} members in {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'case':<28} {'matches':>8} {'filter p50':>11} {'p95':>8} {'+facets p50':>12} {'p95':>8}  (µs)")
+    for name, node in CASES.items():
+        total = table.evaluate(node).bit_count()
+        plain = timed(lambda: table.page(table.evaluate(node), None, 100), args.repeat)
+        faceted = timed(lambda: table.facets(table.evaluate(node), FACETS), args.repeat)
+        p95 = lambda t: t[min(len(t) - 1, int(len(t) * 0.95))]
+        print(f"{name:<28} {total:>8} {statistics.median(plain):>11.0f} {p95(plain):>8.0f} "
+              f"{statistics.median(faceted):>12.0f} {p95(faceted):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
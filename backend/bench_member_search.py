@@ -0,0 +1,84 @@
+"""Build and query times for the in-memory member search index.
+
+Usage:
+    python bench_member_search.py                  # 100k synthetic members
+    python bench_member_search.py --members 250000
+
+Generates a mix of Latin and Gujarati names, professions, phone numbers,
+Sabhasad IDs and villages, builds the index, then times a set of queries
+(prefixes, full names, typos, phone and ID fragments, both scripts) and
+prints p50/p95/max per query kind. No database is needed.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.member_search import MemberDoc, MemberSearchIndex, member_fields
+from app.identifiers import format_sabhasad_id
+
+FIRST = ["Ramesh", "Suresh", "Mahesh", "Jignesh", "Kiran", "Hetal", "Nirav", "Pooja", "Bhavesh", "Dipika",
+         "રમેશ", "સુરેશ", "મહેશ", "કિરણ", "હેતલ", "નિરવ", "પૂજા", "ભાવેશ"]
+LAST = ["Patel", "Shah", "Desai", "Joshi", "Mehta", "Chaudhari", "Prajapati",
+        "પટેલ", "શાહ", "દેસાઈ", "જોશી", "મહેતા", "ચૌધરી"]
+PROFESSIONS = ["Farmer", "Teacher", "Engineer", "Doctor", "Trader", "ખેડૂત", "શિક્ષક", "વેપારી", None]
+VILLAGES = ["Mehsana", "Unjha", "Visnagar", "Kadi", "Patan", "મહેસાણા", "ઊંઝા", "વિસનગર", "કડી", "પાટણ"]
+STATUSES = ["member"] * 8 + ["approved", "pending"]
+
+QUERIES = {
+    "prefix": ["ram", "pat", "mehs", "રમ", "પટ", "desa"],
+    "full name": ["ramesh patel", "hetal shah", "સુરેશ પટેલ", "કિરણ જોશી"],
+    "typo": ["rmesh", "patle", "chaudhri", "પટલ"],
+    "phone / id": ["98250", "0042", "42", "૯૮૨૫૦"],
+    "filtered": ["ramesh farmer", "patel unjha", "પટેલ ઊંઝા"],
+}
+
+
+def build(members: int) -> MemberSearchIndex:
+    rng = random.Random(13)
+    index = MemberSearchIndex()
+    for village_id, name in enumerate(VILLAGES, start=1):
+        index.village_names[village_id] = name
+    for i in range(1, members + 1):
+        village_id = rng.randint(1, len(VILLAGES))
+        full_name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+        status = rng.choice(STATUSES)
+        sabhasad_id = format_sabhasad_id(i) if status == "member" else None
+        phone = f"98{rng.randint(0, 99_999_999):08d}"
+        index.add(MemberDoc(i, full_name, status, "user", village_id, member_fields(
+            full_name, rng.choice(PROFESSIONS), phone, sabhasad_id, VILLAGES[village_id - 1],
+        )))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build(args.members)
+    print(f"Built index: {len(index)} members, {len(index.term_fields)} distinct terms "
+          f"in {time.perf_counter() - start:.1f}s\n")
+
+    statuses = {"approved", "member"}
+    print(f"{'kind':<12} {'query':<16} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for kind, queries in QUERIES.items():
+        for query in queries:
+            timings = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                hits = index.search(query, 20, statuses=statuses)
+                timings.append((time.perf_counter() - t) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{kind:<12} {query:<16} {len(hits):>5} {statistics.median(timings):>8.2f} {p95:>8.2f} {timings[-1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Order creation latency: the blocking razorpay SDK path against the async gateway client.
+
+Usage:
+    python bench_order_creation.py                                   # 1000 orders, 200 at once
+    python bench_order_creation.py --orders 3000 --concurrency 500 --latency 300
+    python bench_order_creation.py --latency 1000 --orders 600        # a slow gateway
+    python bench_order_creation.py --slow-rate 0.02 --only async      # 2% of gateway calls take 5 s
+    python bench_order_creation.py --gateway-url http://127.0.0.1:9010   # a fake_razorpay.py already running
+
+Starts fake_razorpay.py (unless --gateway-url is given), seeds a throwaway
+SQLite database with donors and fires --orders POST /payments/create-order
+calls, --concurrency at a time, through the ASGI app.
+
+"blocking" is the route as it was before app/razorpay_gateway.py: a sync
+route calling razorpay.Client.order.create, so each order holds an AnyIO
+threadpool thread (40 by default) for the whole gateway round trip and the
+rest queue behind them. "async" is the current route. While each run is in
+flight, a probe times a no-op run_in_threadpool call every 20 ms: that is
+the wait every other sync route and threadpool job sees.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--orders", type=int, default=1000)
+parser.add_argument("--concurrency", type=int, default=200)
+parser.add_argument("--latency", type=float, default=150, help="fake gateway ms per call")
+parser.add_argument("--jitter", type=float, default=50)
+parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of gateway calls answered --slow-ms late")
+parser.add_argument("--slow-ms", type=float, default=5000)
+parser.add_argument("--only", choices=["blocking", "async"], help="run one path (each run shares the fake gateway)")
+parser.add_argument("--gateway-url", help="use a running fake_razorpay.py instead of starting one")
+args = parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+gateway_process = None
+gateway_url = args.gateway_url
+if not gateway_url:
+    port = free_port()
+    gateway_url = f"http://127.0.0.1:{port}"
+    gateway_process = subprocess.Popen([
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_razorpay.py"),
+        "--port", str(port), "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--slow-rate", str(args.slow_rate), "--slow-ms", str(args.slow_ms),
+    ])
+
+os.environ["RAZORPAY_API_URL"] = gateway_url
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_order_creation.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ASYNC_READ_DATABASE_URL", None)
+
+import httpx
+import razorpay
+from typing import Annotated
+from fastapi import Depends, HTTPException
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+from app.main import app
+from app.database import Base, engine
+from app.config import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET
+from app.routers.auth import create_access_token, get_current_user
+from app.routers.payments import CreateOrderRequest
+from app import models, razorpay_gateway
+
+DONORS = 200
+PATHS = {"blocking": "/bench/blocking-create-order", "async": "/payments/create-order"}
+
+sdk_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET), base_url=gateway_url)
+
+
+# The create-order route before the async gateway client, for comparison
+@app.post("/bench/blocking-create-order")
+def blocking_create_order(order: CreateOrderRequest, current_user: Annotated[models.User, Depends(get_current_user)]):
+    try:
+        razorpay_order = sdk_client.order.create(data={
+            "amount": int(order.amount * 100),
+            "currency": "INR",
+            "receipt": "PAY-bench",
+            "notes": {"user_id": str(current_user.id), "purpose": order.purpose},
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
+    return {"order_id": razorpay_order["id"], "amount": order.amount}
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "email": f"order{i}@example.com", "hashed_password": "x", "full_name": f"Order Donor {i}",
+             "status": "approved"}
+            for i in range(1, DONORS + 1)
+        ])
+
+
+def wait_for_gateway():
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            httpx.get(f"{gateway_url}/stats", timeout=1)
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise SystemExit(f"fake gateway did not start at {gateway_url}")
+            time.sleep(0.1)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(path: str, headers: list[dict]) -> tuple[list[float], list[float], int, float]:
+    limit = asyncio.Semaphore(args.concurrency)
+    timings, probes = [], []
+    failures = 0
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await run_in_threadpool(lambda: None)
+            probes.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.02)
+
+    async def order(client, i, limit=limit):
+        nonlocal failures
+        async with limit:
+            start = time.perf_counter()
+            response = await client.post(path, json={"amount": 100 + i % 900, "purpose": "general"},
+                                         headers=headers[i % len(headers)])
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                failures += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # Warm up the user cache (a miss holds a database connection for the
+        # whole request), gateway connections and the SDK session
+        warm_up = asyncio.Semaphore(10)
+        await asyncio.gather(*(order(client, i, warm_up) for i in range(len(headers))))
+        timings.clear()
+        failures = 0
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(order(client, i) for i in range(args.orders)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+    await razorpay_gateway.gateway.aclose()
+    return sorted(timings), sorted(probes), failures, elapsed
+
+
+def main():
+    try:
+        wait_for_gateway()
+        seed()
+        headers = [{"Authorization": f"Bearer {create_access_token({'sub': f'order{i}@example.com'})}"}
+                   for i in range(1, DONORS + 1)]
+        print(f"{args.orders} orders, {args.concurrency} at once, gateway {args.latency:.0f}+{args.jitter:.0f} ms"
+              + (f", {args.slow_rate:.0%} at {args.slow_ms:.0f} ms" if args.slow_rate else ""))
+        print(f"{'path':<10} {'orders/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'pool wait p99':>14} {'failed':>7}")
+        for name, path in PATHS.items():
+            if args.only and name != args.only:
+                continue
+            timings, probes, failures, elapsed = asyncio.run(run(path, headers))
+            print(f"{name:<10} {len(timings) / elapsed:>9.0f} {statistics.median(timings):>9.1f} "
+                  f"{percentile(timings, 0.95):>9.1f} {percentile(timings, 0.99):>9.1f} {timings[-1]:>9.1f} "
+                  f"{percentile(probes, 0.99) if probes else 0:>14.1f} {failures:>7}")
+        print(f"gateway client: {razorpay_gateway.gateway.stats()}")
+    finally:
+        if gateway_process is not None:
+            gateway_process.terminate()
+            gateway_process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Time and size of /payments/chart for each resolution.
+
+Usage:
+    python bench_payment_chart.py                     # 200k payments over 5 years
+    python bench_payment_chart.py --payments 1000000 --years 10
+
+Seeds a throwaway SQLite database, then calls the chart endpoint through the
+ASGI app for each resolution and prints the number of points, the response
+size and p50 latency. The "per-donation loop" row is the previous
+implementation (every Payment loaded as an ORM object, totals summed in
+Python) for comparison.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_payment_chart.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ASYNC_READ_DATABASE_URL", None)
+
+import httpx
+from sqlalchemy import insert, select
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app.routers.auth import create_access_token
+from app import models
+
+CASES = [
+    ("auto (default)", ""),
+    ("raw, max_points=500", "resolution=raw"),
+    ("day", "resolution=day&max_points=5000"),
+    ("month", "resolution=month"),
+    ("auto, max_points=100", "max_points=100"),
+]
+
+
+def seed(payments: int, years: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1) - timedelta(days=365 * years)
+    seconds = 365 * years * 86400
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), [
+            {"id": i, "email": f"chart{i}@example.com", "hashed_password": "x", "full_name": f"Chart {i}",
+             "status": "member", "role": "user"}
+            for i in range(1, 1001)
+        ])
+        stamps = sorted(rng.randrange(seconds) for _ in range(payments))
+        conn.execute(insert(models.Payment.__table__), [
+            {"user_id": rng.randint(1, 1000), "amount": rng.choice([101, 251, 501, 1001, 5001]),
+             "status": "completed", "purpose": "general", "transaction_id": f"chart-{i}",
+             "created_at": start + timedelta(seconds=s)}
+            for i, s in enumerate(stamps)
+        ])
+
+
+def per_donation_loop(user_id: int) -> list:
+    db = SessionLocal()
+    try:
+        payments = db.scalars(
+            select(models.Payment).where(models.Payment.status == "completed").order_by(models.Payment.created_at)
+        ).all()
+        total = personal = 0
+        points = []
+        for p in payments:
+            total += p.amount
+            if p.user_id == user_id:
+                personal += p.amount
+            points.append({"timestamp": p.created_at, "amount": total, "personal_amount": personal,
+                           "donation_amount": p.amount})
+        return points
+    finally:
+        db.close()
+
+
+async def time_endpoint(query: str, repeat: int):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'chart1@example.com'})}"}
+    transport = httpx.ASGITransport(app=app)
+    timings = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await client.get(f"/payments/chart?{query}", headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+    return len(response.json()), len(response.content), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=200_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed(args.payments, args.years)
+    print(f"Seeded {args.payments} payments over {args.years} years in {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'case':<24} {'points':>8} {'bytes':>11} {'p50 ms':>9}")
+    for name, query in CASES:
+        points, size, p50 = asyncio.run(time_endpoint(query, args.repeat))
+        print(f"{name:<24} {points:>8} {size:>11} {p50:>9.1f}")
+
+    start = time.perf_counter()
+    points = per_donation_loop(user_id=1)
+    print(f"{'per-donation loop':<24} {len(points):>8} {'':>11} {(time.perf_counter() - start) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
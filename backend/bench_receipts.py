@@ -0,0 +1,138 @@
+"""Latency of /payments/{id}/receipt: cold, cached, conditional and PDF.
+
+Usage:
+    python bench_receipts.py
+    python bench_receipts.py --repeat 200 --concurrency 32
+    RECEIPT_PDF_POOL_KIND=thread python bench_receipts.py
+
+Seeds a throwaway SQLite database with one payment per donor and calls the
+endpoint through the ASGI app. "cold" clears the receipt cache before every
+call (one query plus a render), "cached" runs the same query and serves the
+stored bytes, and "304" sends the ETag back. The last rows fire
+--concurrency PDF renders at once while pinging GET / and report the ping
+latency, which stays flat as long as the renders run off the event loop.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_receipts.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ASYNC_READ_DATABASE_URL", None)
+
+import httpx
+from sqlalchemy import insert
+from app.main import app
+from app.database import Base, engine
+from app import models, receipts
+
+DONORS = 500
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Village), [{"id": 1, "name": "Bench Village", "district": "Bench"}])
+        conn.execute(insert(models.User), [
+            {"id": i, "email": f"receipt{i}@example.com", "hashed_password": "x", "full_name": f"Receipt Donor {i}",
+             "status": "member", "sabhasad_id": f"eSAB-{i:05d}", "village_id": 1}
+            for i in range(1, DONORS + 1)
+        ])
+        conn.execute(insert(models.Payment), [
+            {"id": i, "user_id": i, "amount": 500 + i, "status": "completed", "purpose": "membership_fee",
+             "transaction_id": f"receipt-{i}"}
+            for i in range(1, DONORS + 1)
+        ])
+
+
+def summary(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f"{statistics.median(timings):>9.2f} {p95:>9.2f}"
+
+
+async def timed(client, path: str, headers=None) -> tuple[float, httpx.Response]:
+    start = time.perf_counter()
+    response = await client.get(path, headers=headers)
+    return (time.perf_counter() - start) * 1000, response
+
+
+async def sequential(client, repeat: int):
+    print(f"{'case':<28} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, fmt, cold in (("html, cold", "html", True), ("html, cached", "html", False),
+                            ("pdf, cold", "pdf", True), ("pdf, cached", "pdf", False)):
+        timings = []
+        for i in range(repeat):
+            if cold:
+                receipts.clear()
+            # Cold calls walk through the payments, cached ones repeat the first
+            payment_id = i % DONORS + 1 if cold else 1
+            elapsed, response = await timed(client, f"/payments/{payment_id}/receipt?format={fmt}")
+            response.raise_for_status()
+            timings.append(elapsed)
+        print(f"{name:<28} {summary(timings)}")
+
+    etag = (await client.get("/payments/1/receipt")).headers["etag"]
+    timings = []
+    for _ in range(repeat):
+        elapsed, response = await timed(client, "/payments/1/receipt", {"If-None-Match": etag})
+        assert response.status_code == 304, response.status_code
+        timings.append(elapsed)
+    print(f"{'html, If-None-Match (304)':<28} {summary(timings)}")
+
+
+async def concurrent_pdfs(client, concurrency: int):
+    receipts.clear()
+    pings = []
+    done = asyncio.Event()
+
+    async def ping():
+        while not done.is_set():
+            elapsed, _ = await timed(client, "/")
+            pings.append(elapsed)
+            await asyncio.sleep(0.005)
+
+    pinger = asyncio.create_task(ping())
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.get(f"/payments/{i + 1}/receipt?format=pdf") for i in range(concurrency)))
+    elapsed = (time.perf_counter() - start) * 1000
+    done.set()
+    await pinger
+    assert all(r.status_code == 200 for r in responses)
+    print(f"\n{concurrency} concurrent cold PDFs in {elapsed:.0f} ms "
+          f"({receipts.RECEIPT_PDF_POOL_KIND} pool of {receipts.RECEIPT_PDF_POOL_SIZE})")
+    print(f"{'GET / meanwhile':<28} {summary(pings or [0.0])}")
+
+
+async def run(repeat: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Start the PDF workers before timing anything
+        await client.get("/payments/1/receipt?format=pdf")
+        await sequential(client, repeat)
+        await concurrent_pdfs(client, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    seed()
+    try:
+        asyncio.run(run(args.repeat, args.concurrency))
+    finally:
+        receipts.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""p50/p95 latency of /payments/recent-donations for every sort and date filter.
+
+Usage:
+    python bench_recent_donations.py                  # 1M payments, throwaway SQLite
+    python bench_recent_donations.py --payments 200000 --repeat 50
+    DATABASE_URL=postgresql://... python bench_recent_donations.py
+
+Seeds the database once (reused on later runs), applies migrations so the
+indexes match production, then calls the endpoint through the ASGI app for
+each sort_by x order x filter combination. Date filters are calendar days in
+APP_TIMEZONE and become half-open created_at ranges, so every case should be
+an index range scan plus a LIMIT; a case that is orders of magnitude slower
+than its neighbours is sorting or scanning the whole table.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_recent_donations.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ASYNC_READ_DATABASE_URL", None)
+
+import httpx
+from sqlalchemy import func, insert, select, text
+from app.main import app
+from app.database import engine
+from app import migrations, models
+
+BATCH = 10_000
+DONORS = 5000
+# Payments are spread evenly over these years, ending at LATEST
+YEARS = 5
+LATEST = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def seed(payments: int):
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(models.Payment)).scalar() >= payments:
+            return False
+        conn.execute(insert(models.User), [
+            {"email": f"donor{i}@example.com", "hashed_password": "x", "full_name": f"Donor {i}",
+             "status": "member", "role": "user"}
+            for i in range(DONORS)
+        ])
+        user_ids = [row[0] for row in conn.execute(select(models.User.id))]
+        step = timedelta(days=365 * YEARS) / payments
+        first = LATEST - step * payments
+        for start in range(0, payments, BATCH):
+            conn.execute(insert(models.Payment), [
+                {
+                    "user_id": rng.choice(user_ids),
+                    "amount": float(rng.choice([101, 251, 501, 1001, 5001]) + rng.randint(0, 99)),
+                    "status": "completed" if rng.random() < 0.97 else "failed",
+                    "purpose": rng.choice(["general", "membership", "special"]),
+                    "transaction_id": f"recent-{i}",
+                    "created_at": first + step * i,
+                }
+                for i in range(start, min(start + BATCH, payments))
+            ])
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return True
+
+
+def filters() -> list[tuple[str, str]]:
+    last = (LATEST - timedelta(days=1)).date()
+    week = last - timedelta(days=6)
+    return [
+        ("all", ""),
+        ("start_date", f"start_date={week}"),
+        ("end_date", f"end_date={date(last.year - YEARS + 1, 6, 30)}"),
+        ("last week", f"start_date={week}&end_date={last}"),
+        ("one year", f"start_date={date(last.year - 1, 1, 1)}&end_date={date(last.year - 1, 12, 31)}"),
+    ]
+
+
+async def time_case(client, query: str, repeat: int) -> tuple[int, float, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(f"/payments/recent-donations?{query}")
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return len(response.json()), statistics.median(timings), p95
+
+
+async def run(repeat: int, limit: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'sort_by':<8} {'order':<6} {'filter':<11} {'rows':>5} {'p50 ms':>9} {'p95 ms':>9}")
+        for sort_by in ("date", "amount"):
+            for order in ("desc", "asc"):
+                for name, query in filters():
+                    params = f"sort_by={sort_by}&order={order}&limit={limit}" + (f"&{query}" if query else "")
+                    # One untimed call so the first case does not pay for warm-up
+                    await client.get(f"/payments/recent-donations?{params}")
+                    rows, p50, p95 = await time_case(client, params, repeat)
+                    print(f"{sort_by:<8} {order:<6} {name:<11} {rows:>5} {p50:>9.1f} {p95:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine, log=lambda *_: None)
+    start = time.perf_counter()
+    if seed(args.payments):
+        print(f"Seeded {args.payments} payments over {YEARS} years in {time.perf_counter() - start:.1f}s")
+    print(f"{engine.dialect.name}, {args.repeat} calls per case\n")
+    asyncio.run(run(args.repeat, args.limit))
+
+
+if __name__ == "__main__":
+    main()
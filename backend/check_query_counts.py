@@ -0,0 +1,145 @@
+"""Per-endpoint SQL query budgets, to catch N+1 regressions.
+
+Usage:
+    python check_query_counts.py
+    DB_MODE=async python check_query_counts.py
+
+Always runs against a throwaway SQLite database (it drops and recreates the
+schema), whatever DATABASE_URL is set to.
+
+Every endpoint is called twice, against a small and a large dataset, under
+query_stats.assert_max_queries. An N+1 shows up as a query count that grows
+with the number of rows and fails the budget. Exits 1 on any failure.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'check_query_counts.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ASYNC_READ_DATABASE_URL", None)
+
+import httpx
+from sqlalchemy import select
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import member_search, models, password_hashing, query_stats, receipts, user_cache, village_summary
+
+PASSWORD = "check-password"
+
+# (path, max queries). The authenticated user lookup is included: the user
+# and village summary caches (and rendered receipts) are cleared before every call so the budget
+# covers the cold path.
+BUDGETS = [
+    ("/auth/users/me", 1),
+    ("/members/", 3),
+    ("/members/?include_total=true", 4),
+    ("/members/?village_id={village_id}", 3),
+    ("/members/pending", 4),
+    # Includes building the search index (villages + users) on first use
+    ("/members/search?q=count+member", 5),
+    ("/members/{member_id}", 2),
+    ("/villages/", 1),
+    ("/villages/summary", 2),
+    ("/villages/{village_id}/summary", 2),
+    ("/events/", 1),
+    ("/family/", 2),
+    ("/family/tree", 2),
+    ("/payments/recent-donations", 1),
+    ("/payments/history", 2),
+    ("/payments/history?user_id={member_id}&purpose=general", 2),
+    ("/payments/me", 2),
+    ("/payments/stats", 2),
+    # resolution=auto sizes the range first, then fetches the points
+    ("/payments/chart", 3),
+    ("/payments/chart?resolution=day", 2),
+    ("/payments/{payment_id}/receipt", 1),
+    ("/payments/{payment_id}/receipt?format=pdf", 1),
+]
+
+
+def seed(size: int) -> dict:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        villages = [models.Village(name=f"Count Village {i}", district="Count") for i in range(max(2, size // 5))]
+        db.add_all(villages)
+        db.flush()
+        admin = models.User(
+            email="count-admin@example.com",
+            hashed_password=password_hashing.pwd_context.hash(PASSWORD),
+            full_name="Count Admin",
+            role="admin",
+            status="approved",
+            village_id=villages[0].id,
+        )
+        db.add(admin)
+        db.flush()
+        members = []
+        for i in range(size):
+            user = models.User(
+                email=f"count{i}@example.com",
+                hashed_password="x",
+                full_name=f"Count Member {i}",
+                status="pending" if i % 4 == 0 else "member",
+                village_id=villages[i % len(villages)].id,
+            )
+            db.add(user)
+            members.append(user)
+        db.flush()
+        for i, user in enumerate(members):
+            db.add(models.Payment(user_id=user.id, amount=100 + i, transaction_id=f"count-{i}", status="completed"))
+            db.add(models.DonationEvent(title=f"Event {i}", description="", goal=1000, image="", category="general"))
+            db.add(models.FamilyMember(user_id=admin.id, name=f"Relative {i}", relation="Son"))
+        db.commit()
+        member = next(u for u in members if u.status == "member")
+        payment_id = db.scalar(select(models.Payment.id).order_by(models.Payment.id.desc()).limit(1))
+        return {"village_id": villages[0].id, "member_id": member.id, "payment_id": payment_id}
+    finally:
+        db.close()
+
+
+async def run(size: int) -> list[str]:
+    ids = seed(size)
+    member_search.clear()
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        response = await client.post("/auth/token", data={"username": "count-admin@example.com", "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for template, limit in BUDGETS:
+            path = template.format(**ids)
+            user_cache.clear()
+            village_summary.clear()
+            receipts.clear()
+            try:
+                with query_stats.assert_max_queries(limit, label=path) as stats:
+                    response = await client.get(path, headers=headers)
+                if response.status_code != 200:
+                    raise AssertionError(f"{path} returned {response.status_code}: {response.text[:200]}")
+                print(f"  {path:<40} {stats.count:>3} / {limit}")
+            except AssertionError as e:
+                print(f"  {path:<40} ❌")
+                failures.append(f"[{size} rows] {e}")
+    return failures
+
+
+def main():
+    failures = []
+    for size in (5, 60):
+        print(f"Dataset with {size} members:")
+        failures += asyncio.run(run(size))
+    password_hashing.shutdown()
+    if failures:
+        print("\n" + "\n\n".join(failures))
+        sys.exit(1)
+    print("\nAll endpoints within their query budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Query-plan regression check for the hot read paths.
+
+Usage:
+    python check_query_plans.py                       # throwaway SQLite database
+    DATABASE_URL=postgresql://... python check_query_plans.py --payments 500000
+
+Seeds a large dataset (once), applies migrations, then EXPLAINs the queries
+behind recent-donations, the payment chart's date filters, members/ (including keyset pages), members/pending,
+family/tree, the per-village summary, the top donor and payment history as
+the routes build them. Exits 1 if any of them falls back to a sequential
+scan of a large table, so a dropped index or a non-sargable rewrite is
+caught.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'check_query_plans.db')}"
+
+from sqlalchemy import func, insert, select, text
+from app.database import engine
+from app import migrations, models, pagination, payment_chart, payment_rollups
+from app.identifiers import format_sabhasad_id
+from app.routers.family import family_members_query
+from app.routers.members import MEMBER_SORT_KEYS, members_query, pending_members_query
+from app.routers.payments import PAYMENT_HISTORY_KEYS, payment_history_query, recent_donations_query
+from app.village_summary import summary_query
+
+BATCH = 5000
+VILLAGES = 200
+STATUSES = ["member"] * 90 + ["approved"] * 6 + ["pending"] * 3 + ["rejected"]
+
+
+def seed(users: int, payments: int, family: int):
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(models.User)).scalar() >= users:
+            return
+        conn.execute(insert(models.Village), [
+            {"name": f"Plan Village {i}", "district": "Plan"} for i in range(VILLAGES)
+        ])
+        village_ids = [row[0] for row in conn.execute(select(models.Village.id))]
+        for start in range(0, users, BATCH):
+            conn.execute(insert(models.User), [
+                {
+                    "email": f"plan{i}@example.com",
+                    "hashed_password": "x",
+                    "full_name": f"Plan Member {i}",
+                    "phone_number": f"5{i:09d}",
+                    "sabhasad_id": format_sabhasad_id(800000 + i),
+                    "status": rng.choice(STATUSES),
+                    "village_id": rng.choice(village_ids),
+                }
+                for i in range(start, min(start + BATCH, users))
+            ])
+        user_ids = [row[0] for row in conn.execute(select(models.User.id))]
+        epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        for start in range(0, payments, BATCH):
+            conn.execute(insert(models.Payment), [
+                {
+                    "user_id": rng.choice(user_ids),
+                    "amount": float(rng.randint(10, 5000)),
+                    "status": "completed" if rng.random() < 0.97 else "failed",
+                    "purpose": rng.choice(["general", "membership", "special"]),
+                    "transaction_id": f"plan-{i}",
+                    "created_at": epoch + timedelta(minutes=i * 7),
+                }
+                for i in range(start, min(start + BATCH, payments))
+            ])
+        for start in range(0, family, BATCH):
+            conn.execute(insert(models.FamilyMember), [
+                {"user_id": rng.choice(user_ids), "name": f"Relative {i}", "relation": "Son", "gender": "male"}
+                for i in range(start, min(start + BATCH, family))
+            ])
+        # The Core inserts above bypass the rollup hook
+        payment_rollups.recount(conn)
+
+
+def cases(sample_user_id: int, sample_village_id: int, recent: datetime):
+    return [
+        ("recent-donations (default)", recent_donations_query().limit(10), {"payments"}),
+        ("recent-donations ?order=asc", recent_donations_query(order="asc").limit(10), {"payments"}),
+        ("recent-donations ?start_date=", recent_donations_query(start_date=recent).limit(10), {"payments"}),
+        ("recent-donations ?start_date=&end_date=",
+         recent_donations_query(start_date=recent, end_date=recent + timedelta(days=3)).limit(10), {"payments"}),
+        ("recent-donations ?sort_by=amount",
+         recent_donations_query(sort_by="amount").limit(10), {"payments"}),
+        ("payments/chart ?year=&month=",
+         payment_chart.points_query(sample_user_id, payment_chart.chart_filters(month=3, year=recent.year), "day"),
+         {"payments"}),
+        ("payments/chart ?month=",
+         payment_chart.points_query(sample_user_id, payment_chart.chart_filters(
+             month=3, years=range(recent.year - 3, recent.year + 1)), "day"), {"payments"}),
+        ("members/?village_id=", members_query(sample_village_id).limit(100), {"users"}),
+        ("members/ (keyset, name)",
+         pagination.keyset(members_query(), MEMBER_SORT_KEYS["name"], None, 100), {"users"}),
+        ("members/ (keyset, created_at)",
+         pagination.keyset(members_query(), MEMBER_SORT_KEYS["created_at"], None, 100), {"users"}),
+        ("members/pending (keyset)",
+         pagination.keyset(pending_members_query(), [models.User.created_at, models.User.id], None, 100), {"users"}),
+        ("family/tree", family_members_query(sample_user_id), {"family_members"}),
+        ("family delete (reparent)", select(models.FamilyMember.id).where(models.FamilyMember.parent_id == 1), {"family_members"}),
+        ("payments by user", select(models.Payment).where(models.Payment.user_id == sample_user_id), {"payments"}),
+        ("villages/{id}/summary", summary_query(sample_village_id), {"payments", "users"}),
+        ("payments/stats (top donor)", payment_rollups.top_donor_query(), {"payment_rollups", "users"}),
+        ("payments/history",
+         pagination.keyset(payment_history_query(), PAYMENT_HISTORY_KEYS, None, 100, descending=True), {"payments"}),
+        ("payments/history ?status=&start_date=",
+         pagination.keyset(payment_history_query(status="completed", start_date=recent), PAYMENT_HISTORY_KEYS,
+                           None, 100, descending=True), {"payments"}),
+        ("payments/me",
+         pagination.keyset(payment_history_query(sample_user_id), PAYMENT_HISTORY_KEYS, None, 100, descending=True),
+         {"payments"}),
+    ]
+
+
+def _pg_seq_scans(plan: dict) -> set[str]:
+    found = set()
+    if plan.get("Node Type") == "Seq Scan":
+        found.add(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found |= _pg_seq_scans(child)
+    return found
+
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(.*)$")
+
+
+def explain(conn, statement) -> tuple[str, set[str]]:
+    """Return (plan text, tables read with a full sequential scan)."""
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    if engine.dialect.name == "postgresql":
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        root = plan[0]["Plan"]
+        lines = conn.execute(text(f"EXPLAIN {compiled}")).scalars().all()
+        return "\n".join(lines), _pg_seq_scans(root)
+
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    scans = set()
+    for row in rows:
+        match = _SQLITE_SCAN.match(row[-1])
+        if match and "INDEX" not in match.group(2):
+            scans.add(match.group(1))
+    return "\n".join(row[-1] for row in rows), scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--payments", type=int, default=200_000)
+    parser.add_argument("--family", type=int, default=50_000)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    print(f"Seeding ({engine.dialect.name})...")
+    seed(args.users, args.payments, args.family)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+
+    failures = 0
+    with engine.connect() as conn:
+        sample_user_id = conn.execute(select(func.max(models.FamilyMember.user_id))).scalar()
+        sample_village_id = conn.execute(select(func.min(models.Village.id))).scalar()
+        latest = conn.execute(select(func.max(models.Payment.created_at))).scalar()
+        if isinstance(latest, str):
+            latest = datetime.fromisoformat(latest)
+        recent = (latest - timedelta(days=7)).date()
+
+        for name, statement, tables in cases(sample_user_id, sample_village_id, recent):
+            plan, scans = explain(conn, statement)
+            bad = scans & tables
+            status = "❌ seq scan on " + ", ".join(sorted(bad)) if bad else "✅"
+            print(f"{name:<32} {status}")
+            if bad or args.verbose:
+                print("    " + plan.replace("\n", "\n    "))
+            failures += bool(bad)
+
+    if failures:
+        print(f"\n{failures} query plan regression(s).")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Local stand-in for the Razorpay Orders API, for load tests.
+
+Answers POST /v1/orders and GET /v1/orders/{id} like the real API (same JSON
+shapes and error bodies) after an artificial delay, so order creation can be
+measured without a network or a test account.
+
+    python fake_razorpay.py --port 9010 --latency 150 --jitter 50
+
+Then run the backend with:
+
+    RAZORPAY_API_URL=http://127.0.0.1:9010 uvicorn app.main:app
+
+--slow-rate sends that fraction of calls --slow-ms late (a gateway having a
+bad minute); --error-rate answers that fraction with a 500. Any Basic auth
+key is accepted, but calls without one get 401.
+"""
+import argparse
+import asyncio
+import base64
+import random
+import secrets
+import time
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+parser = argparse.ArgumentParser(description="Fake Razorpay Orders API")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=9010)
+parser.add_argument("--latency", type=float, default=150, help="ms before answering")
+parser.add_argument("--jitter", type=float, default=50, help="ms, added at random on top of --latency")
+parser.add_argument("--slow-rate", type=float, default=0.0)
+parser.add_argument("--slow-ms", type=float, default=5000)
+parser.add_argument("--error-rate", type=float, default=0.0)
+args = parser.parse_args()
+
+orders: dict[str, dict] = {}
+stats = {"created": 0, "fetched": 0, "errors": 0}
+
+
+def error(status: int, code: str, description: str) -> JSONResponse:
+    return JSONResponse({"error": {"code": code, "description": description, "source": "NA", "step": "NA",
+                                   "reason": "NA", "metadata": {}}}, status_code=status)
+
+
+async def gateway_delay() -> JSONResponse | None:
+    delay = args.latency + random.uniform(0, args.jitter)
+    if random.random() < args.slow_rate:
+        delay = args.slow_ms
+    await asyncio.sleep(delay / 1000)
+    if random.random() < args.error_rate:
+        stats["errors"] += 1
+        return error(500, "SERVER_ERROR", "The server encountered an error. The incident has been reported to admins.")
+    return None
+
+
+def key_id(request: Request) -> str | None:
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        return base64.b64decode(credentials).decode().partition(":")[0] or None
+    except ValueError:
+        return None
+
+
+async def create_order(request: Request):
+    if key_id(request) is None:
+        return error(401, "BAD_REQUEST_ERROR", "Authentication failed")
+    data = await request.json()
+    failed = await gateway_delay()
+    if failed:
+        return failed
+    amount = data.get("amount")
+    if not isinstance(amount, int) or amount < 100:
+        return error(400, "BAD_REQUEST_ERROR", "The amount must be atleast INR 1.00")
+    order = {
+        "id": f"order_{secrets.token_hex(7)}",
+        "entity": "order",
+        "amount": amount,
+        "amount_paid": 0,
+        "amount_due": amount,
+        "currency": data.get("currency", "INR"),
+        "receipt": data.get("receipt"),
+        "offer_id": None,
+        "status": "created",
+        "attempts": 0,
+        "notes": data.get("notes") or [],
+        "created_at": int(time.time()),
+    }
+    orders[order["id"]] = order
+    stats["created"] += 1
+    return JSONResponse(order)
+
+
+async def fetch_order(request: Request):
+    if key_id(request) is None:
+        return error(401, "BAD_REQUEST_ERROR", "Authentication failed")
+    failed = await gateway_delay()
+    if failed:
+        return failed
+    order = orders.get(request.path_params["order_id"])
+    if order is None:
+        return error(400, "BAD_REQUEST_ERROR", "The id provided does not exist")
+    stats["fetched"] += 1
+    return JSONResponse(order)
+
+
+async def get_stats(request: Request):
+    return JSONResponse({**stats, "orders": len(orders)})
+
+
+app = Starlette(routes=[
+    Route("/v1/orders", create_order, methods=["POST"]),
+    Route("/v1/orders/{order_id}", fetch_order, methods=["GET"]),
+    Route("/stats", get_stats),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+    print(f"Fake Razorpay listening on http://{args.host}:{args.port} "
+          f"({args.latency:.0f}+{args.jitter:.0f} ms, {args.slow_rate:.0%} slow, {args.error_rate:.0%} errors)")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", backlog=4096)
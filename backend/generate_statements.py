@@ -0,0 +1,91 @@
+"""Annual donation statements: one PDF per donor for a financial year, in a ZIP.
+
+Usage:
+    python generate_statements.py 2025                     # FY 2025-26 -> statements-FY2025-26.zip
+    python generate_statements.py 2025 --output /tmp/fy.zip --workers 8
+    python generate_statements.py 2025 --output - > fy.zip # stream the ZIP to stdout
+
+Reads the year's completed payments in one streaming query on the read
+database (READ_DATABASE_URL, else DATABASE_URL), grouped by donor (see
+app/statements.py). Statements are rendered on a process pool with at most
+--workers x 4 donors in flight, and each PDF is written into the ZIP as soon
+as it is ready, in donor order. The ZIP is written sequentially, so stdout
+or a pipe works as the output. Progress goes to stderr.
+"""
+from dotenv import load_dotenv
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from app.database import read_engine
+from app import statements
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("year", type=int, help="financial year start, e.g. 2025 for April 2025 to March 2026")
+    parser.add_argument("--output", help="ZIP path, or - for stdout (default: statements-FY<year>.zip)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    label = statements.financial_year_label(args.year)
+    output = args.output or f"statements-FY{label}.zip"
+    with read_engine.connect() as conn:
+        total = conn.scalar(statements.donor_count_query(args.year))
+    log(f"FY {label}: {total} donor statement(s), {args.workers} worker(s)")
+    if not total:
+        return
+
+    start = last_report = time.perf_counter()
+    written = payments = 0
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")
+    # spawn: workers must not inherit the parent's open database connection
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        with pool, zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive, read_engine.connect() as conn:
+            in_flight = deque()
+
+            def write_oldest():
+                nonlocal written, payments, last_report
+                name, count, future = in_flight.popleft()
+                archive.writestr(name, future.result())
+                written += 1
+                payments += count
+                now = time.perf_counter()
+                if now - last_report >= args.progress_every:
+                    last_report = now
+                    rate = written / (now - start)
+                    log(f"  {written}/{total} statements, {rate:.1f}/s, about {(total - written) / rate:.0f}s left")
+
+            for statement in statements.donor_statements(conn, args.year):
+                future = pool.submit(statements.render_statement, statement)
+                in_flight.append((statements.statement_filename(statement), len(statement["payments"]), future))
+                if len(in_flight) >= args.workers * 4:
+                    write_oldest()
+            while in_flight:
+                write_oldest()
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    log(f"✅ {written} statement(s) covering {payments} payment(s) in {elapsed:.1f}s"
+        + ("" if output == "-" else f" -> {output}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Apply versioned schema migrations (see app/migrations).
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py status     # list migrations and whether they are applied
+"""
+from dotenv import load_dotenv
+import os
+import sys
+
+# Add the current directory to sys.path so we can import app
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Load env before importing database.py to ensure correct DATABASE_URL
+load_dotenv()
+
+from app.database import engine
+from app import migrations
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "status":
+        for migration, applied in migrations.status(engine):
+            print(f"{'✅' if applied else '⏳'} {migration.version}_{migration.name}")
+    elif command == "upgrade":
+        applied = migrations.upgrade(engine)
+        print(f"Applied {len(applied)} migration(s)." if applied else "Schema is up to date.")
+    else:
+        sys.exit(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Measure cold-start cost: import time per module and time to first request.
+
+Usage:
+    python profile_startup.py                    # breakdown + time to first request
+    python profile_startup.py --top 30           # show more modules
+    python profile_startup.py --budget-ms 1500   # exit 1 if importing app.main takes longer
+
+Imports are measured in a fresh interpreter with `python -X importtime`.
+Time to first request starts a real uvicorn process and polls it until
+GET / answers, then times a first database-backed request (/villages/).
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times() -> list[tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for every module app.main imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"importing app.main failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str) -> int:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.status
+
+
+def time_to_first_request(timeout: float) -> tuple[float, float | None]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                sys.exit("uvicorn exited before serving a request")
+            try:
+                _get(base + "/")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.perf_counter() - start > timeout:
+                    sys.exit(f"no response within {timeout}s")
+                time.sleep(0.01)
+        ready = time.perf_counter() - start
+
+        db_start = time.perf_counter()
+        try:
+            _get(base + "/villages/")
+            first_db = time.perf_counter() - db_start
+        except urllib.error.URLError as e:
+            print(f"⚠️  /villages/ failed ({e}); is the database reachable?")
+            first_db = None
+        return ready, first_db
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail if importing app.main exceeds this")
+    parser.add_argument("--skip-server", action="store_true", help="only measure imports")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    rows = import_times()
+    total_ms = next(c for name, _, c in rows if name == "app.main") / 1000
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    print(f"import app.main: {total_ms:.0f} ms ({len(rows)} modules)\n")
+    print(f"{'package':<28} {'self (ms)':>10}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28} {self_us / 1000:>10.1f}")
+
+    print(f"\n{'module':<40} {'cumulative (ms)':>16}")
+    app_rows = [row for row in rows if row[0].startswith("app.")]
+    for name, _, cumulative_us in sorted(app_rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{name:<40} {cumulative_us / 1000:>16.1f}")
+
+    if not args.skip_server:
+        ready, first_db = time_to_first_request(args.timeout)
+        print(f"\ntime to first request (GET /): {ready * 1000:.0f} ms")
+        if first_db is not None:
+            print(f"first database request (GET /villages/): {first_db * 1000:.0f} ms")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\n❌ import budget exceeded: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Recompute the payment rollups (per purpose, day and donor) from the payments table.
+
+Usage:
+    python repair_payment_rollups.py           # backfill / fix any drift
+    python repair_payment_rollups.py --check   # report drift only; exit 1 if found
+
+The rollups are normally maintained on every ORM write (app/payment_rollups.py).
+Run this after bulk imports or manual SQL that bypassed the ORM, or on a
+schedule as a consistency check.
+"""
+from dotenv import load_dotenv
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from app.database import engine
+from app import payment_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="report drift without fixing it")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        drift = payment_rollups.drift(conn)
+        for entry in drift[:50]:
+            print(f"  {entry['dimension']} {entry['key']}: "
+                  f"stored {entry['stored'][0]} / {entry['stored'][1]:.2f}, "
+                  f"actual {entry['actual'][0]} / {entry['actual'][1]:.2f}")
+        if len(drift) > 50:
+            print(f"  ... and {len(drift) - 50} more")
+        if args.check:
+            print(f"{len(drift)} drifted rollup(s)." if drift else "All payment rollups match.")
+            sys.exit(1 if drift else 0)
+        fixed = payment_rollups.recount(conn)
+    print(f"Repaired {fixed} rollup(s)." if fixed else "All payment rollups match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Recompute the denormalized member counts on villages from the users table.
+
+Usage:
+    python repair_village_counts.py           # fix any drift
+    python repair_village_counts.py --check   # report drift only; exit 1 if found
+
+The counts are normally maintained on every ORM write (app/village_counts.py).
+Run this after bulk imports or manual SQL that bypassed the ORM, or on a
+schedule as a safety net.
+"""
+from dotenv import load_dotenv
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from app.database import engine
+from app import village_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="report drift without fixing it")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        drift = village_counts.drift(conn)
+        for entry in drift:
+            print(f"  {entry['name']} (#{entry['village_id']}) {entry['column']}: "
+                  f"stored {entry['stored']}, actual {entry['actual']}")
+        if args.check:
+            print(f"{len(drift)} drifted count(s)." if drift else "All village counts match.")
+            sys.exit(1 if drift else 0)
+        fixed = village_counts.recount(conn)
+    print(f"Repaired {fixed} village(s)." if fixed else "All village counts match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Local SMTP sink for testing outbound email without a real provider.
+
+Accepts every message and prints its recipients and subject.
+
+    python smtp_sink.py --port 1025
+
+Then run the backend with:
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_AUTH=false SMTP_STARTTLS=false \
+    EMAIL_PROVIDERS=smtp uvicorn app.main:app
+"""
+import argparse
+import asyncio
+from email import message_from_bytes
+
+
+async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    async def reply(line: str):
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    await reply("220 smtp-sink ready")
+    recipients = []
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                await reply("250 smtp-sink")
+            elif verb == "MAIL":
+                recipients = []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[-1].strip(" <>"))
+                await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                data = bytearray()
+                while True:
+                    chunk = await reader.readline()
+                    if chunk in (b".\r\n", b".\n", b""):
+                        break
+                    data += chunk[1:] if chunk.startswith(b"..") else chunk
+                message = message_from_bytes(bytes(data))
+                print(f"📨 {', '.join(recipients)} — {message['Subject']}", flush=True)
+                await reply("250 OK: queued")
+            elif verb in ("RSET", "NOOP"):
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+    finally:
+        writer.close()
+
+
+async def main(host: str, port: int):
+    server = await asyncio.start_server(handle_client, host, port)
+    print(f"SMTP sink listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))